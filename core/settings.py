@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -77,9 +78,80 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Постоянные соединения (на поток сервера) + проверка перед повторным использованием
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Запись сразу берет блокировку: импорт ждет busy_timeout, а не падает "database is locked"
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Jolpica (Ergast) API для команд импорта; RACING_JOLPICA_URL - например, локальная заглушка
+JOLPICA_BASE_URL = os.environ.get('RACING_JOLPICA_URL', 'http://api.jolpi.ca/ergast/f1')
+# Кеш ответов API (прошедшие сезоны хранятся бессрочно; import_* --offline работает только с ним)
+JOLPICA_CACHE_DIR = os.environ.get('RACING_JOLPICA_CACHE', BASE_DIR / 'cache' / 'jolpica')
+
+# Профиль SQLite: PRAGMA для каждого нового соединения (racing/sqlite.py, сигнал connection_created)
+# RACING_SQLITE_PROFILE = default (по умолчанию, SQLite как есть) | tuned | wal (продакшен)
+# journal_mode хранится в самом файле базы, поэтому WAL - только по явному выбору:
+# иначе любая manage.py-команда переписывала бы заголовок db.sqlite3 из репозитория
+_SQLITE_CONNECTION = {
+    'mmap_size': int(os.environ.get('RACING_SQLITE_MMAP', 256 * 1024 * 1024)),
+    'cache_size': -64 * 1024,  # отрицательное значение - в КиБ (64 МБ)
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,  # мс
+}
+SQLITE_PROFILES = {
+    'default': {
+        'journal_mode': 'DELETE',
+    },
+    # Только настройки соединения - файл базы не меняется
+    'tuned': _SQLITE_CONNECTION,
+    'wal': {
+        # WAL: читатели не ждут коммита импорта, запись не ждет читателей. NORMAL безопасен только в WAL.
+        # bench_sqlite (1 ядро, 4 читателя, 5 с): чтение default 1046 / tuned 860 / wal 842 запросов/с,
+        # ошибок 0 у всех; коммитов записи 253 / 251 / 304. На чтение выигрыша нет, поэтому по умолчанию -
+        # default; wal имеет смысл, когда импорт пишет во время работы сайта (записи не ждут читателей)
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        **_SQLITE_CONNECTION,
+    },
+}
+SQLITE_PROFILE = os.environ.get('RACING_SQLITE_PROFILE', 'default')
+
+
+# Cache
+# Кеш страниц racing (alias 'pages') без TTL: записи устаревают сами, когда импорт меняет версию данных.
+# RACING_PAGE_CACHE = locmem (по умолчанию) | file | redis (REDIS_URL, например локальный redis/valkey)
+PAGE_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'racing-pages',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'pages',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'pages': {
+        **PAGE_CACHE_BACKENDS[os.environ.get('RACING_PAGE_CACHE', 'locmem')],
+        'TIMEOUT': None,
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -1,36 +1,78 @@
 from django.contrib import admin
-from .models import Circuit, Constructor, Driver, Race, Result, SprintResult
+from .models import (Circuit, Constructor, Driver, Race, Result, SprintResult,
+                     SeasonEntry, DriverSeasonStanding, ConstructorSeasonStanding, DriverTitle)
+from .versioning import bump_data_version
+
+
+class DataVersionAdmin(admin.ModelAdmin):
+    """Любая правка через админку поднимает версию данных - кеш страниц сайта сбрасывается"""
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        bump_data_version()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        bump_data_version()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        bump_data_version()
+
 
 @admin.register(Circuit)
-class CircuitAdmin(admin.ModelAdmin):
+class CircuitAdmin(DataVersionAdmin):
     list_display = ('name', 'location', 'country')
     search_fields = ('name', 'country')
 
 @admin.register(Constructor)
-class ConstructorAdmin(admin.ModelAdmin):
+class ConstructorAdmin(DataVersionAdmin):
     list_display = ('name', 'nationality')
     search_fields = ('name',)
 
 @admin.register(Driver)
-class DriverAdmin(admin.ModelAdmin):
+class DriverAdmin(DataVersionAdmin):
     list_display = ('surname', 'forename', 'nationality', 'dob')
     search_fields = ('surname', 'forename')
     list_filter = ('nationality',)
 
 @admin.register(Race)
-class RaceAdmin(admin.ModelAdmin):
+class RaceAdmin(DataVersionAdmin):
     list_display = ('year', 'name', 'circuit', 'date')
     list_filter = ('year',) # Удобный фильтр по годам справа
     search_fields = ('name',)
 
 @admin.register(Result)
-class ResultAdmin(admin.ModelAdmin):
+class ResultAdmin(DataVersionAdmin):
     list_display = ('race', 'driver', 'constructor', 'position', 'points')
-    list_filter = ('race__year', 'constructor') # Фильтр по году гонки и команде
+    list_filter = ('year', 'constructor') # Фильтр по году гонки и команде
     search_fields = ('driver__surname', 'race__name')
 
 @admin.register(SprintResult)
-class SprintResultAdmin(admin.ModelAdmin):
+class SprintResultAdmin(DataVersionAdmin):
     list_display = ('race', 'driver','constructor', 'position', 'points')
-    list_filter = ('race__year', 'constructor')
-    search_fields = ('driver__surname', 'race__name')
\ No newline at end of file
+    list_filter = ('year', 'constructor')
+    search_fields = ('driver__surname', 'race__name')
+
+@admin.register(SeasonEntry)
+class SeasonEntryAdmin(DataVersionAdmin):
+    list_display = ('year', 'driver', 'constructor', 'first_round', 'last_round', 'races')
+    list_filter = ('year',)
+    search_fields = ('driver__surname', 'constructor__name')
+
+@admin.register(DriverSeasonStanding)
+class DriverSeasonStandingAdmin(DataVersionAdmin):
+    list_display = ('year', 'position', 'driver', 'team', 'points', 'wins')
+    list_filter = ('year',)
+    search_fields = ('driver__surname',)
+
+@admin.register(ConstructorSeasonStanding)
+class ConstructorSeasonStandingAdmin(DataVersionAdmin):
+    list_display = ('year', 'position', 'team', 'points', 'wins')
+    list_filter = ('year',)
+    search_fields = ('team__name',)
+
+@admin.register(DriverTitle)
+class DriverTitleAdmin(DataVersionAdmin):
+    list_display = ('year', 'driver', 'points')
+    search_fields = ('driver__surname',)
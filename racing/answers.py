@@ -0,0 +1,208 @@
+from django.core.cache import cache
+from django.db.models import Count, Min
+from django.urls import reverse
+from thefuzz import fuzz
+from .models import (Driver, Constructor, Race, Result, DriverSeasonStanding, ConstructorSeasonStanding,
+                     DriverTitle)
+from .versioning import get_data_version
+from .translit import STOP_WORDS, to_latin
+from .standings import get_constructor_table, get_driver_table
+
+# Таблицы ответов зависят только от данных, поэтому ключ = версия данных (импорт ее поднимает)
+ANSWERS_CACHE_TIMEOUT = 60 * 60
+
+# Кубок конструкторов разыгрывается с 1958 года
+FIRST_CONSTRUCTORS_TITLE = 1958
+
+# --- КЛЮЧЕВЫЕ СЛОВА НАМЕРЕНИЙ ---
+KEYWORDS_TITLES = ['титул', 'кубк', 'кубок', 'title', 'championships']
+KEYWORDS_MOST_WINS = ['больше всего побед', 'most wins', 'рекорд', 'record']
+KEYWORDS_WINNER = ['победил', 'выиграл', 'победитель', 'winner', 'won']
+KEYWORDS_CHAMPION = ['чемпион', 'champion'] + KEYWORDS_WINNER
+KEYWORDS_CONSTRUCTORS = ['кубок конструкторов', 'конструктор', 'constructor']
+
+
+def answers_cache_key(version):
+    return f"racing:answers:{version}"
+
+
+def build_answer_tables():
+    """Все, что нужно для быстрых ответов, одним набором словарей (пара групповых запросов).
+    Ключи: год / id гонки / трасса / команда -> готовый ответ."""
+    champions = {
+        year: (driver_id, points)
+        for year, driver_id, points in DriverSeasonStanding.objects.filter(position=1)
+        .values_list('year', 'driver', 'points')
+    }
+    # Официальные чемпионы (calc_champions) важнее лидера по сумме очков: раньше в зачет шли
+    # только лучшие результаты (1988 - Сенна, а не Прост). Лидер остается для текущего сезона
+    champions.update({
+        year: (driver_id, points)
+        for year, driver_id, points in DriverTitle.objects.values_list('year', 'driver', 'points')
+    })
+    constructor_champions = {
+        year: (team_id, points)
+        for year, team_id, points in ConstructorSeasonStanding.objects
+        .filter(position=1, year__gte=FIRST_CONSTRUCTORS_TITLE).values_list('year', 'team', 'points')
+    }
+    # Сезоны, еще не пересчитанные в ConstructorSeasonStanding, - таблица на лету (кеш на версию данных)
+    season_years = Race.objects.filter(year__gte=FIRST_CONSTRUCTORS_TITLE, results__isnull=False) \
+        .values_list('year', flat=True).distinct()
+    for year in set(season_years) - set(constructor_champions):
+        table = get_constructor_table(year)
+        if table:
+            constructor_champions[year] = (table[0].team_id, table[0].points)
+
+    # Титулы команды - только завершенные сезоны (лидер текущего еще не чемпион)
+    last_finished = Race.objects.filter(results__isnull=False).order_by('-date').values_list('year', flat=True).first()
+    unfinished = Race.objects.filter(results__isnull=True, year=last_finished).exists()
+    team_titles = {}
+    for year, (team_id, _) in sorted(constructor_champions.items()):
+        if unfinished and year == last_finished:
+            continue
+        team_titles.setdefault(team_id, []).append(year)
+
+    # Победители гонок (при дележе машины в 50-х берем первую запись)
+    race_winners = {}
+    for race_id, driver_id in Result.objects.filter(position=1).order_by('id').values_list('race', 'driver'):
+        race_winners.setdefault(race_id, driver_id)
+
+    races_by_year = {}
+    for race_id, year, name, circuit_id in Race.objects.order_by('year', 'round').values_list(
+            'id', 'year', 'name', 'circuit'):
+        races_by_year.setdefault(year, []).append((race_id, name, circuit_id))
+
+    # Рекордсмены трасс: больше всего побед (при равенстве - кто раньше выиграл впервые)
+    circuit_wins = {}
+    rows = Result.objects.filter(position=1).values_list('race__circuit', 'driver').annotate(
+        wins=Count('id'), first_win=Min('race__date')).order_by('race__circuit', '-wins', 'first_win')
+    for circuit_id, driver_id, wins, _ in rows:
+        circuit_wins.setdefault(circuit_id, (driver_id, wins))
+
+    return {
+        'champion': champions,
+        'constructor_champion': constructor_champions,
+        'team_titles': team_titles,
+        'race_winner': race_winners,
+        'races_by_year': races_by_year,
+        'circuit_wins': circuit_wins,
+    }
+
+
+def get_answer_tables(version=None):
+    version = get_data_version() if version is None else version
+    key = answers_cache_key(version)
+    tables = cache.get(key)
+    if tables is None:
+        tables = build_answer_tables()
+        cache.set(key, tables, ANSWERS_CACHE_TIMEOUT)
+    return tables
+
+
+# --- ОТВЕТЫ ---
+def _driver_answer(title, driver_id, description):
+    driver = Driver.objects.filter(pk=driver_id).first()
+    if driver is None:
+        return None
+    return {'title': title, 'obj': driver, 'label': driver.full_name(),
+            'url': reverse('driver_detail', args=[driver.pk]),
+            'image': driver.photo.url if driver.photo else None, 'description': description}
+
+
+def _team_answer(title, team, description):
+    return {'title': title, 'obj': team, 'label': team.name,
+            'url': reverse('constructor_detail', args=[team.pk]),
+            'image': team.logo.url if team.logo else None, 'description': description}
+
+
+def _strip_keywords(query, year):
+    # Остаток запроса без года и слов-намерений - это название объекта ("Монца", "ferrari")
+    text = query.replace(str(year), ' ') if year else query
+    keywords = KEYWORDS_TITLES + KEYWORDS_MOST_WINS + KEYWORDS_CHAMPION + KEYWORDS_CONSTRUCTORS
+    for phrase in (k for k in keywords if ' ' in k):
+        text = text.replace(phrase, ' ')
+    # Одиночные ключевые слова - как основы: "кубк" убирает "кубков", "title" - "titles"
+    prefixes = tuple(k for k in keywords if ' ' not in k)
+    return ' '.join(word for word in text.split() if word not in STOP_WORDS and not word.startswith(prefixes))
+
+
+def _resolve(index, kind, text, threshold):
+    # Тот же индекс, что и у поиска: fuzzy по латинице, фонетика для кириллицы и опечаток
+    # partial_ratio одинаково оценивает "Ferrari" и "De Tomaso-Ferrari", поэтому уточняем полным сравнением
+    found = getattr(index, kind).search(text, threshold) or index.phonetic[kind].search(text)
+    latin = to_latin(text)
+    found.sort(key=lambda obj: (-fuzz.partial_ratio(latin, str(obj).lower()), -fuzz.ratio(latin, str(obj).lower())))
+    return found
+
+
+def _find_race(tables, year, text, circuits):
+    # Этап года: по трассе ("Монако 2019") или по названию Гран-при ("british 2019")
+    races = tables['races_by_year'].get(year, [])
+    for circuit in circuits:
+        for race in races:
+            if race[2] == circuit.pk:
+                return race
+
+    best = max(races, key=lambda race: fuzz.partial_ratio(text, race[1].lower()), default=None)
+    if best and fuzz.partial_ratio(text, best[1].lower()) > 70:
+        return best
+    return None
+
+
+def smart_answer(query, year, index):
+    """Быстрый ответ на фактический вопрос или None. query - запрос в нижнем регистре,
+    index - индекс поиска (get_search_index), через него узнаем команду / трассу из запроса."""
+    tables = get_answer_tables(index.version)
+    text = _strip_keywords(query, year)
+
+    # 1. Сколько кубков у команды ("титулы Ferrari")
+    if text and any(k in query for k in KEYWORDS_TITLES) and not year:
+        teams = _resolve(index, 'teams', text, 80)
+        if teams:
+            team = teams[0]
+            years = tables['team_titles'].get(team.pk, [])
+            if team.championships:
+                # Официальное число из calc_constructor_champions (в старых сезонах зачет шел не по сумме очков)
+                description = f"Кубков конструкторов: {team.championships}."
+            elif years:
+                description = f"Кубков конструкторов: {len(years)} ({', '.join(map(str, years))})."
+            else:
+                description = "Кубков конструкторов пока нет."
+            return _team_answer("Титулы команды", team, description)
+
+    # 2. Больше всего побед на трассе ("больше всего побед Монца")
+    if text and any(k in query for k in KEYWORDS_MOST_WINS):
+        circuits = _resolve(index, 'circuits', text, 75)
+        record = tables['circuit_wins'].get(circuits[0].pk) if circuits else None
+        if record:
+            driver_id, wins = record
+            return _driver_answer(f"Больше всего побед ({circuits[0].name})", driver_id, f"Побед на трассе: {wins}.")
+
+    if not year:
+        return None
+
+    # 3. Победитель конкретного Гран-при ("кто выиграл Монако 2019")
+    if text and any(k in query for k in KEYWORDS_WINNER):
+        race = _find_race(tables, year, text, _resolve(index, 'circuits', text, 75))
+        if race and race[0] in tables['race_winner']:
+            race_id, name, _ = race
+            return _driver_answer(f"{name} {year}", tables['race_winner'][race_id], "Победитель гонки.")
+
+    # 4. Чемпион сезона ("чемпион 1988") или обладатель Кубка конструкторов ("кубок конструкторов 2020")
+    if any(k in query for k in KEYWORDS_CONSTRUCTORS):
+        champion = tables['constructor_champion'].get(year)
+        team = Constructor.objects.filter(pk=champion[0]).first() if champion else None
+        if team:
+            return _team_answer(f"Кубок конструкторов {year}", team, f"Набрали {int(champion[1])} очков.")
+    elif any(k in query for k in KEYWORDS_CHAMPION):
+        champion = tables['champion'].get(year)
+        if champion is None:
+            # Сезон еще не пересчитан в DriverSeasonStanding - таблица на лету
+            table = get_driver_table(year)
+            champion = (table[0].driver_id, table[0].points) if table else None
+        if champion:
+            driver_id, points = champion
+            description = f"Набрал {points:g} очков." if points is not None else "Чемпион мира."
+            return _driver_answer(f"Чемпион {year}", driver_id, description)
+
+    return None
@@ -1,6 +1,11 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class RacingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'racing'
+
+    def ready(self):
+        from .sqlite import apply_sqlite_pragmas
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='racing_sqlite_pragmas')
@@ -0,0 +1,109 @@
+import re
+from django.db import connection, transaction
+
+# Полнотекстовый поиск SQLite FTS5 по всей истории: гонки, пилоты, трассы, команды.
+# Две таблицы с одинаковым содержимым:
+#   - prefix: слова целиком и по началу ("monac*"), без диакритики (Nürburgring == nurburgring)
+#   - trigram: подстроки от 3 символов ("urbur" найдет Nürburgring)
+PREFIX_TABLE = 'racing_search_prefix'
+TRIGRAM_TABLE = 'racing_search_trigram'
+
+CREATE_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {PREFIX_TABLE} USING fts5(
+        kind UNINDEXED, ref UNINDEXED, year UNINDEXED, title, details,
+        prefix='2 3 4', tokenize='unicode61 remove_diacritics 2')""",
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TRIGRAM_TABLE} USING fts5(
+        kind UNINDEXED, ref UNINDEXED, year UNINDEXED, title, details,
+        tokenize='trigram')""",
+]
+
+# Что именно попадает в индекс (kind, ref, year, title, details)
+SOURCE_SQL = """
+    SELECT 'race', r.id, r.year, r.name, c.name || ' ' || c.location || ' ' || c.country
+      FROM racing_race r JOIN racing_circuit c ON c.circuit_ref = r.circuit_id
+    UNION ALL
+    SELECT 'driver', d.driver_ref, NULL, d.forename || ' ' || d.surname, d.code
+      FROM racing_driver d
+    UNION ALL
+    SELECT 'circuit', c.circuit_ref, NULL, c.name, c.location || ' ' || c.country
+      FROM racing_circuit c
+    UNION ALL
+    SELECT 'constructor', t.constructor_ref, NULL, t.name, ''
+      FROM racing_constructor t
+"""
+
+KINDS = ('race', 'driver', 'circuit', 'constructor')
+
+
+def is_available(conn=None):
+    return (conn or connection).vendor == 'sqlite'
+
+
+def rebuild_search_fts(conn=None):
+    """Полная пересборка индекса (пара тысяч строк - миллисекунды). Вызывается импортами."""
+    conn = conn or connection
+    if not is_available(conn):
+        return 0
+
+    with transaction.atomic(using=conn.alias), conn.cursor() as cursor:
+        for sql in CREATE_SQL:
+            cursor.execute(sql)
+        for table in (PREFIX_TABLE, TRIGRAM_TABLE):
+            cursor.execute(f"DELETE FROM {table}")
+            cursor.execute(f"INSERT INTO {table} (kind, ref, year, title, details) {SOURCE_SQL}")
+        cursor.execute(f"SELECT count(*) FROM {PREFIX_TABLE}")
+        return cursor.fetchone()[0]
+
+
+def _words(query):
+    # Только буквы/цифры: все остальное в синтаксисе FTS5 имеет спецзначение
+    return re.findall(r'\w+', query.lower())
+
+
+def search_fts(query, year=None, limit=200):
+    """Ранжированный поиск одним запросом.
+    Возвращает {kind: [ref, ...]} в порядке релевантности или None, если FTS недоступен.
+    Совпадения по подстроке берутся для вида объектов, только если по словам ничего не нашлось."""
+    if not is_available():
+        return None
+
+    words = _words(query)
+    if not words:
+        return {kind: [] for kind in KINDS}
+
+    year_sql = 'AND year = %s' if year else ''
+    year_params = [year] if year else []
+
+    # Совпадения по словам (tier 0): каждое слово как префикс
+    branches = [f"""SELECT kind, ref, year, 0 AS tier, rank AS score
+                      FROM {PREFIX_TABLE} WHERE {PREFIX_TABLE} MATCH %s {year_sql}"""]
+    params = [' AND '.join(f'"{w}"*' for w in words), *year_params]
+
+    # Совпадения по подстроке (tier 1): trigram ищет только слова от 3 символов
+    trigram_words = [w for w in words if len(w) >= 3]
+    if trigram_words:
+        branches.append(f"""SELECT kind, ref, year, 1 AS tier, rank AS score
+                              FROM {TRIGRAM_TABLE} WHERE {TRIGRAM_TABLE} MATCH %s {year_sql}""")
+        params += [' AND '.join(f'"{w}"' for w in trigram_words), *year_params]
+    params.append(limit)
+
+    # Слова выше подстрок, внутри уровня - rank (bm25, меньше = релевантнее) того же уровня,
+    # год - только при равном rank (одинаковые гонки разных сезонов: свежие первыми)
+    union = ' UNION ALL '.join(branches)
+    sql = f"""
+        SELECT kind, ref, MIN(tier) AS best_tier,
+               COALESCE(MIN(CASE WHEN tier = 0 THEN score END), MIN(score)) AS best_score
+          FROM ({union})
+        GROUP BY kind, ref
+        ORDER BY best_tier, best_score, MAX(year) DESC
+        LIMIT %s
+    """
+
+    found = {kind: [] for kind in KINDS}
+    kind_tier = {}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for kind, ref, tier, _ in cursor.fetchall():
+            if kind_tier.setdefault(kind, tier) == tier:
+                found[kind].append(ref)
+    return found
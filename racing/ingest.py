@@ -0,0 +1,171 @@
+from collections import Counter
+from django.db import transaction
+from django.utils.dateparse import parse_date
+from .models import Circuit, Constructor, Driver, Race, Result, SprintResult
+
+# Поля, которые импорт перезаписывает (остальное - расписание, фото, титулы - не трогаем)
+RACE_FIELDS = ['name', 'date', 'circuit_id', 'url']
+RESULT_FIELDS = ['year', 'round', 'grid', 'position', 'position_text', 'points', 'status']
+RESULT_KEY = ['race_id', 'driver_id', 'constructor_id']
+
+BATCH_SIZE = 500
+
+
+def known_refs():
+    """Какие пилоты / команды / трассы уже есть в базе (ref и есть первичный ключ). Три запроса на весь импорт."""
+    return {
+        'driver': set(Driver.objects.values_list('pk', flat=True)),
+        'constructor': set(Constructor.objects.values_list('pk', flat=True)),
+        'circuit': set(Circuit.objects.values_list('pk', flat=True)),
+    }
+
+
+def upsert_rows(model, rows, key_fields, value_fields, existing):
+    """Пакетный upsert: rows - список словарей полей, existing - queryset с текущими строками этого среза.
+    Записываются только новые и изменившиеся строки (INSERT ... ON CONFLICT DO UPDATE).
+    Возвращает Counter(inserted=, updated=, unchanged=)."""
+    current = {
+        tuple(row[:len(key_fields)]): tuple(row[len(key_fields):])
+        for row in existing.values_list(*key_fields, *value_fields)
+    }
+    # Один ключ дважды в одном INSERT SQLite не примет - последняя запись побеждает
+    unique_rows = {tuple(row[f] for f in key_fields): row for row in rows}
+
+    counts = Counter(inserted=0, updated=0, unchanged=0)
+    changed = []
+    for key, row in unique_rows.items():
+        old = current.get(key)
+        if old is None:
+            counts['inserted'] += 1
+        elif old == tuple(row[f] for f in value_fields):
+            counts['unchanged'] += 1
+            continue
+        else:
+            counts['updated'] += 1
+        changed.append(model(**row))
+
+    if changed:
+        model.objects.bulk_create(changed, batch_size=BATCH_SIZE, update_conflicts=True,
+                                  unique_fields=key_fields, update_fields=value_fields)
+    return counts
+
+
+def format_report(counts):
+    return f"новых {counts['inserted']}, изменено {counts['updated']}, без изменений {counts['unchanged']}"
+
+
+# --- СПРАВОЧНИКИ (страница ответа API -> строки моделей) ---
+def circuit_row(item):
+    return {
+        'circuit_ref': item['circuitId'],
+        'name': item['circuitName'],
+        'location': item['Location']['locality'],
+        'country': item['Location']['country'],
+        'lat': float(item['Location']['lat']),
+        'lng': float(item['Location']['long']),
+        'url': item.get('url', ''),
+    }
+
+
+def constructor_row(item):
+    return {
+        'constructor_ref': item['constructorId'],
+        'name': item['name'],
+        'nationality': item['nationality'],
+        'url': item.get('url', ''),
+    }
+
+
+def driver_row(item):
+    return {
+        'driver_ref': item['driverId'],
+        'code': item.get('code', ''),
+        'number': int(item['permanentNumber']) if item.get('permanentNumber') else None,
+        'forename': item['givenName'],
+        'surname': item['familyName'],
+        'dob': parse_date(item['dateOfBirth']) if item.get('dateOfBirth') else None,
+        'nationality': item['nationality'],
+        'url': item.get('url', ''),
+    }
+
+
+REFERENCE_ROWS = {Circuit: circuit_row, Constructor: constructor_row, Driver: driver_row}
+
+
+def upsert_reference(model, items):
+    """Пачка пилотов / команд / трасс из API одним upsert"""
+    rows = [REFERENCE_ROWS[model](item) for item in items]
+    key = model._meta.pk.name
+    value_fields = [name for name in rows[0] if name != key] if rows else []
+    with transaction.atomic():
+        return upsert_rows(model, rows, [key], value_fields,
+                           model.objects.filter(pk__in=[row[key] for row in rows]))
+
+
+# --- СЕЗОН ---
+class SeasonBatch:
+    """Гонки и результаты одного сезона: копятся в памяти по мере скачивания,
+    пишутся одной транзакцией в save() (по одному bulk upsert на таблицу)."""
+
+    def __init__(self, year, refs):
+        self.year = year
+        self.refs = refs
+        self.races = {}
+        self.results = {Result: [], SprintResult: []}
+        self.skipped = []
+
+    def add_race(self, race_info):
+        """Этап из календаря API. False - трасса неизвестна, этап пропускается."""
+        if race_info['Circuit']['circuitId'] not in self.refs['circuit']:
+            return False
+        round_num = int(race_info['round'])
+        self.races[round_num] = {
+            'year': int(race_info['season']),
+            'round': round_num,
+            'name': race_info['raceName'],
+            'date': parse_date(race_info['date']),
+            'circuit_id': race_info['Circuit']['circuitId'],
+            'url': race_info.get('url', ''),
+        }
+        return True
+
+    def add_results(self, round_num, items, model=Result):
+        """Протокол гонки (model=Result) или спринта (model=SprintResult)"""
+        for res in items:
+            driver_ref = res['Driver']['driverId']
+            constructor_ref = res['Constructor']['constructorId']
+            if driver_ref not in self.refs['driver'] or constructor_ref not in self.refs['constructor']:
+                self.skipped.append((round_num, driver_ref, constructor_ref))
+                continue
+            try:
+                position = int(res['position'])
+            except ValueError:
+                position = None
+            self.results[model].append({
+                'round': round_num,
+                'driver_id': driver_ref,
+                'constructor_id': constructor_ref,
+                'grid': int(res['grid']),
+                'position': position,
+                'position_text': res['positionText'],
+                'points': float(res['points']),
+                'status': res['status'],
+            })
+
+    def save(self):
+        """Пишет сезон. Возвращает {'Race': Counter, 'Result': Counter, 'SprintResult': Counter}."""
+        report = {}
+        # Текущие строки читаем только для записываемых этапов: save_round по одному этапу не грузит весь сезон
+        rounds = set(self.races) | {row['round'] for rows in self.results.values() for row in rows}
+        with transaction.atomic():
+            report['Race'] = upsert_rows(Race, list(self.races.values()), ['year', 'round'], RACE_FIELDS,
+                                         Race.objects.filter(year=self.year, round__in=self.races))
+            # id гонок (в т.ч. только что созданных) - одним запросом
+            race_ids = dict(Race.objects.filter(year=self.year, round__in=rounds).values_list('round', 'id'))
+
+            for model, rows in self.results.items():
+                for row in rows:
+                    row.update(race_id=race_ids[row['round']], year=self.year)
+                report[model.__name__] = upsert_rows(model, rows, RESULT_KEY, RESULT_FIELDS,
+                                                     model.objects.filter(year=self.year, round__in=rounds))
+        return report
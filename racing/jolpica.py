@@ -0,0 +1,231 @@
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+# Опубликованные лимиты Jolpica (без ключа): всплеск 4 запроса в секунду и 500 запросов в час
+BURST_PER_SECOND = 4
+HOURLY_LIMIT = 500
+
+# Больше 100 строк за запрос API не отдает
+PAGE_LIMIT = 100
+
+# Повторяем только то, что может пройти со второго раза: лимит и ошибки сервера
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Срок жизни ответов в кеше (секунды). Прошедшие сезоны не меняются - без срока
+CURRENT_SEASON_TTL = 60 * 60
+REFERENCE_TTL = 24 * 60 * 60
+
+
+def cache_ttl(endpoint, fetched_at):
+    """Срок жизни ответа: None - навсегда (сезон закончился до загрузки: '1988/5/results'),
+    час - для сезона, который тогда еще шел, сутки - для справочников ('drivers')"""
+    match = re.match(r'(\d{4})\b', endpoint.strip('/'))
+    if not match:
+        return REFERENCE_TTL
+    fetched_year = datetime.date.fromtimestamp(fetched_at).year
+    return None if int(match.group(1)) < fetched_year else CURRENT_SEASON_TTL
+
+
+class ResponseCache:
+    """Ответы API на диске: один gzip-файл JSON на (URL, параметры).
+    Хранит тело, время загрузки и ETag / Last-Modified для условного запроса."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def path(self, url, params):
+        key = json.dumps([url, sorted((params or {}).items())], default=str)
+        return self.directory / f"{hashlib.sha1(key.encode()).hexdigest()}.json.gz"
+
+    def get(self, url, params):
+        try:
+            with gzip.open(self.path(url, params), 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url, params, body, headers=None, fetched_at=None):
+        headers = headers or {}
+        entry = {
+            'url': url, 'params': params, 'fetched_at': fetched_at or time.time(), 'body': body,
+            'etag': headers.get('ETag'), 'last_modified': headers.get('Last-Modified'),
+        }
+        # Запись через временный файл: параллельные потоки не увидят половину файла
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp, self.path(url, params))
+        return entry
+
+    @staticmethod
+    def is_fresh(entry, endpoint):
+        ttl = cache_ttl(endpoint, entry['fetched_at'])
+        return ttl is None or time.time() - entry['fetched_at'] < ttl
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity подряд. acquire() ждет свободный токен."""
+
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+class JolpicaClient:
+    """Общий клиент Jolpica (Ergast) API для команд импорта.
+    Одна requests.Session с пулом соединений, лимиты API на весь процесс,
+    не больше max_workers запросов одновременно, повтор 429/5xx с экспоненциальной паузой.
+    cache - ResponseCache: свежие ответы не идут в сеть, устаревшие перепроверяются (304).
+    offline=True - только из кеша, сеть не трогаем."""
+
+    def __init__(self, base_url=None, max_workers=4, retries=4, backoff=1.0, timeout=10,
+                 limits=((BURST_PER_SECOND, BURST_PER_SECOND), (HOURLY_LIMIT / 3600, HOURLY_LIMIT)), log=None,
+                 cache=None, offline=False):
+        self.base_url = (base_url or settings.JOLPICA_BASE_URL).rstrip('/')
+        self.cache = cache
+        self.offline = offline
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.buckets = [TokenBucket(rate, capacity) for rate, capacity in limits]
+        self.log = log or (lambda message: None)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def url(self, endpoint):
+        endpoint = endpoint.strip('/')
+        if not endpoint.endswith('.json'):
+            endpoint += '.json'
+        return f"{self.base_url}/{endpoint}"
+
+    def get_json(self, endpoint, params=None):
+        """'2024/5/results' -> JSON ответа или None (ошибка уже записана в log)"""
+        url = self.url(endpoint)
+        entry = self.cache.get(url, params) if self.cache else None
+        if entry and (self.offline or ResponseCache.is_fresh(entry, endpoint)):
+            return entry['body']
+        if self.offline:
+            self.log(f"Нет в кеше (--offline): {url}")
+            return None
+
+        # Устаревшая запись: сервер ответит 304, если данные не менялись
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        for attempt in range(self.retries + 1):
+            for bucket in self.buckets:
+                bucket.acquire()
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            except requests.RequestException as e:
+                error, delay = e, None
+            else:
+                if response.status_code == 304 and entry:
+                    self.cache.put(url, params, entry['body'], {'ETag': entry.get('etag'),
+                                                                'Last-Modified': entry.get('last_modified')})
+                    return entry['body']
+                if response.status_code not in RETRY_STATUSES:
+                    try:
+                        response.raise_for_status()
+                        body = response.json()
+                    except (requests.RequestException, ValueError) as e:
+                        self.log(f"Ошибка API {url}: {e}")
+                        return None
+                    if self.cache:
+                        self.cache.put(url, params, body, response.headers)
+                    return body
+                error = f"HTTP {response.status_code}"
+                delay = _retry_after(response)
+
+            if attempt == self.retries:
+                if entry:
+                    # Сеть недоступна, а старая копия есть - лучше она, чем ничего
+                    self.log(f"Ошибка API {url}: {error}, взят ответ из кеша")
+                    return entry['body']
+                self.log(f"Ошибка API {url}: {error} (попыток: {attempt + 1})")
+                return None
+            # Экспоненциальная пауза: 1, 2, 4, 8 с (или сколько попросил сервер в Retry-After)
+            time.sleep(delay if delay is not None else self.backoff * 2 ** attempt)
+
+    def get_many(self, requests_list):
+        """[(endpoint, params), ...] -> [JSON или None, ...] в том же порядке, параллельно (max_workers)"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(lambda item: self.get_json(*item), requests_list))
+
+    def get_pages(self, endpoint, limit=PAGE_LIMIT):
+        """Все страницы списка по очереди (limit/offset, сколько всего - MRData.total).
+        -> [JSON страницы, ...]; None вместо страницы - запрос не удался."""
+        pages = [self.get_json(endpoint, {'limit': limit, 'offset': 0})]
+        if pages[0] is None:
+            return pages
+        total = int(pages[0]['MRData'].get('total', 0))
+        for offset in range(limit, total, limit):
+            pages.append(self.get_json(endpoint, {'limit': limit, 'offset': offset}))
+        return pages
+
+
+def _retry_after(response):
+    value = response.headers.get('Retry-After')
+    try:
+        return max(float(value), 0) if value is not None else None
+    except ValueError:
+        return None
+
+
+# --- ОПЦИИ КОМАНД ИМПОРТА ---
+def add_client_arguments(parser):
+    parser.add_argument('--offline', action='store_true', help='Только ответы из кеша, без обращений к API')
+    parser.add_argument('--no-cache', action='store_true', help='Не использовать кеш ответов API')
+
+
+def command_client(command, options):
+    """Клиент для management-команды: кеш ответов в settings.JOLPICA_CACHE_DIR, ошибки - в stdout команды"""
+    cache = None if options.get('no_cache') else ResponseCache(settings.JOLPICA_CACHE_DIR)
+    return JolpicaClient(cache=cache, offline=options.get('offline', False),
+                         log=lambda message: command.stdout.write(command.style.ERROR(message)))
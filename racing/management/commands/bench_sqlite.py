@@ -0,0 +1,98 @@
+import random
+import threading
+import time
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import F, Sum
+from django.test.utils import override_settings
+from racing.models import Race, Result
+from racing.sqlite import sqlite_pragmas
+
+
+class Command(BaseCommand):
+    help = 'Бенчмарк чтения SQLite во время записи импорта: профили соединения (settings.SQLITE_PROFILES)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', action='append', help='Профиль (по умолчанию default, tuned и wal)')
+        parser.add_argument('--readers', type=int, default=4, help='Потоков чтения')
+        parser.add_argument('--seconds', type=float, default=5, help='Длительность замера для профиля')
+        parser.add_argument('--write-pause', type=float, default=0.01,
+                            help='Пауза между транзакциями записи, с (импорт ждет ответа API)')
+
+    def handle(self, *args, **options):
+        years = list(Race.objects.filter(results__isnull=False).values_list('year', flat=True).distinct())
+        journal_mode = self.journal_mode()
+        connections.close_all()
+
+        for profile in options['profile'] or ['default', 'tuned', 'wal']:
+            # Новые соединения получат PRAGMA профиля (journal_mode сохраняется в самом файле базы)
+            with override_settings(SQLITE_PROFILE=profile):
+                stats = self.run_profile(years, options['readers'], options['seconds'], options['write_pause'])
+            connections.close_all()
+            self.report(profile, stats, options['seconds'])
+
+        # Возвращаем файлу базы режим журнала, который был до замера
+        with override_settings(SQLITE_PROFILE='default'), connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA journal_mode = {journal_mode}")
+        connections.close_all()
+
+    @staticmethod
+    def journal_mode():
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            return cursor.fetchone()[0]
+
+    def run_profile(self, years, readers, seconds, write_pause):
+        stop = threading.Event()
+        stats = {'latencies': [], 'read_errors': 0, 'writes': 0, 'write_errors': 0}
+        lock = threading.Lock()
+
+        def reader():
+            latencies, errors = [], 0
+            while not stop.is_set():
+                # Запрос таблицы чемпионата - самый частый тяжелый запрос страниц
+                year = random.choice(years)
+                started = time.perf_counter()
+                try:
+                    list(Result.objects.filter(year=year).values('driver').annotate(points=Sum('points')))
+                    latencies.append(time.perf_counter() - started)
+                except OperationalError:
+                    errors += 1
+            connections.close_all()
+            with lock:
+                stats['latencies'] += latencies
+                stats['read_errors'] += errors
+
+        def writer():
+            # Как импорт сезона: транзакция, переписывающая результаты (значения не меняются)
+            while not stop.is_set():
+                try:
+                    with transaction.atomic():
+                        Result.objects.filter(year=random.choice(years)).update(points=F('points'))
+                    stats['writes'] += 1
+                except OperationalError:
+                    stats['write_errors'] += 1
+                time.sleep(write_pause)
+            connections.close_all()
+
+        threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return stats
+
+    def report(self, profile, stats, seconds):
+        latencies = sorted(stats['latencies'])
+        pragmas = ', '.join(f"{k}={v}" for k, v in sqlite_pragmas(profile).items())
+        self.stdout.write(f"--- ПРОФИЛЬ {profile}: {pragmas} ---")
+        if latencies:
+            p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+            self.stdout.write(f"   Чтение: {len(latencies) / seconds:8.1f} запросов/с, "
+                              f"p95 {p95 * 1000:.1f}ms, макс {latencies[-1] * 1000:.1f}ms, "
+                              f"ошибок {stats['read_errors']}")
+        else:
+            self.stdout.write(self.style.WARNING(f"   Чтение: ни одного запроса, ошибок {stats['read_errors']}"))
+        self.stdout.write(f"   Запись: {stats['writes']} транзакций, ошибок {stats['write_errors']}")
@@ -1,13 +1,15 @@
-import requests
 import datetime
 from django.core.management.base import BaseCommand
-from racing.models import Driver
+from racing.models import Driver, DriverTitle
+from racing.versioning import bump_data_version
+from racing.jolpica import add_client_arguments, command_client
 
 
 class Command(BaseCommand):
     help = 'Автоматический подсчет титулов чемпионов мира (Пилоты)'
 
-    BASE_URL = "http://api.jolpi.ca/ergast/f1"
+    def add_arguments(self, parser):
+        add_client_arguments(parser)
 
     def handle(self, *args, **kwargs):
         self.stdout.write("--- НАЧИНАЕМ ПОДСЧЕТ ТИТУЛОВ ПИЛОТОВ ---")
@@ -25,16 +27,21 @@ class Command(BaseCommand):
         # С 1950 по прошлый год
         years = range(1950, current_year)
 
-        for year in years:
+        # Таблицы всех лет скачиваем параллельно (общий клиент соблюдает лимиты API)
+        with command_client(self, kwargs) as client:
+            responses = client.get_many([(f"{year}/driverStandings", {'limit': 1}) for year in years])
+
+        # Официальный чемпион каждого года (его ищут быстрые ответы поиска: "чемпион 1988")
+        titles = []
+        for year, data in zip(years, responses):
             # Пишем в консоль, чтобы видеть прогресс
             self.stdout.write(f"Обработка {year} года...", ending='')
 
-            url = f"{self.BASE_URL}/{year}/driverStandings.json?limit=1"
+            if data is None:
+                self.stdout.write(self.style.ERROR(" Ошибка запроса"))
+                continue
 
             try:
-                r = requests.get(url, timeout=10)
-                data = r.json()
-
                 standings_list = data['MRData']['StandingsTable']['StandingsLists']
 
                 if not standings_list:
@@ -50,6 +57,7 @@ class Command(BaseCommand):
                     driver = Driver.objects.get(pk=driver_ref)
                     driver.championships += 1
                     driver.save()
+                    titles.append(DriverTitle(year=year, driver=driver, points=float(champion_data['points'])))
                     self.stdout.write(self.style.SUCCESS(f" OK -> {driver.surname}"))
                 except Driver.DoesNotExist:
                     self.stdout.write(self.style.ERROR(f" Пилот {driver_ref} не найден в базе!"))
@@ -57,4 +65,10 @@ class Command(BaseCommand):
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f" Ошибка запроса: {e}"))
 
+        DriverTitle.objects.bulk_create(titles, update_conflicts=True, unique_fields=['year'],
+                                        update_fields=['driver', 'points'])
+
+        # Данные поменялись - кеш страниц и индексы поиска пересоберутся
+        bump_data_version()
+
         self.stdout.write(self.style.SUCCESS(f"--- ГОТОВО ---"))
\ No newline at end of file
@@ -1,13 +1,15 @@
-import requests
 import datetime
 from django.core.management.base import BaseCommand
 from racing.models import Constructor
+from racing.versioning import bump_data_version
+from racing.jolpica import add_client_arguments, command_client
 
 
 class Command(BaseCommand):
     help = 'Автоматический подсчет Кубков Конструкторов через API'
 
-    BASE_URL = "http://api.jolpi.ca/ergast/f1"
+    def add_arguments(self, parser):
+        add_client_arguments(parser)
 
     def handle(self, *args, **kwargs):
         self.stdout.write("--- НАЧИНАЕМ ПОДСЧЕТ КУБКОВ КОНСТРУКТОРОВ ---")
@@ -24,15 +26,16 @@ class Command(BaseCommand):
         # До 2025 (не включительно), то есть закончит на 2024.
         years = range(1958, current_year)
 
-        for year in years:
-            # Запрашиваем таблицу конструкторов, нам нужен только победитель (limit=1)
-            # URL: /api/f1/1990/constructorStandings.json
-            url = f"{self.BASE_URL}/{year}/constructorStandings.json?limit=1"
+        # Запрашиваем таблицы конструкторов всех лет параллельно, нам нужен только победитель (limit=1)
+        # URL: /api/f1/1990/constructorStandings.json
+        with command_client(self, kwargs) as client:
+            responses = client.get_many([(f"{year}/constructorStandings", {'limit': 1}) for year in years])
 
-            try:
-                r = requests.get(url, timeout=10)
-                data = r.json()
+        for year, data in zip(years, responses):
+            if data is None:
+                continue
 
+            try:
                 # Проверяем, есть ли данные
                 standings_list = data['MRData']['StandingsTable']['StandingsLists']
                 if not standings_list:
@@ -60,5 +63,8 @@ class Command(BaseCommand):
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f"Ошибка запроса {year}: {e}"))
 
+        # Данные поменялись - кеш страниц и индексы поиска пересоберутся
+        bump_data_version()
+
         self.stdout.write(
             self.style.SUCCESS(f"--- ГОТОВО. Данные о конструкторах обновлены до {current_year - 1} года ---"))
\ No newline at end of file
@@ -0,0 +1,114 @@
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import resolve
+from racing.page_cache import all_urls, page_last_modified
+
+# Папки с картинками (upload_to моделей) - копируются рядом со страницами
+MEDIA_DIRS = ['drivers', 'circuits', 'constructors']
+
+# Что и когда выгружено в прошлый раз: {путь: время изменения данных страницы}
+MANIFEST_NAME = '.export-manifest.json'
+
+
+def output_file(output, path):
+    """'/drivers/hamilton/' -> output/drivers/hamilton/index.html, '.../progression.json' -> как есть"""
+    relative = path.lstrip('/')
+    if not relative or relative.endswith('/'):
+        relative += 'index.html'
+    return Path(output) / relative
+
+
+def export_url(args):
+    """Рендер одной страницы в файл (выполняется в процессе пула) -> (путь, статус)"""
+    path, output = args
+    match = resolve(path)
+    response = match.func(RequestFactory().get(path), *match.args, **match.kwargs)
+    if response.status_code == 200:
+        target = output_file(output, path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(response.content)
+    return path, response.status_code
+
+
+def sync_media(source, target):
+    """Копирует картинки, которых нет в выгрузке или которые поменялись (по размеру и времени)"""
+    copied = 0
+    for root, _, files in os.walk(source):
+        for name in files:
+            src = Path(root) / name
+            dst = Path(target) / src.relative_to(source)
+            src_stat = src.stat()
+            if dst.exists():
+                dst_stat = dst.stat()
+                if dst_stat.st_size == src_stat.st_size and dst_stat.st_mtime >= src_stat.st_mtime:
+                    continue
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(src, dst)
+            copied += 1
+    return copied
+
+
+class Command(BaseCommand):
+    help = 'Экспорт сайта в статические HTML-файлы (для раздачи через nginx без Python)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=str(settings.BASE_DIR / 'static_site'), help='Папка выгрузки')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Процессов рендера')
+        parser.add_argument('--incremental', action='store_true',
+                            help='Только страницы, данные которых поменялись с прошлой выгрузки')
+
+    def handle(self, *args, **options):
+        output = Path(options['output'])
+        output.mkdir(parents=True, exist_ok=True)
+        manifest_path = output / MANIFEST_NAME
+        manifest = {}
+        if options['incremental'] and manifest_path.exists():
+            manifest = json.loads(manifest_path.read_text())
+
+        # 1. Какие страницы рендерить: время изменения данных страницы сравниваем с прошлой выгрузкой
+        urls = all_urls()
+        stamps = {}
+        for path in urls:
+            modified = page_last_modified(path)
+            stamps[path] = int(modified.timestamp()) if modified else None
+        todo = [
+            path for path in urls
+            if stamps[path] is None or manifest.get(path) != stamps[path] or not output_file(output, path).exists()
+        ]
+        self.stdout.write(f"--- ЭКСПОРТ: {len(todo)} из {len(urls)} страниц, процессов {options['workers']} ---")
+
+        # 2. Рендер в пуле процессов (шаблоны и numpy упираются в GIL, потоки тут не помогают)
+        started = time.perf_counter()
+        # Соединение с БД не должно достаться дочерним процессам - каждый откроет свое
+        connections.close_all()
+        errors = []
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            jobs = ((path, str(output)) for path in todo)
+            for path, status in pool.map(export_url, jobs, chunksize=16):
+                if status == 200:
+                    manifest[path] = stamps[path]
+                else:
+                    errors.append(path)
+                    manifest.pop(path, None)
+        self.stdout.write(f"   Страницы: {len(todo) - len(errors)} за {time.perf_counter() - started:.1f}s")
+
+        # 3. Картинки пилотов, трасс и команд - по тем же адресам, что и в MEDIA_URL
+        media_root = Path(settings.MEDIA_ROOT or settings.BASE_DIR)
+        for folder in MEDIA_DIRS:
+            if (media_root / folder).is_dir():
+                copied = sync_media(media_root / folder, output / folder)
+                self.stdout.write(f"   {folder}/: скопировано файлов {copied}")
+
+        manifest_path.write_text(json.dumps(manifest, indent=0, sort_keys=True))
+
+        if errors:
+            self.stdout.write(self.style.WARNING(f"Страниц с ошибкой (не 200): {len(errors)}, например {errors[:5]}"))
+        self.stdout.write(self.style.SUCCESS(f"--- ГОТОВО: {output} ---"))
@@ -3,6 +3,7 @@ from bs4 import BeautifulSoup
 from django.core.management.base import BaseCommand
 from django.core.files.base import ContentFile
 from racing.models import Driver
+from racing.versioning import bump_data_version
 
 
 class Command(BaseCommand):
@@ -86,4 +87,7 @@ class Command(BaseCommand):
             except Exception:
                 self.stdout.write(self.style.ERROR("Ошибка"))
 
+        # Данные поменялись - кеш страниц и индексы поиска пересоберутся
+        bump_data_version()
+
         self.stdout.write(self.style.SUCCESS(f"--- ЗАГРУЖЕНО ФОТО: {success_count} ---"))
\ No newline at end of file
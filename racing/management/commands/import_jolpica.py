@@ -1,8 +1,15 @@
-import requests
-import time
+import datetime
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
-from racing.models import Circuit, Constructor, Driver, Race, Result
-from django.utils.dateparse import parse_date
+from racing.models import Circuit, Constructor, Driver, Result, SprintResult
+from racing.ingest import SeasonBatch, known_refs, upsert_reference, format_report
+from racing.jolpica import add_client_arguments, command_client
+from racing.roster import rebuild_season_entries
+from racing.versioning import bump_data_version
+from racing.standings import rebuild_season_standings
+from racing.fts import rebuild_search_fts
 
 
 class Command(BaseCommand):
@@ -12,107 +19,85 @@ class Command(BaseCommand):
     START_YEAR = 2021
     END_YEAR = 2026
 
-    BASE_URL = "http://api.jolpi.ca/ergast/f1"
+    # Вся история чемпионата (--backfill); спринты проводятся с 2021 года
+    FIRST_YEAR = 1950
+    FIRST_SPRINT_YEAR = 2021
+
+    def add_arguments(self, parser):
+        parser.add_argument('--warm', action='store_true', help='После импорта прогреть кеш страниц загруженных сезонов')
+        parser.add_argument('--backfill', action='store_true',
+                            help='Вся история: результаты сезона целиком (/{year}/results), сезоны параллельно')
+        parser.add_argument('--from-year', type=int, help=f'Первый сезон для --backfill (по умолчанию {self.FIRST_YEAR})')
+        parser.add_argument('--to-year', type=int, help='Последний сезон для --backfill (по умолчанию текущий)')
+        add_client_arguments(parser)
 
     def handle(self, *args, **kwargs):
         self.stdout.write("--- ЗАПУСК ИМПОРТА (РЕЖИМ ПАГИНАЦИИ) ---")
+        self.client = command_client(self, kwargs)
 
         # 1. Сначала ГАРАНТИРОВАННО скачиваем все справочники целиком
-        self.import_all_items_paginated("circuits", self.save_circuit, "CircuitTable", "Circuits")
-        self.import_all_items_paginated("constructors", self.save_constructor, "ConstructorTable", "Constructors")
-        self.import_all_items_paginated("drivers", self.save_driver, "DriverTable", "Drivers")
+        self.import_all_items_paginated("circuits", Circuit, "CircuitTable", "Circuits")
+        self.import_all_items_paginated("constructors", Constructor, "ConstructorTable", "Constructors")
+        self.import_all_items_paginated("drivers", Driver, "DriverTable", "Drivers")
 
         # 2. Только когда все пилоты в базе, качаем результаты
-        self.import_seasons_detailed()
-
+        if kwargs['backfill']:
+            years = list(range(kwargs['from_year'] or self.FIRST_YEAR,
+                               (kwargs['to_year'] or datetime.date.today().year) + 1))
+            self.import_seasons_bulk(years)
+        else:
+            years = list(range(self.START_YEAR, self.END_YEAR))
+            self.import_seasons_detailed()
+
+        # Полнотекстовый индекс (гонки, пилоты, трассы, команды) + сигнал сайту, что данные поменялись
+        rebuild_search_fts()
+        bump_data_version()
+
+        if kwargs['warm']:
+            call_command('warm_cache', year=years, stdout=self.stdout)
+
+        self.client.close()
         self.stdout.write(self.style.SUCCESS("--- ВСЕ ДАННЫЕ УСПЕШНО ЗАГРУЖЕНЫ ---"))
 
     def get_json(self, endpoint, params=None):
-        url = f"{self.BASE_URL}/{endpoint}.json"
-        try:
-            r = requests.get(url, params=params, timeout=10)
-            r.raise_for_status()
-            return r.json()
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f"Ошибка: {e}"))
-            return None
+        return self.client.get_json(endpoint, params)
 
     # --- УНИВЕРСАЛЬНАЯ ФУНКЦИЯ ДЛЯ СКАЧИВАНИЯ СПИСКОВ ЧАСТЯМИ ---
-    def import_all_items_paginated(self, endpoint, save_func, table_key, list_key):
+    def import_all_items_paginated(self, endpoint, model, table_key, list_key):
         self.stdout.write(f"Скачивание {endpoint}...")
-        offset = 0
         limit = 100  # Качаем по 100 штук за раз
-        total_saved = 0
-
-        while True:
-            params = {'limit': limit, 'offset': offset}
-            data = self.get_json(endpoint, params)
 
-            if not data: break
+        # Первая страница говорит, сколько всего записей (MRData.total) - остальные качаем параллельно
+        first = self.get_json(endpoint, {'limit': limit, 'offset': 0})
+        if not first:
+            return
+        total = int(first['MRData'].get('total', 0))
+        pages = [first] + self.client.get_many(
+            [(endpoint, {'limit': limit, 'offset': offset}) for offset in range(limit, total, limit)])
 
+        total_saved = 0
+        totals = Counter()
+        for data in pages:
+            if not data:
+                continue
             items = data['MRData'][table_key][list_key]
-
             if not items:
-                break  # Если список пуст, значит мы скачали всё
-
-            # Сохраняем полученную пачку
-            for item in items:
-                save_func(item)
-
-            count = len(items)
-            total_saved += count
-            self.stdout.write(f"   ...загружено {count} шт. (всего {total_saved})")
-
-            if count < limit:
-                break  # Если вернулось меньше лимита, это была последняя страница
-
-            offset += limit  # Сдвигаем курсор
-            time.sleep(0.1)  # Небольшая пауза
-
-        self.stdout.write(self.style.SUCCESS(f"-> ИТОГО {endpoint}: {total_saved} записей."))
-
-    # --- ФУНКЦИИ СОХРАНЕНИЯ (То же самое, что и раньше) ---
-    def save_circuit(self, item):
-        Circuit.objects.update_or_create(
-            circuit_ref=item['circuitId'],
-            defaults={
-                'name': item['circuitName'],
-                'location': item['Location']['locality'],
-                'country': item['Location']['country'],
-                'lat': float(item['Location']['lat']),
-                'lng': float(item['Location']['long']),
-                'url': item.get('url', ''),
-            }
-        )
-
-    def save_constructor(self, item):
-        Constructor.objects.update_or_create(
-            constructor_ref=item['constructorId'],
-            defaults={
-                'name': item['name'],
-                'nationality': item['nationality'],
-                'url': item.get('url', ''),
-            }
-        )
-
-    def save_driver(self, item):
-        Driver.objects.update_or_create(
-            driver_ref=item['driverId'],
-            defaults={
-                'code': item.get('code', ''),
-                'number': int(item['permanentNumber']) if item.get('permanentNumber') else None,
-                'forename': item['givenName'],
-                'surname': item['familyName'],
-                'dob': parse_date(item['dateOfBirth']) if item.get('dateOfBirth') else None,
-                'nationality': item['nationality'],
-                'url': item.get('url', ''),
-            }
-        )
+                continue
+
+            # Сохраняем полученную пачку одним upsert
+            totals += upsert_reference(model, items)
+            total_saved += len(items)
+            self.stdout.write(f"   ...загружено {len(items)} шт. (всего {total_saved})")
+
+        self.stdout.write(self.style.SUCCESS(f"-> ИТОГО {endpoint}: {total_saved} записей ({format_report(totals)})."))
 
     # --- ИМПОРТ ГОНОК (Оставили детальный проход) ---
     def import_seasons_detailed(self):
         self.stdout.write("\nЗагрузка результатов гонок...")
 
+        # Все справочники уже в базе - загружаем их ключи один раз
+        refs = known_refs()
+
         for year in range(self.START_YEAR, self.END_YEAR):
             self.stdout.write(f"Сезон {year}...")
 
@@ -121,66 +106,73 @@ class Command(BaseCommand):
             if not schedule_data: continue
 
             races = schedule_data['MRData']['RaceTable']['Races']
+            batch = SeasonBatch(year, refs)
 
-            for race_info in races:
-                round_num = race_info['round']
-                race_name = race_info['raceName']
-
-                # Сохраняем гонку
-                circuit_ref = race_info['Circuit']['circuitId']
-                try:
-                    circuit_obj = Circuit.objects.get(pk=circuit_ref)
-                except Circuit.DoesNotExist:
-                    continue
-
-                race_obj, _ = Race.objects.update_or_create(
-                    year=int(race_info['season']),
-                    round=int(round_num),
-                    defaults={
-                        'name': race_name,
-                        'date': parse_date(race_info['date']),
-                        'circuit': circuit_obj,
-                        'url': race_info.get('url', '')
-                    }
-                )
+            # Гонки (трассы нет в базе - пропускаем)
+            races = [race_info for race_info in races if batch.add_race(race_info)]
 
-                # 2. Качаем результаты (Тут обычно <30 записей, пагинация редко нужна, но лимит 1000 ставим на всякий)
-                res_data = self.get_json(f"{year}/{round_num}/results", params={'limit': 1000})
+            # 2. Результаты всех этапов параллельно (лимит 1000 - пагинация для одной гонки не нужна)
+            responses = self.client.get_many(
+                [(f"{year}/{race_info['round']}/results", {'limit': 1000}) for race_info in races])
 
+            for race_info, res_data in zip(races, responses):
                 if not res_data or not res_data['MRData']['RaceTable']['Races']:
                     continue
 
                 results_list = res_data['MRData']['RaceTable']['Races'][0]['Results']
-
-                for res in results_list:
-                    driver_ref = res['Driver']['driverId']
-                    constructor_ref = res['Constructor']['constructorId']
-
-                    try:
-                        # ТЕПЕРЬ ЭТО СРАБОТАЕТ, так как все пилоты точно загружены выше
-                        driver_obj = Driver.objects.get(pk=driver_ref)
-                        constructor_obj = Constructor.objects.get(pk=constructor_ref)
-
-                        try:
-                            pos_int = int(res['position'])
-                        except ValueError:
-                            pos_int = None
-
-                        Result.objects.update_or_create(
-                            race=race_obj,
-                            driver=driver_obj,
-                            constructor=constructor_obj,
-                            defaults={
-                                'grid': int(res['grid']),
-                                'position': pos_int,
-                                'position_text': res['positionText'],
-                                'points': float(res['points']),
-                                'status': res['status']
-                            }
-                        )
-                    except Exception as e:
-                        # Если вдруг ошибка - выведем её, чтобы знать
-                        self.stdout.write(f"Ошибка результата: {driver_ref} в {race_name}")
-
-                self.stdout.write(f"   -> {race_name}: OK ({len(results_list)} пилотов)")
-                time.sleep(0.2)
\ No newline at end of file
+                batch.add_results(int(race_info['round']), results_list)
+
+                self.stdout.write(f"   -> {race_info['raceName']}: OK ({len(results_list)} пилотов)")
+
+            # 3. Весь сезон - одной транзакцией
+            for name, counts in batch.save().items():
+                self.stdout.write(f"   {name}: {format_report(counts)}")
+            for round_num, driver_ref, constructor_ref in batch.skipped:
+                self.stdout.write(f"Ошибка результата: {driver_ref} ({constructor_ref}) на этапе {round_num}")
+
+            self.rebuild_season(year)
+
+    # --- ИМПОРТ ВСЕЙ ИСТОРИИ: сезон целиком несколькими страницами ---
+    def fetch_season(self, year):
+        """Страницы результатов и спринтов сезона (/{year}/results вместо запроса на каждый этап)"""
+        sprint_pages = self.client.get_pages(f"{year}/sprint") if year >= self.FIRST_SPRINT_YEAR else []
+        return self.client.get_pages(f"{year}/results"), sprint_pages
+
+    def import_seasons_bulk(self, years):
+        self.stdout.write(f"\nЗагрузка результатов сезонов {years[0]}-{years[-1]}...")
+        refs = known_refs()
+
+        # Сезоны качаются параллельно (лимиты API держит общий клиент), пишутся в базу
+        # в основном потоке по мере готовности - каждый своей транзакцией
+        with ThreadPoolExecutor(max_workers=self.client.max_workers) as pool:
+            futures = {pool.submit(self.fetch_season, year): year for year in years}
+            for future in as_completed(futures):
+                year = futures[future]
+                result_pages, sprint_pages = future.result()
+                batch = SeasonBatch(year, refs)
+
+                # Протокол этапа может начаться на одной странице и закончиться на следующей
+                for pages, key, model in ((result_pages, 'Results', Result), (sprint_pages, 'SprintResults', SprintResult)):
+                    for data in filter(None, pages):
+                        for race_info in data['MRData']['RaceTable']['Races']:
+                            # Этапы берем из тех же страниц: отдельный запрос календаря не нужен
+                            if batch.add_race(race_info):
+                                batch.add_results(int(race_info['round']), race_info.get(key, []), model)
+
+                failed = sum(data is None for data in result_pages + sprint_pages)
+                report = batch.save()
+                self.stdout.write(f"Сезон {year} (запросов: {len(result_pages) + len(sprint_pages)})")
+                for name, counts in report.items():
+                    self.stdout.write(f"   {name}: {format_report(counts)}")
+                if failed:
+                    self.stdout.write(self.style.ERROR(f"   Не загружено страниц: {failed} - сезон неполный"))
+                if batch.skipped:
+                    self.stdout.write(self.style.WARNING(
+                        f"   Пропущено результатов (нет пилота/команды в базе): {len(batch.skipped)}"))
+
+                self.rebuild_season(year)
+
+    def rebuild_season(self, year):
+        # Составы и таблицы чемпионата пересчитываем только для затронутых сезонов
+        rebuild_season_entries(year)
+        rebuild_season_standings(year)
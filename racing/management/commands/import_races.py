@@ -1,15 +1,20 @@
-import requests
-import time
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
-from racing.models import Circuit, Constructor, Driver, Race, Result, SprintResult
-from django.utils.dateparse import parse_date
+from django.db import transaction
+from django.utils import timezone
+from racing.models import SprintResult
+from racing.ingest import SeasonBatch, known_refs, format_report
+from racing.jolpica import add_client_arguments, command_client
+from racing.sync import rounds_to_sync, save_round, mark_rounds_synced
+from racing.roster import rebuild_season_entries
+from racing.versioning import mark_seasons_modified
+from racing.standings import rebuild_season_standings
+from racing.fts import rebuild_search_fts
 
 
 class Command(BaseCommand):
     help = 'Импорт ТОЛЬКО гонок и результатов (для обновлений)'
 
-    BASE_URL = "http://api.jolpi.ca/ergast/f1"
-
     def add_arguments(self, parser):
         # Добавляем возможность указать год через консоль: --year 2024
         parser.add_argument(
@@ -17,114 +22,140 @@ class Command(BaseCommand):
             type=int,
             help='Укажите конкретный год для импорта (например, 2024)',
         )
+        parser.add_argument('--warm', action='store_true', help='После импорта прогреть кеш затронутых страниц')
+        parser.add_argument('--incremental', action='store_true',
+                            help='Только новые этапы и этапы в окне правок; продолжает с места сбоя')
+        add_client_arguments(parser)
 
     def handle(self, *args, **options):
-        # Если год указан в консоли - берем его. Если нет - берем диапазон по умолчанию.
+        # Если год указан в консоли - берем его. Если нет - берем диапазон по умолчанию
+        # (для --incremental - текущий сезон: его и обновляет регулярная задача)
         if options['year']:
             years = [options['year']]
             self.stdout.write(f"--- ОБНОВЛЕНИЕ РЕЗУЛЬТАТОВ ЗА {options['year']} ГОД ---")
+        elif options['incremental']:
+            years = [timezone.localdate().year]
+            self.stdout.write(f"--- СИНХРОНИЗАЦИЯ СЕЗОНА {years[0]} ---")
         else:
             years = range(2021, 2026)  # 2025 включительно
             self.stdout.write("--- ОБНОВЛЕНИЕ РЕЗУЛЬТАТОВ (2021-2025) ---")
 
-        for year in years:
-            self.import_season(year)
+        # Пилоты / команды / трассы в базе - один раз на весь импорт
+        self.refs = known_refs()
+        self.client = command_client(self, options)
+
+        # Производные таблицы и кеши пересчитываем только для сезонов, где что-то поменялось
+        changed_years = [year for year in years if self.import_season(year, options['incremental'])]
+        for year in changed_years:
+            # Составы и таблицы чемпионата пересчитываем только для затронутых сезонов
+            rebuild_season_entries(year)
+            rebuild_season_standings(year)
+
+        if changed_years:
+            # Полнотекстовый индекс (гонки, пилоты, трассы, команды) + сигнал сайту, что данные поменялись
+            # (кеш страниц и Last-Modified страниц этих сезонов, их пилотов, команд и трасс)
+            rebuild_search_fts()
+            mark_seasons_modified(changed_years)
+
+            if options['warm']:
+                call_command('warm_cache', year=changed_years, stdout=self.stdout)
+        else:
+            self.stdout.write("Данные не изменились - кеши и таблицы не трогаем.")
 
+        self.client.close()
         self.stdout.write(self.style.SUCCESS("--- ГОТОВО ---"))
 
     def get_json(self, endpoint, params=None):
-        url = f"{self.BASE_URL}/{endpoint}.json"
-        try:
-            r = requests.get(url, params=params, timeout=10)
-            r.raise_for_status()
-            return r.json()
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f"Ошибка соединения: {e}"))
-            return None
-
-    def import_season(self, year):
+        return self.client.get_json(endpoint, params)
+
+    def fetch_protocols(self, year, races):
+        """Протоколы гонок и спринтов этапов - параллельно (с учетом лимитов API).
+        -> [(race_info, results, sprint_results)], None вместо списков - запрос не удался."""
+        # API endpoint спринта: /2024/5/sprint.json (если спринта не было, вернется пустой список Races)
+        endpoints = []
+        for race_info in races:
+            endpoints += [(f"{year}/{race_info['round']}/results", {'limit': 1000}),
+                          (f"{year}/{race_info['round']}/sprint", {'limit': 1000})]
+        responses = self.client.get_many(endpoints)
+
+        protocols = []
+        for race_info, res_data, sprint_data in zip(races, responses[::2], responses[1::2]):
+            results = sprint_list = None
+            if res_data:
+                res_races = res_data['MRData']['RaceTable']['Races']
+                results = res_races[0]['Results'] if res_races else []
+            if sprint_data:
+                # Иногда структура чуть отличается, но обычно SprintResults внутри Races[0]
+                sprint_races = sprint_data['MRData']['RaceTable']['Races']
+                sprint_list = sprint_races[0].get('SprintResults', []) if sprint_races else []
+            protocols.append((race_info, results, sprint_list))
+        return protocols
+
+    def import_season(self, year, incremental=False):
+        """Загрузка сезона. True - в базе что-то изменилось."""
         self.stdout.write(f"\nЗагрузка сезона {year}...")
 
         # 1. Получаем календарь
         schedule_data = self.get_json(f"{year}", params={'limit': 100})
-        if not schedule_data: return
+        if not schedule_data: return False
 
         races = schedule_data['MRData']['RaceTable']['Races']
 
-        for race_info in races:
-            round_num = race_info['round']
-            race_name = race_info['raceName']
+        # Все строки сезона копятся в памяти и пишутся в конце одной транзакцией
+        batch = SeasonBatch(year, self.refs)
+
+        # --- А. ГОНКИ (если трассы нет в базе - пропускаем) ---
+        races = [race_info for race_info in races if batch.add_race(race_info)]
 
-            # --- А. СОХРАНЯЕМ ГОНКУ ---
-            circuit_ref = race_info['Circuit']['circuitId']
-            try:
-                circuit_obj = Circuit.objects.get(pk=circuit_ref)
-            except Circuit.DoesNotExist:
+        changed = False
+        if incremental:
+            # Календарь пишем сразу (переносы, новые этапы), дальше - только этапы, которые нужно обновить
+            changed = self.report({'Race': batch.save()['Race']})
+            races = rounds_to_sync(year, races)
+            self.stdout.write(f"   Этапов к загрузке: {len(races)}")
+
+        # --- Б. ПРОТОКОЛЫ ГОНОК И СПРИНТОВ: все выбранные этапы параллельно ---
+        synced = {}
+        for race_info, results, sprint_list in self.fetch_protocols(year, races):
+            round_num = int(race_info['round'])
+            race_name = race_info['raceName']
+            if results is None:
+                # Без контрольной точки: этап скачается при следующем запуске
+                self.stdout.write(self.style.WARNING(f"   Этап {round_num}: {race_name} - не загружен"))
                 continue
 
-            race_obj, _ = Race.objects.update_or_create(
-                year=int(race_info['season']),
-                round=int(round_num),
-                defaults={
-                    'name': race_name,
-                    'date': parse_date(race_info['date']),
-                    'circuit': circuit_obj,
-                    'url': race_info.get('url', '')
-                }
-            )
-
-            # --- Б. ОСНОВНАЯ ГОНКА (Results) ---
-            res_data = self.get_json(f"{year}/{round_num}/results", params={'limit': 1000})
-            if res_data and res_data['MRData']['RaceTable']['Races']:
-                results_list = res_data['MRData']['RaceTable']['Races'][0]['Results']
-                for res in results_list:
-                    self.save_result(res, race_obj, Result)
-
-            # --- В. СПРИНТ (SprintResults) - НОВОЕ! ---
-            # API endpoint: /2024/5/sprint.json
-            sprint_data = self.get_json(f"{year}/{round_num}/sprint", params={'limit': 1000})
-
-            # Проверяем, был ли спринт (если нет, API вернет пустой список Races)
-            if sprint_data and sprint_data['MRData']['RaceTable']['Races']:
-                # Иногда структура чуть отличается, но обычно SprintResults внутри Races[0]
-                sprint_list = sprint_data['MRData']['RaceTable']['Races'][0].get('SprintResults', [])
-
-                if sprint_list:
-                    self.stdout.write(f"   Этап {round_num}: {race_name} + СПРИНТ")
-                    for res in sprint_list:
-                        self.save_result(res, race_obj, SprintResult)
-                else:
-                    self.stdout.write(f"   Этап {round_num}: {race_name}")
+            self.stdout.write(f"   Этап {round_num}: {race_name}" + (" + СПРИНТ" if sprint_list else ""))
+            if sprint_list is None:
+                # Результаты гонки все равно пишем; без отметки синхронизации спринт перекачается в следующий раз
+                self.stdout.write(self.style.WARNING("      спринт не загружен"))
+            if incremental:
+                # Каждый этап - своя транзакция с отметкой в RoundSync: после сбоя продолжим с этого места
+                report = save_round(year, self.refs, race_info, results, sprint_list)
+                changed = self.report(report, indent='      ') or changed
+                if report is None:
+                    self.stdout.write("      без изменений")
             else:
-                self.stdout.write(f"   Этап {round_num}: {race_name}")
-
-            time.sleep(0.2)
-
-        # Вспомогательная функция, чтобы не дублировать код сохранения
-
-    def save_result(self, res, race_obj, model_class):
-        try:
-            driver_ref = res['Driver']['driverId']
-            constructor_ref = res['Constructor']['constructorId']
-            driver_obj = Driver.objects.get(pk=driver_ref)
-            constructor_obj = Constructor.objects.get(pk=constructor_ref)
-
-            try:
-                pos_int = int(res['position'])
-            except ValueError:
-                pos_int = None
-
-            model_class.objects.update_or_create(
-                race=race_obj,
-                driver=driver_obj,
-                constructor=constructor_obj,
-                defaults={
-                    'grid': int(res['grid']),
-                    'position': pos_int,
-                    'position_text': res['positionText'],
-                    'points': float(res['points']),
-                    'status': res['status']
-                }
-            )
-        except Exception:
-            pass
\ No newline at end of file
+                batch.add_results(round_num, results)
+                if sprint_list is not None:
+                    batch.add_results(round_num, sprint_list, SprintResult)
+                    synced[round_num] = (results, sprint_list)
+
+        # --- В. ЗАПИСЬ СЕЗОНА: одна транзакция, bulk upsert (+ отметки синхронизации этапов) ---
+        if not incremental:
+            with transaction.atomic():
+                report = batch.save()
+                mark_rounds_synced(year, synced)
+            changed = self.report(report)
+
+        if batch.skipped:
+            self.stdout.write(self.style.WARNING(
+                f"   Пропущено результатов (нет пилота/команды в базе): {len(batch.skipped)}"))
+        return changed
+
+    def report(self, report, indent='   '):
+        """Печать отчета upsert. True - есть новые или измененные строки."""
+        if not report:
+            return False
+        for name, counts in report.items():
+            self.stdout.write(f"{indent}{name}: {format_report(counts)}")
+        return any(counts['inserted'] or counts['updated'] for counts in report.values())
@@ -1,16 +1,19 @@
-import requests
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.utils.dateparse import parse_datetime, parse_time, parse_date
 from racing.models import Race, Circuit
+from racing.fts import rebuild_search_fts
+from racing.jolpica import add_client_arguments, command_client
+from racing.versioning import mark_seasons_modified
 
 
 class Command(BaseCommand):
     help = 'Импорт расписания (Практики, Квалификации) без результатов'
 
-    BASE_URL = "http://api.jolpi.ca/ergast/f1"
-
     def add_arguments(self, parser):
         parser.add_argument('--year', type=int, help='Конкретный год')
+        parser.add_argument('--warm', action='store_true', help='После импорта прогреть кеш затронутых страниц')
+        add_client_arguments(parser)
 
     def handle(self, *args, **options):
         # Если год не указан, берем текущий и следующий (на всякий случай)
@@ -20,20 +23,23 @@ class Command(BaseCommand):
             years = [2024, 2025]
 
         self.stdout.write(f"--- ИМПОРТ РАСПИСАНИЯ ДЛЯ: {years} ---")
+        self.client = command_client(self, options)
 
         for year in years:
             self.import_year_schedule(year)
 
+        # Новые этапы календаря сразу попадают в полнотекстовый поиск; кеш страниц сбрасывается
+        rebuild_search_fts()
+        mark_seasons_modified(years)
+
+        if options['warm']:
+            call_command('warm_cache', year=years, stdout=self.stdout)
+
+        self.client.close()
         self.stdout.write(self.style.SUCCESS("--- ГОТОВО ---"))
 
     def get_json(self, endpoint):
-        try:
-            r = requests.get(f"{self.BASE_URL}/{endpoint}", timeout=10)
-            r.raise_for_status()
-            return r.json()
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f"Ошибка API: {e}"))
-            return None
+        return self.client.get_json(endpoint)
 
     def combine_date_time(self, session_data):
         """Склеивает дату и время из API в формат datetime для Django"""
@@ -3,6 +3,7 @@ from bs4 import BeautifulSoup
 from django.core.management.base import BaseCommand
 from django.core.files.base import ContentFile
 from racing.models import Constructor
+from racing.versioning import bump_data_version
 
 
 class Command(BaseCommand):
@@ -102,4 +103,7 @@ class Command(BaseCommand):
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f" Ошибка: {e}"))
 
+        # Данные поменялись - кеш страниц и индексы поиска пересоберутся
+        bump_data_version()
+
         self.stdout.write(self.style.SUCCESS(f"--- ИТОГ: Загружено {success_count} новых лого ---"))
\ No newline at end of file
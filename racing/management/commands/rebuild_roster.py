@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from racing.roster import rebuild_season_entries, rebuild_all_entries
+from racing.versioning import mark_seasons_modified
+
+
+class Command(BaseCommand):
+    help = 'Пересчет составов сезонов (пилот - команда - этапы) из результатов в базе'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Пересчитать только один сезон')
+
+    def handle(self, *args, **options):
+        if options['year']:
+            summary = {options['year']: rebuild_season_entries(options['year'])}
+        else:
+            self.stdout.write("--- ПЕРЕСЧЕТ СОСТАВОВ ВСЕХ СЕЗОНОВ ---")
+            summary = rebuild_all_entries()
+
+        for year, count in summary.items():
+            self.stdout.write(f"   {year}: записей {count}")
+
+        # Данные пересчитанных сезонов поменялись - кеш страниц и Last-Modified обновятся
+        mark_seasons_modified(summary)
+
+        self.stdout.write(self.style.SUCCESS(f"--- ГОТОВО. Пересчитано сезонов: {len(summary)} ---"))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from racing.fts import is_available, rebuild_search_fts
+from racing.versioning import bump_data_version
+
+
+class Command(BaseCommand):
+    help = 'Пересборка полнотекстового индекса поиска (SQLite FTS5)'
+
+    def handle(self, *args, **options):
+        if not is_available():
+            self.stdout.write(self.style.WARNING("FTS5 доступен только для SQLite - пропускаем"))
+            return
+
+        count = rebuild_search_fts()
+        # Данные поменялись - кеш страниц и индексы поиска пересоберутся
+        bump_data_version()
+
+        self.stdout.write(self.style.SUCCESS(f"--- ГОТОВО. Записей в индексе: {count} ---"))
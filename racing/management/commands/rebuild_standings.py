@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from racing.standings import rebuild_season_standings, rebuild_all_standings
+from racing.versioning import mark_seasons_modified
+
+
+class Command(BaseCommand):
+    help = 'Пересчет сохраненных таблиц чемпионата (пилоты и конструкторы) из результатов в базе'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Пересчитать только один сезон')
+
+    def handle(self, *args, **options):
+        if options['year']:
+            summary = {options['year']: rebuild_season_standings(options['year'])}
+        else:
+            self.stdout.write("--- ПЕРЕСЧЕТ ВСЕХ СЕЗОНОВ ---")
+            summary = rebuild_all_standings()
+
+        for year, (drivers_count, teams_count) in summary.items():
+            self.stdout.write(f"   {year}: пилотов {drivers_count}, команд {teams_count}")
+
+        # Данные пересчитанных сезонов поменялись - кеш страниц и Last-Modified обновятся
+        mark_seasons_modified(summary)
+
+        self.stdout.write(self.style.SUCCESS(f"--- ГОТОВО. Пересчитано сезонов: {len(summary)} ---"))
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from racing.models import Constructor
+from racing.versioning import bump_data_version
 
 
 class Command(BaseCommand):
@@ -35,4 +36,7 @@ class Command(BaseCommand):
                 team.save()
                 count += 1
 
+        # Данные поменялись - кеш страниц и индексы поиска пересоберутся
+        bump_data_version()
+
         self.stdout.write(self.style.SUCCESS(f"Раскрашено команд: {count}"))
\ No newline at end of file
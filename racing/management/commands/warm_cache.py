@@ -0,0 +1,74 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.http import Http404
+from django.test import RequestFactory
+from django.urls import resolve
+from racing.models import Race
+from racing.page_cache import page_cache_is_shared, site_urls, season_urls
+
+logger = logging.getLogger(__name__)
+
+
+def render_url(path):
+    """Рендер одной страницы через view (вместе с version_cache_page) -> (имя view, статус, секунды)"""
+    match = resolve(path)
+    request = RequestFactory().get(path)
+    started = time.perf_counter()
+    try:
+        response = match.func(request, *match.args, **match.kwargs)
+        status = response.status_code
+    except Http404:
+        status = 404
+    except Exception:
+        logger.exception("Ошибка рендера %s", path)
+        status = 500
+    finally:
+        # У каждого потока свое соединение с БД - закрываем, чтобы не копились
+        connections.close_all()
+    return match.url_name, status, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = 'Прогрев кеша страниц после импорта: рендерит затронутые страницы в пуле потоков'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, action='append', help='Сезон (можно несколько раз)')
+        parser.add_argument('--all', action='store_true', help='Все сезоны')
+        parser.add_argument('--workers', type=int, default=4, help='Потоков рендера')
+
+    def handle(self, *args, **options):
+        if not page_cache_is_shared():
+            # Страницы легли бы в память этой команды и пропали вместе с ней - не тратим время
+            self.stdout.write(self.style.WARNING(
+                "Кеш страниц в памяти процесса (locmem): прогрев пропущен, веб-сервер его не увидит. "
+                "Для прогрева нужен RACING_PAGE_CACHE=file или redis."))
+            return
+
+        if options['all']:
+            years = Race.objects.values_list('year', flat=True).distinct()
+        else:
+            years = options['year'] or []
+        urls = site_urls() + season_urls(years)
+
+        self.stdout.write(f"--- ПРОГРЕВ КЕША: {len(urls)} страниц, потоков {options['workers']} ---")
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            results = list(pool.map(render_url, urls))
+        total = time.perf_counter() - started
+
+        # Отчет по view: сколько страниц, суммарное / среднее / максимальное время
+        stats = {}
+        errors = 0
+        for name, status, seconds in results:
+            stats.setdefault(name, []).append(seconds)
+            errors += status != 200
+        for name, times in sorted(stats.items(), key=lambda item: -sum(item[1])):
+            self.stdout.write(f"   {name:22} {len(times):5} стр.  всего {sum(times):7.2f}s  "
+                              f"среднее {sum(times) / len(times) * 1000:7.1f}ms  макс {max(times) * 1000:7.1f}ms")
+
+        if errors:
+            self.stdout.write(self.style.WARNING(f"Страниц с ошибкой (не 200): {errors}"))
+        self.stdout.write(self.style.SUCCESS(f"--- ГОТОВО за {total:.1f}s ---"))
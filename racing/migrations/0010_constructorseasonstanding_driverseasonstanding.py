@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('racing', '0009_driver_photo_cutout'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConstructorSeasonStanding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField(verbose_name='Сезон (Год)')),
+                ('position', models.IntegerField(verbose_name='Место в чемпионате')),
+                ('points', models.FloatField(default=0, verbose_name='Очки (Гонки + Спринты)')),
+                ('wins', models.IntegerField(default=0, verbose_name='Победы')),
+                ('podiums', models.IntegerField(default=0, verbose_name='Подиумы')),
+                ('poles', models.IntegerField(default=0, verbose_name='Поулы')),
+                ('dnfs', models.IntegerField(default=0, verbose_name='Сходы')),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='season_standings', to='racing.constructor', verbose_name='Команда')),
+            ],
+            options={
+                'verbose_name': 'Кубок конструкторов (сезон)',
+                'verbose_name_plural': 'Кубок конструкторов (сезоны)',
+                'ordering': ['-year', 'position'],
+                'indexes': [models.Index(fields=['year', 'position'], name='team_standing_year_pos_idx')],
+                'constraints': [models.UniqueConstraint(fields=('year', 'team'), name='uniq_constructor_season_standing')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DriverSeasonStanding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField(verbose_name='Сезон (Год)')),
+                ('position', models.IntegerField(verbose_name='Место в чемпионате')),
+                ('points', models.FloatField(default=0, verbose_name='Очки (Гонки + Спринты)')),
+                ('wins', models.IntegerField(default=0, verbose_name='Победы')),
+                ('podiums', models.IntegerField(default=0, verbose_name='Подиумы')),
+                ('poles', models.IntegerField(default=0, verbose_name='Поулы')),
+                ('dnfs', models.IntegerField(default=0, verbose_name='Сходы')),
+                ('driver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='season_standings', to='racing.driver', verbose_name='Пилот')),
+                ('team', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='racing.constructor', verbose_name='Команда (последняя в сезоне)')),
+            ],
+            options={
+                'verbose_name': 'Зачет пилотов (сезон)',
+                'verbose_name_plural': 'Зачет пилотов (сезоны)',
+                'ordering': ['-year', 'position'],
+                'indexes': [models.Index(fields=['year', 'position'], name='driver_standing_year_pos_idx')],
+                'constraints': [models.UniqueConstraint(fields=('year', 'driver'), name='uniq_driver_season_standing')],
+            },
+        ),
+    ]
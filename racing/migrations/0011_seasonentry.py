@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_season_entries(apps, schema_editor):
+    # Первичное заполнение составов из уже загруженных результатов
+    SeasonEntry = apps.get_model('racing', 'SeasonEntry')
+    rounds = {}
+    for model_name in ('Result', 'SprintResult'):
+        model_class = apps.get_model('racing', model_name)
+        rows = model_class.objects.values_list('race__year', 'driver', 'constructor', 'race__round')
+        for year, driver_id, constructor_id, round_num in rows.iterator():
+            rounds.setdefault((year, driver_id, constructor_id), set()).add(round_num)
+
+    SeasonEntry.objects.bulk_create([
+        SeasonEntry(year=year, driver_id=driver_id, constructor_id=constructor_id,
+                    first_round=min(r), last_round=max(r), races=len(r))
+        for (year, driver_id, constructor_id), r in rounds.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('racing', '0010_constructorseasonstanding_driverseasonstanding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeasonEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField(verbose_name='Сезон (Год)')),
+                ('first_round', models.IntegerField(verbose_name='Первый этап')),
+                ('last_round', models.IntegerField(verbose_name='Последний этап')),
+                ('races', models.IntegerField(default=0, verbose_name='Гонок за команду')),
+                ('constructor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='season_entries', to='racing.constructor', verbose_name='Команда')),
+                ('driver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='season_entries', to='racing.driver', verbose_name='Пилот')),
+            ],
+            options={
+                'verbose_name': 'Участие в сезоне',
+                'verbose_name_plural': 'Составы сезонов',
+                'ordering': ['-year', 'first_round'],
+                'indexes': [models.Index(fields=['year', 'last_round'], name='season_entry_year_last_idx')],
+                'constraints': [models.UniqueConstraint(fields=('year', 'driver', 'constructor'), name='uniq_season_entry')],
+            },
+        ),
+        migrations.RunPython(fill_season_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+from django.db import migrations
+
+# Схема и наполнение - копия racing/fts.py на момент миграции: модуль может меняться,
+# а миграция должна давать ту же таблицу, что и при первом применении
+PREFIX_TABLE = 'racing_search_prefix'
+TRIGRAM_TABLE = 'racing_search_trigram'
+
+CREATE_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {PREFIX_TABLE} USING fts5(
+        kind UNINDEXED, ref UNINDEXED, year UNINDEXED, title, details,
+        prefix='2 3 4', tokenize='unicode61 remove_diacritics 2')""",
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TRIGRAM_TABLE} USING fts5(
+        kind UNINDEXED, ref UNINDEXED, year UNINDEXED, title, details,
+        tokenize='trigram')""",
+]
+
+SOURCE_SQL = """
+    SELECT 'race', r.id, r.year, r.name, c.name || ' ' || c.location || ' ' || c.country
+      FROM racing_race r JOIN racing_circuit c ON c.circuit_ref = r.circuit_id
+    UNION ALL
+    SELECT 'driver', d.driver_ref, NULL, d.forename || ' ' || d.surname, d.code
+      FROM racing_driver d
+    UNION ALL
+    SELECT 'circuit', c.circuit_ref, NULL, c.name, c.location || ' ' || c.country
+      FROM racing_circuit c
+    UNION ALL
+    SELECT 'constructor', t.constructor_ref, NULL, t.name, ''
+      FROM racing_constructor t
+"""
+
+
+def create_search_fts(apps, schema_editor):
+    # Виртуальные таблицы FTS5 есть только в SQLite; на других базах поиск работает без них
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+    for table in (PREFIX_TABLE, TRIGRAM_TABLE):
+        schema_editor.execute(f"DELETE FROM {table}")
+        schema_editor.execute(f"INSERT INTO {table} (kind, ref, year, title, details) {SOURCE_SQL}")
+
+
+def drop_search_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in (PREFIX_TABLE, TRIGRAM_TABLE):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('racing', '0012_dataversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_fts, drop_search_fts),
+    ]
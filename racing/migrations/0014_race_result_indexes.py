@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('racing', '0013_search_fts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['position', 'race', 'driver'], name='result_winner_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['driver', 'race'], name='result_driver_race_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['constructor', 'race'], name='result_team_race_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sprintresult',
+            index=models.Index(fields=['driver', 'race'], name='sprint_driver_race_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sprintresult',
+            index=models.Index(fields=['constructor', 'race'], name='sprint_team_race_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='race',
+            constraint=models.UniqueConstraint(fields=('year', 'round'), name='uniq_race_year_round'),
+        ),
+        migrations.AddConstraint(
+            model_name='result',
+            constraint=models.UniqueConstraint(fields=('race', 'driver', 'constructor'), name='uniq_result_race_driver_team'),
+        ),
+        migrations.AddConstraint(
+            model_name='sprintresult',
+            constraint=models.UniqueConstraint(fields=('race', 'driver', 'constructor'), name='uniq_sprint_race_driver_team'),
+        ),
+    ]
@@ -0,0 +1,106 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_year_round(apps, schema_editor):
+    # Одним UPDATE на таблицу: сезон и этап из связанной гонки
+    Race = apps.get_model('racing', 'Race')
+    for name in ('Result', 'SprintResult'):
+        race = Race.objects.filter(pk=OuterRef('race'))
+        apps.get_model('racing', name).objects.update(
+            year=Subquery(race.values('year')[:1]),
+            round=Subquery(race.values('round')[:1]),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('racing', '0014_race_result_indexes'),
+    ]
+
+    operations = [
+        # 1. Колонки (пока nullable), 2. заполнение из гонок, 3. NOT NULL
+        migrations.AddField(
+            model_name='result',
+            name='year',
+            field=models.IntegerField(editable=False, null=True, verbose_name='Сезон (Год)'),
+        ),
+        migrations.AddField(
+            model_name='result',
+            name='round',
+            field=models.IntegerField(editable=False, null=True, verbose_name='Этап'),
+        ),
+        migrations.AddField(
+            model_name='sprintresult',
+            name='year',
+            field=models.IntegerField(editable=False, null=True, verbose_name='Сезон (Год)'),
+        ),
+        migrations.AddField(
+            model_name='sprintresult',
+            name='round',
+            field=models.IntegerField(editable=False, null=True, verbose_name='Этап'),
+        ),
+        migrations.RunPython(backfill_year_round, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='result',
+            name='year',
+            field=models.IntegerField(editable=False, verbose_name='Сезон (Год)'),
+        ),
+        migrations.AlterField(
+            model_name='result',
+            name='round',
+            field=models.IntegerField(editable=False, verbose_name='Этап'),
+        ),
+        migrations.AlterField(
+            model_name='sprintresult',
+            name='year',
+            field=models.IntegerField(editable=False, verbose_name='Сезон (Год)'),
+        ),
+        migrations.AlterField(
+            model_name='sprintresult',
+            name='round',
+            field=models.IntegerField(editable=False, verbose_name='Этап'),
+        ),
+        # Индексы по (driver, race) / (constructor, race) заменяются индексами по сезону
+        migrations.RemoveIndex(
+            model_name='result',
+            name='result_driver_race_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='result',
+            name='result_team_race_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='sprintresult',
+            name='sprint_driver_race_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='sprintresult',
+            name='sprint_team_race_idx',
+        ),
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['year', 'round'], name='result_year_round_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['driver', 'year'], name='result_driver_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['constructor', 'year'], name='result_team_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sprintresult',
+            index=models.Index(fields=['year', 'round'], name='sprint_year_round_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sprintresult',
+            index=models.Index(fields=['driver', 'year'], name='sprint_driver_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sprintresult',
+            index=models.Index(fields=['constructor', 'year'], name='sprint_team_year_idx'),
+        ),
+    ]
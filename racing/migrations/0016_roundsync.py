@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('racing', '0015_result_year_round'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoundSync',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField(verbose_name='Сезон (Год)')),
+                ('round', models.IntegerField(verbose_name='Этап')),
+                ('fetched_at', models.DateTimeField(verbose_name='Загружено')),
+                ('results', models.IntegerField(default=0, verbose_name='Строк результатов')),
+                ('sprint_results', models.IntegerField(default=0, verbose_name='Строк спринта')),
+                ('content_hash', models.CharField(blank=True, max_length=40, verbose_name='Хеш протоколов')),
+            ],
+            options={
+                'verbose_name': 'Синхронизация этапа',
+                'verbose_name_plural': 'Синхронизация этапов',
+                'ordering': ['-year', 'round'],
+                'constraints': [models.UniqueConstraint(fields=('year', 'round'), name='uniq_round_sync')],
+            },
+        ),
+    ]
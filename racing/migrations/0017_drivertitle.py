@@ -0,0 +1,29 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Таблица создается пустой: титулы (с очками в зачет) пишет только calc_champions,
+# до его запуска быстрые ответы берут лидера сезона по сумме очков
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('racing', '0016_roundsync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriverTitle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField(unique=True, verbose_name='Сезон (Год)')),
+                ('points', models.FloatField(blank=True, null=True, verbose_name='Очки в зачет')),
+                ('driver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='titles', to='racing.driver', verbose_name='Пилот')),
+            ],
+            options={
+                'verbose_name': 'Титул чемпиона мира',
+                'verbose_name_plural': 'Титулы чемпионов мира',
+                'ordering': ['-year'],
+            },
+        ),
+    ]
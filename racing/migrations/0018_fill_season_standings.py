@@ -0,0 +1,77 @@
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+
+# Та же классификация, что и racing.standings на момент миграции (модуль может меняться):
+# сход = текстовая позиция не число, кроме дисквалификации 'D'; места - по очкам, затем по победам
+DNF_FILTER = ~Q(position_text__regex=r'^\d+$') & ~Q(position_text='D')
+STAT_FIELDS = ('points', 'wins', 'podiums', 'poles', 'dnfs')
+
+
+def _totals(apps, key, years):
+    """{(год, key): {очки, победы, ...}} для всех сезонов years - по одному GROUP BY на гонки и спринты"""
+    Result = apps.get_model('racing', 'Result')
+    SprintResult = apps.get_model('racing', 'SprintResult')
+    totals = {}
+    rows = Result.objects.filter(year__in=years).values('year', key).annotate(
+        points=Sum('points'),
+        wins=Count('id', filter=Q(position=1)),
+        podiums=Count('id', filter=Q(position__lte=3)),
+        poles=Count('id', filter=Q(grid=1)),
+        dnfs=Count('id', filter=DNF_FILTER),
+    ).order_by()
+    for row in rows:
+        totals[(row['year'], row[key])] = {f: row[f] or 0 for f in STAT_FIELDS}
+    for row in SprintResult.objects.filter(year__in=years).values('year', key).annotate(points=Sum('points')).order_by():
+        item = totals.setdefault((row['year'], row[key]), dict.fromkeys(STAT_FIELDS, 0))
+        item['points'] += row['points'] or 0
+    return totals
+
+
+def _ranked(totals):
+    by_year = {}
+    for (year, ref), item in totals.items():
+        by_year.setdefault(year, []).append((ref, item))
+    for year, rows in by_year.items():
+        rows.sort(key=lambda row: (row[1]['points'], row[1]['wins']), reverse=True)
+        for position, (ref, item) in enumerate(rows, start=1):
+            yield year, position, ref, item
+
+
+def fill_season_standings(apps, schema_editor):
+    # Таблицы из 0010 создавались пустыми: заполняем сезоны, которые еще никто не пересчитал
+    Race = apps.get_model('racing', 'Race')
+    SeasonEntry = apps.get_model('racing', 'SeasonEntry')
+    DriverSeasonStanding = apps.get_model('racing', 'DriverSeasonStanding')
+    ConstructorSeasonStanding = apps.get_model('racing', 'ConstructorSeasonStanding')
+
+    done = set(DriverSeasonStanding.objects.values_list('year', flat=True))
+    years = set(Race.objects.values_list('year', flat=True)) - done
+    if not years:
+        return
+
+    # Команда пилота - последняя в сезоне
+    teams = {}
+    for year, driver_id, constructor_id in SeasonEntry.objects.filter(year__in=years) \
+            .order_by('last_round').values_list('year', 'driver', 'constructor'):
+        teams[(year, driver_id)] = constructor_id
+
+    DriverSeasonStanding.objects.bulk_create([
+        DriverSeasonStanding(year=year, position=position, driver_id=driver_id,
+                             team_id=teams.get((year, driver_id)), **item)
+        for year, position, driver_id, item in _ranked(_totals(apps, 'driver', years))
+    ], batch_size=500)
+    ConstructorSeasonStanding.objects.bulk_create([
+        ConstructorSeasonStanding(year=year, position=position, team_id=team_id, **item)
+        for year, position, team_id, item in _ranked(_totals(apps, 'constructor', years))
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('racing', '0017_drivertitle'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_season_standings, migrations.RunPython.noop),
+    ]
@@ -96,10 +96,28 @@ class Race(models.Model):
     def __str__(self):
         return f"{self.year} {self.name}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Результаты хранят копию сезона и этапа - поправляем, если гонку перенесли (админка, импорт)
+        for related in (self.results, self.sprint_results):
+            related.exclude(year=self.year, round=self.round).update(year=self.year, round=self.round)
+
     class Meta:
         verbose_name = "Гонка"
         verbose_name_plural = "Гонки"
         ordering = ['-year', 'round']  # Сортировка: сначала новые
+        constraints = [
+            # Заодно индекс для фильтров по сезону (year) и сортировки по этапам
+            models.UniqueConstraint(fields=['year', 'round'], name='uniq_race_year_round'),
+        ]
+
+
+def _copy_race_fields(result):
+    # Сезон и этап берем из гонки, если гонка уже загружена (админка) или поля не заполнены.
+    # Импорт передает их сам - без лишнего запроса гонки на каждый результат
+    race_field = result._meta.get_field('race')
+    if race_field.is_cached(result) or result.year is None or result.round is None:
+        result.year, result.round = result.race.year, result.race.round
 
 
 # --- 5. РЕЗУЛЬТАТЫ (Results) - Главная связующая таблица ---
@@ -108,6 +126,10 @@ class Result(models.Model):
     driver = models.ForeignKey(Driver, on_delete=models.CASCADE, related_name='results', verbose_name="Пилот")
     constructor = models.ForeignKey(Constructor, on_delete=models.CASCADE, verbose_name="Команда")
 
+    # Копия race.year / race.round: запросы по сезону идут по одной таблице, без JOIN с гонками
+    year = models.IntegerField(editable=False, verbose_name="Сезон (Год)")
+    round = models.IntegerField(editable=False, verbose_name="Этап")
+
     grid = models.IntegerField(verbose_name="Старт")
     position = models.IntegerField(null=True, verbose_name="Финиш (место)")
     position_text = models.CharField(max_length=10, verbose_name="Финиш (текст)", help_text="R для схода")
@@ -117,9 +139,26 @@ class Result(models.Model):
     def __str__(self):
         return f"{self.race} - {self.driver} ({self.position})"
 
+    def save(self, *args, **kwargs):
+        _copy_race_fields(self)
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Результат"
         verbose_name_plural = "Результаты"
+        constraints = [
+            # Не (race, driver): в 50-60-х пилот мог стартовать в одной гонке за две команды.
+            # Тот же ключ, что у update_or_create в импорте
+            models.UniqueConstraint(fields=['race', 'driver', 'constructor'], name='uniq_result_race_driver_team'),
+        ]
+        indexes = [
+            # Победители (position=1): гонка и пилот берутся прямо из индекса
+            models.Index(fields=['position', 'race', 'driver'], name='result_winner_idx'),
+            # Сезон целиком (таблицы чемпионата, составы) и пилот / команда за сезон
+            models.Index(fields=['year', 'round'], name='result_year_round_idx'),
+            models.Index(fields=['driver', 'year'], name='result_driver_year_idx'),
+            models.Index(fields=['constructor', 'year'], name='result_team_year_idx'),
+        ]
 
 
 # --- 6. РЕЗУЛЬТАТЫ СПРИНТОВ (Новая таблица) ---
@@ -129,6 +168,9 @@ class SprintResult(models.Model):
     driver = models.ForeignKey(Driver, on_delete=models.CASCADE, related_name='sprint_results', verbose_name="Пилот")
     constructor = models.ForeignKey(Constructor, on_delete=models.CASCADE, verbose_name="Команда")
 
+    year = models.IntegerField(editable=False, verbose_name="Сезон (Год)")
+    round = models.IntegerField(editable=False, verbose_name="Этап")
+
     grid = models.IntegerField(verbose_name="Старт")
     position = models.IntegerField(null=True, verbose_name="Финиш (место)")
     position_text = models.CharField(max_length=10, verbose_name="Финиш (текст)", help_text="R для схода")
@@ -138,6 +180,151 @@ class SprintResult(models.Model):
     def __str__(self):
         return f"Sprint {self.race} - {self.driver}"
 
+    def save(self, *args, **kwargs):
+        _copy_race_fields(self)
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Результат Спринта"
-        verbose_name_plural = "Результаты Спринтов"
\ No newline at end of file
+        verbose_name_plural = "Результаты Спринтов"
+        constraints = [
+            models.UniqueConstraint(fields=['race', 'driver', 'constructor'], name='uniq_sprint_race_driver_team'),
+        ]
+        indexes = [
+            models.Index(fields=['year', 'round'], name='sprint_year_round_idx'),
+            models.Index(fields=['driver', 'year'], name='sprint_driver_year_idx'),
+            models.Index(fields=['constructor', 'year'], name='sprint_team_year_idx'),
+        ]
+
+# --- 7. СОСТАВЫ СЕЗОНА (кто за кого выступал; пересчитывается импортом, см. racing/roster.py) ---
+class SeasonEntry(models.Model):
+    year = models.IntegerField(verbose_name="Сезон (Год)")
+    driver = models.ForeignKey(Driver, on_delete=models.CASCADE, related_name='season_entries', verbose_name="Пилот")
+    constructor = models.ForeignKey(Constructor, on_delete=models.CASCADE, related_name='season_entries',
+                                    verbose_name="Команда")
+
+    first_round = models.IntegerField(verbose_name="Первый этап")
+    last_round = models.IntegerField(verbose_name="Последний этап")
+    races = models.IntegerField(default=0, verbose_name="Гонок за команду")
+
+    def __str__(self):
+        return f"{self.year} {self.driver} - {self.constructor}"
+
+    class Meta:
+        verbose_name = "Участие в сезоне"
+        verbose_name_plural = "Составы сезонов"
+        ordering = ['-year', 'first_round']
+        constraints = [
+            models.UniqueConstraint(fields=['year', 'driver', 'constructor'], name='uniq_season_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['year', 'last_round'], name='season_entry_year_last_idx'),
+        ]
+
+
+# --- 8. ИТОГОВЫЕ ТАБЛИЦЫ СЕЗОНА (Пересчитываются импортом, см. racing/standings.py) ---
+class DriverSeasonStanding(models.Model):
+    year = models.IntegerField(verbose_name="Сезон (Год)")
+    driver = models.ForeignKey(Driver, on_delete=models.CASCADE, related_name='season_standings', verbose_name="Пилот")
+    team = models.ForeignKey(Constructor, on_delete=models.SET_NULL, null=True, blank=True,
+                             related_name='+', verbose_name="Команда (последняя в сезоне)")
+
+    position = models.IntegerField(verbose_name="Место в чемпионате")
+    points = models.FloatField(default=0, verbose_name="Очки (Гонки + Спринты)")
+    wins = models.IntegerField(default=0, verbose_name="Победы")
+    podiums = models.IntegerField(default=0, verbose_name="Подиумы")
+    poles = models.IntegerField(default=0, verbose_name="Поулы")
+    dnfs = models.IntegerField(default=0, verbose_name="Сходы")
+
+    def __str__(self):
+        return f"{self.year} P{self.position} {self.driver}"
+
+    class Meta:
+        verbose_name = "Зачет пилотов (сезон)"
+        verbose_name_plural = "Зачет пилотов (сезоны)"
+        ordering = ['-year', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['year', 'driver'], name='uniq_driver_season_standing'),
+        ]
+        indexes = [
+            models.Index(fields=['year', 'position'], name='driver_standing_year_pos_idx'),
+        ]
+
+
+class ConstructorSeasonStanding(models.Model):
+    year = models.IntegerField(verbose_name="Сезон (Год)")
+    team = models.ForeignKey(Constructor, on_delete=models.CASCADE, related_name='season_standings',
+                             verbose_name="Команда")
+
+    position = models.IntegerField(verbose_name="Место в чемпионате")
+    points = models.FloatField(default=0, verbose_name="Очки (Гонки + Спринты)")
+    wins = models.IntegerField(default=0, verbose_name="Победы")
+    podiums = models.IntegerField(default=0, verbose_name="Подиумы")
+    poles = models.IntegerField(default=0, verbose_name="Поулы")
+    dnfs = models.IntegerField(default=0, verbose_name="Сходы")
+
+    def __str__(self):
+        return f"{self.year} P{self.position} {self.team}"
+
+    class Meta:
+        verbose_name = "Кубок конструкторов (сезон)"
+        verbose_name_plural = "Кубок конструкторов (сезоны)"
+        ordering = ['-year', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['year', 'team'], name='uniq_constructor_season_standing'),
+        ]
+        indexes = [
+            models.Index(fields=['year', 'position'], name='team_standing_year_pos_idx'),
+        ]
+
+
+
+# --- 9. ВЕРСИЯ ДАННЫХ (увеличивается импортами; по ней сбрасываются кеши и индексы в памяти) ---
+class DataVersion(models.Model):
+    key = models.SlugField(primary_key=True, verbose_name="Ключ")
+    version = models.PositiveIntegerField(default=0, verbose_name="Версия")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновлено")
+
+    def __str__(self):
+        return f"{self.key}: v{self.version}"
+
+    class Meta:
+        verbose_name = "Версия данных"
+        verbose_name_plural = "Версии данных"
+
+
+# --- 10. СОСТОЯНИЕ СИНХРОНИЗАЦИИ ЭТАПОВ (import_races --incremental, см. racing/sync.py) ---
+class RoundSync(models.Model):
+    year = models.IntegerField(verbose_name="Сезон (Год)")
+    round = models.IntegerField(verbose_name="Этап")
+    fetched_at = models.DateTimeField(verbose_name="Загружено")
+    results = models.IntegerField(default=0, verbose_name="Строк результатов")
+    sprint_results = models.IntegerField(default=0, verbose_name="Строк спринта")
+    content_hash = models.CharField(max_length=40, blank=True, verbose_name="Хеш протоколов")
+
+    def __str__(self):
+        return f"{self.year} R{self.round}: {self.results}+{self.sprint_results}"
+
+    class Meta:
+        verbose_name = "Синхронизация этапа"
+        verbose_name_plural = "Синхронизация этапов"
+        ordering = ['-year', 'round']
+        constraints = [
+            models.UniqueConstraint(fields=['year', 'round'], name='uniq_round_sync'),
+        ]
+
+
+# --- 11. ЧЕМПИОНЫ МИРА (официальные, из calc_champions) ---
+# В старых сезонах в зачет шли только лучшие результаты: чемпион не всегда лидер по сумме очков (1964, 1988)
+class DriverTitle(models.Model):
+    year = models.IntegerField(unique=True, verbose_name="Сезон (Год)")
+    driver = models.ForeignKey(Driver, on_delete=models.CASCADE, related_name='titles', verbose_name="Пилот")
+    points = models.FloatField(null=True, blank=True, verbose_name="Очки в зачет")
+
+    def __str__(self):
+        return f"{self.year}: {self.driver}"
+
+    class Meta:
+        verbose_name = "Титул чемпиона мира"
+        verbose_name_plural = "Титулы чемпионов мира"
+        ordering = ['-year']
@@ -0,0 +1,179 @@
+import hashlib
+from datetime import date, datetime, time
+from functools import wraps
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import caches
+from django.urls import reverse, resolve
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from .models import Circuit, Constructor, Driver, Race, SeasonEntry
+from .versioning import SEASONS_KEY, get_data_version, last_modified, season_key, driver_key, constructor_key, circuit_key
+
+# Отдельный алиас кеша (settings.CACHES['pages']): locmem / файлы / redis - выбирается в настройках
+PAGE_CACHE_ALIAS = 'pages'
+
+# Бэкенды, которые живут только в памяти своего процесса: чужой процесс (веб-сервер) их не видит
+PROCESS_LOCAL_BACKENDS = ('LocMemCache', 'DummyCache')
+
+
+def page_cache_is_shared():
+    """Кеш страниц общий для процессов (файлы, redis) - только тогда прогрев из команды имеет смысл"""
+    backend = settings.CACHES.get(PAGE_CACHE_ALIAS, {}).get('BACKEND', '')
+    return not backend.endswith(PROCESS_LOCAL_BACKENDS)
+
+
+def page_cache_key(path, query, version, day=None):
+    """Ключ страницы: путь + отсортированные GET-параметры + версия данных (+ дата для "сегодняшних" страниц).
+    После импорта версия меняется, и старые ключи просто больше никогда не запрашиваются."""
+    query_string = urlencode(sorted(query.lists()), doseq=True) if hasattr(query, 'lists') else query
+    raw = f"{path}?{query_string}"
+    digest = hashlib.md5(raw.encode()).hexdigest()
+    suffix = f":{day.isoformat()}" if day else ''
+    return f"racing:page:{version}{suffix}:{digest}"
+
+
+def request_cache_key(request, daily=False):
+    return page_cache_key(request.path, request.GET, get_data_version(), date.today() if daily else None)
+
+
+def version_cache_page(view=None, *, daily=False):
+    """Кеш готовых страниц без TTL. Попадание в кеш = один запрос версии данных, без ORM и шаблонов.
+    daily=True - для страниц, зависящих от сегодняшней даты (следующая гонка, текущий сезон)."""
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+
+            cache = caches[PAGE_CACHE_ALIAS]
+            key = request_cache_key(request, daily)
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                response['X-Page-Cache'] = 'hit'
+                return response
+
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                cache.set(key, (response.content, response['Content-Type']))
+                response['X-Page-Cache'] = 'miss'
+            return response
+        return wrapper
+
+    return decorator(view) if view is not None else decorator
+
+
+# --- УСЛОВНЫЕ GET-ЗАПРОСЫ (ETag / Last-Modified) ---
+# От каких отметок времени зависит страница (аргументы - параметры URL)
+def season_keys(year, **kwargs):
+    return [season_key(year)]
+
+
+def season_list_keys(year, **kwargs):
+    # Страницы с переключателем годов зависят еще и от списка сезонов
+    return [season_key(year), SEASONS_KEY]
+
+
+def driver_keys(driver_ref, **kwargs):
+    return [driver_key(driver_ref)]
+
+
+def constructor_keys(constructor_ref, **kwargs):
+    return [constructor_key(constructor_ref)]
+
+
+def circuit_keys(circuit_ref, **kwargs):
+    return [circuit_key(circuit_ref)]
+
+
+def conditional_page(keys_func=None, *, daily=False):
+    """304 Not Modified по If-None-Match / If-Modified-Since до любых тяжелых запросов.
+    keys_func(**url_kwargs) -> ключи сущностей страницы; без него страница зависит от всего сайта.
+    Ставится над version_cache_page: повторный визит не трогает даже кеш страниц."""
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+
+            modified = _page_modified(keys_func, kwargs, daily)
+            if modified is None:
+                return view_func(request, *args, **kwargs)
+
+            timestamp = int(modified.timestamp())
+            etag = quote_etag(hashlib.md5(f"{request.get_full_path()}:{timestamp}".encode()).hexdigest())
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is not None:
+                return response
+
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200:
+                response['ETag'] = etag
+                response['Last-Modified'] = http_date(timestamp)
+            return response
+
+        # Для экспорта статики: по view можно узнать, когда менялись данные страницы
+        wrapper.page_keys, wrapper.page_daily = keys_func, daily
+        return wrapper
+
+    return decorator
+
+
+def _page_modified(keys_func, kwargs, daily):
+    modified = last_modified(keys_func(**kwargs) if keys_func else [])
+    if modified is not None and daily:
+        # Страница меняется и в полночь (следующая гонка, "через N дней")
+        midnight = timezone.make_aware(datetime.combine(date.today(), time.min))
+        modified = max(modified, midnight)
+    return modified
+
+
+def page_last_modified(path):
+    """Время изменения данных страницы path (как в Last-Modified) или None, если view без conditional_page"""
+    match = resolve(path)
+    if not hasattr(match.func, 'page_keys'):
+        return None
+    return _page_modified(match.func.page_keys, match.kwargs, match.func.page_daily)
+
+
+# --- КАКИЕ СТРАНИЦЫ ЗАТРАГИВАЕТ ИМПОРТ (прогрев кеша, экспорт) ---
+def site_urls():
+    """Общие страницы, зависящие от всех данных"""
+    return [reverse('home'), reverse('driver_list'), reverse('constructor_list'), reverse('circuit_list')]
+
+
+def season_urls(years):
+    """Страницы сезонов years: сезон, календарь, графики, гонки, а также их пилоты, команды и трассы."""
+    years = sorted(set(years))
+    urls = []
+    for year in years:
+        urls += [reverse('season_detail', args=[year]), reverse('season_progression', args=[year]),
+                 reverse('calendar', args=[year])]
+
+    races = Race.objects.filter(year__in=years).order_by('year', 'round')
+    urls += [reverse('race_detail', args=[year, rnd]) for year, rnd in races.values_list('year', 'round')]
+    circuits = sorted(set(races.values_list('circuit', flat=True)))
+
+    entries = SeasonEntry.objects.filter(year__in=years)
+    drivers = sorted(set(entries.values_list('driver', flat=True)))
+    teams = sorted(set(entries.values_list('constructor', flat=True)))
+
+    urls += [reverse('driver_detail', args=[ref]) for ref in drivers]
+    urls += [reverse('constructor_detail', args=[ref]) for ref in teams]
+    urls += [reverse('circuit_detail', args=[ref]) for ref in circuits]
+    return urls
+
+
+def all_urls():
+    """Все страницы сайта (кроме поиска) - для экспорта в статику"""
+    years = Race.objects.values_list('year', flat=True).distinct()
+    urls = site_urls() + season_urls(years)
+    # Пилоты / команды / трассы без единого старта в базе тоже имеют страницы
+    urls += [reverse('driver_detail', args=[ref]) for ref in Driver.objects.values_list('pk', flat=True)]
+    urls += [reverse('constructor_detail', args=[ref]) for ref in Constructor.objects.values_list('pk', flat=True)]
+    urls += [reverse('circuit_detail', args=[ref]) for ref in Circuit.objects.values_list('pk', flat=True)]
+    return list(dict.fromkeys(urls))
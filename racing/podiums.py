@@ -0,0 +1,27 @@
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from .models import Result
+
+
+def race_podiums(races, size=3):
+    """Подиумы сразу для набора гонок одним запросом.
+    Возвращает {race_id: [P1, P2, P3]} (Result с подгруженными driver и constructor).
+    Берем первые size строк протокола по месту (ROW_NUMBER), а не position <= 3:
+    в старых гонках бывают дележи машины и пропуски мест. Гонки без результатов в словарь не попадают."""
+    podiums = {}
+    results = Result.objects.filter(race__in=races).annotate(
+        row_num=Window(
+            expression=RowNumber(),
+            partition_by=[F('race')],
+            order_by=[F('position').asc(nulls_last=True), F('id').asc()],
+        )
+    ).filter(row_num__lte=size).select_related('driver', 'constructor').order_by('race', 'row_num')
+    for res in results:
+        podiums.setdefault(res.race_id, []).append(res)
+    return podiums
+
+
+def race_winners(races):
+    """{race_id: Result победителя} (только гонки, где есть классифицированное 1 место)"""
+    return {race_id: podium[0] for race_id, podium in race_podiums(races, size=1).items()
+            if podium[0].position == 1}
@@ -0,0 +1,116 @@
+import numpy as np
+from django.core.cache import cache
+from .models import Driver, Constructor, Race, Result, SprintResult
+from .versioning import get_data_version
+
+# Ключ = сезон + версия данных: импорт в другом процессе поднимает версию, старая запись просто не читается
+PROGRESSION_CACHE_TIMEOUT = 60 * 60
+
+
+def progression_cache_key(year, version):
+    return f"racing:progression:{year}:{version}"
+
+
+def _cumulative_table(round_idx, entity_ids, points, wins, n_rounds):
+    """Плотная матрица этап × участник: накопленные очки и место после каждого этапа.
+    Все считается векторно: np.add.at -> cumsum -> argsort по строкам."""
+    entities, col_idx = np.unique(entity_ids, return_inverse=True)
+    shape = (n_rounds, len(entities))
+
+    round_points = np.zeros(shape)
+    np.add.at(round_points, (round_idx, col_idx), points)
+    round_wins = np.zeros(shape)
+    np.add.at(round_wins, (round_idx, col_idx), wins)
+
+    cum_points = np.cumsum(round_points, axis=0)
+    cum_wins = np.cumsum(round_wins, axis=0)
+
+    # Правила Ф1: очки, потом победы. Очки бывают дробными (1/7, 1/3 за дележ машины в 50-х), и сумма
+    # зависит от порядка сложения - сравниваем округленные очки, победы - отдельным ключом (lexsort стабилен)
+    order = np.lexsort((-cum_wins, -np.round(cum_points, 6)), axis=1)
+    positions = np.empty_like(order)
+    ranks = np.broadcast_to(np.arange(1, shape[1] + 1), shape)
+    np.put_along_axis(positions, order, ranks, axis=1)
+
+    return entities, cum_points, positions
+
+
+def _load_arrays(races):
+    """Результаты гонок и спринтов сезона -> плоские numpy-массивы (2 запроса)"""
+    round_of_race = {race['id']: i for i, race in enumerate(races)}
+
+    main_rows = list(Result.objects.filter(race__in=round_of_race)
+                     .values_list('race', 'driver', 'constructor', 'points', 'position'))
+    sprint_rows = list(SprintResult.objects.filter(race__in=round_of_race)
+                       .values_list('race', 'driver', 'constructor', 'points', 'position'))
+    rows = main_rows + sprint_rows
+
+    round_idx = np.fromiter((round_of_race[r[0]] for r in rows), dtype=np.int64, count=len(rows))
+    drivers = np.array([r[1] for r in rows], dtype=object)
+    teams = np.array([r[2] for r in rows], dtype=object)
+    points = np.fromiter((r[3] or 0 for r in rows), dtype=np.float64, count=len(rows))
+    # Победы считаем только в Гран-при (как в основной таблице)
+    wins = np.zeros(len(rows))
+    wins[:len(main_rows)] = [r[4] == 1 for r in main_rows]
+
+    return round_idx, drivers, teams, points, wins
+
+
+def build_progression(year):
+    """Накопленные очки и места пилотов и команд после каждого этапа сезона."""
+    races = list(Race.objects.filter(year=year).order_by('round').values('id', 'round', 'name'))
+    if not races:
+        return None
+
+    round_idx, drivers, teams, points, wins = _load_arrays(races)
+
+    # Показываем только этапы с результатами (будущие гонки сезона отрезаем)
+    n_rounds = int(round_idx.max()) + 1 if len(round_idx) else 0
+    data = {
+        'year': year,
+        'rounds': [{'round': race['round'], 'name': race['name']} for race in races[:n_rounds]],
+        'drivers': [],
+        'constructors': [],
+    }
+    if not n_rounds:
+        return data
+
+    driver_refs, d_points, d_positions = _cumulative_table(round_idx, drivers, points, wins, n_rounds)
+    team_refs, t_points, t_positions = _cumulative_table(round_idx, teams, points, wins, n_rounds)
+
+    driver_objs = Driver.objects.in_bulk(list(driver_refs))
+    team_objs = Constructor.objects.in_bulk(list(team_refs))
+
+    for col, ref in enumerate(driver_refs):
+        driver = driver_objs[ref]
+        data['drivers'].append({
+            'ref': ref,
+            'name': driver.full_name(),
+            'code': driver.code,
+            'points': d_points[:, col].tolist(),
+            'positions': d_positions[:, col].tolist(),
+        })
+    for col, ref in enumerate(team_refs):
+        team = team_objs[ref]
+        data['constructors'].append({
+            'ref': ref,
+            'name': team.name,
+            'color': team.hex_color,
+            'points': t_points[:, col].tolist(),
+            'positions': t_positions[:, col].tolist(),
+        })
+
+    # Итоговый порядок = порядок после последнего этапа
+    data['drivers'].sort(key=lambda x: x['positions'][-1])
+    data['constructors'].sort(key=lambda x: x['positions'][-1])
+    return data
+
+
+def get_progression(year, version=None):
+    version = get_data_version() if version is None else version
+    key = progression_cache_key(year, version)
+    data = cache.get(key)
+    if data is None:
+        data = build_progression(year)
+        cache.set(key, data, PROGRESSION_CACHE_TIMEOUT)
+    return data
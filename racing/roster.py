@@ -0,0 +1,72 @@
+from django.db import transaction
+from .models import Constructor, Driver, Race, Result, SprintResult, SeasonEntry
+
+
+def _collect_entries(**filters):
+    """(year, driver, constructor) -> этапы, где пилот выступал за команду (гонки и спринты)"""
+    rounds = {}
+    for model_class in (Result, SprintResult):
+        rows = model_class.objects.filter(**filters).values_list('year', 'driver', 'constructor', 'round')
+        for year, driver_id, constructor_id, round_num in rows:
+            rounds.setdefault((year, driver_id, constructor_id), set()).add(round_num)
+    return rounds
+
+
+def _build_entries(collected):
+    return [
+        SeasonEntry(year=year, driver_id=driver_id, constructor_id=constructor_id,
+                    first_round=min(rounds), last_round=max(rounds), races=len(rounds))
+        for (year, driver_id, constructor_id), rounds in collected.items()
+    ]
+
+
+def rebuild_season_entries(year):
+    """Пересчитывает составы одного сезона (SeasonEntry). Вызывается импортами для затронутых лет."""
+    entries = _build_entries(_collect_entries(year=year))
+
+    with transaction.atomic():
+        SeasonEntry.objects.filter(year=year).delete()
+        SeasonEntry.objects.bulk_create(entries)
+
+    return len(entries)
+
+
+def rebuild_all_entries():
+    years = Race.objects.values_list('year', flat=True).distinct().order_by('year')
+    return {year: rebuild_season_entries(year) for year in years}
+
+
+# --- ЧТЕНИЕ СОСТАВОВ (если сезон еще не пересчитан - на лету по результатам, в базу не пишем) ---
+def _computed_entries(**filters):
+    """Несохраненные SeasonEntry с подгруженными пилотом и командой (как после select_related)"""
+    entries = _build_entries(_collect_entries(**filters))
+    drivers = Driver.objects.in_bulk({entry.driver_id for entry in entries})
+    teams = Constructor.objects.in_bulk({entry.constructor_id for entry in entries})
+    for entry in entries:
+        entry.driver = drivers[entry.driver_id]
+        entry.constructor = teams[entry.constructor_id]
+    return entries
+
+
+def season_entries(year):
+    """Составы сезона с пилотом и командой"""
+    entries = list(SeasonEntry.objects.filter(year=year).select_related('driver', 'constructor'))
+    return entries or _computed_entries(year=year)
+
+
+def driver_entries(driver, years):
+    """Все сезоны пилота с командами. years - сезоны, где у пилота есть результаты:
+    для тех, что еще не пересчитаны, составы считаются на лету."""
+    entries = list(SeasonEntry.objects.filter(driver=driver).select_related('driver', 'constructor'))
+    missing = set(years) - {entry.year for entry in entries}
+    if missing:
+        entries += _computed_entries(driver=driver, year__in=missing)
+    return entries
+
+
+def season_teams(year):
+    """driver_id -> SeasonEntry с последней командой пилота в сезоне"""
+    teams = {}
+    for entry in sorted(season_entries(year), key=lambda entry: entry.last_round):
+        teams[entry.driver_id] = entry
+    return teams
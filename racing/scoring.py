@@ -0,0 +1,185 @@
+import numpy as np
+from django.core.cache import cache
+from .models import Result, SprintResult
+from .versioning import get_data_version
+
+# Ключ = версия данных: импорт в другом процессе поднимает версию, старые массивы просто не читаются
+HISTORY_CACHE_TIMEOUT = 60 * 60
+
+# Самое длинное распределение очков (сейчас топ-10), все что дальше - 0
+MAX_SCORING_POSITION = 10
+
+# --- РЕЕСТР СИСТЕМ НАЧИСЛЕНИЯ ОЧКОВ ---
+# race / sprint - очки за места 1, 2, 3...; fastest_lap - бонус за быстрый круг,
+# fastest_lap_max_pos - бонус дается только финишировавшим не ниже этого места (None = всем).
+# Зачет "лучших N результатов" из старых сезонов не моделируется - суммируются все гонки.
+SCORING_SYSTEMS = {
+    '1950': {'title': '1950–1959: 8-6-4-3-2 + 1 за быстрый круг',
+             'race': [8, 6, 4, 3, 2], 'sprint': [], 'fastest_lap': 1, 'fastest_lap_max_pos': None},
+    '1960': {'title': '1960: 8-6-4-3-2-1',
+             'race': [8, 6, 4, 3, 2, 1], 'sprint': [], 'fastest_lap': 0, 'fastest_lap_max_pos': None},
+    '1961': {'title': '1961–1990: 9-6-4-3-2-1',
+             'race': [9, 6, 4, 3, 2, 1], 'sprint': [], 'fastest_lap': 0, 'fastest_lap_max_pos': None},
+    '1991': {'title': '1991–2002: 10-6-4-3-2-1',
+             'race': [10, 6, 4, 3, 2, 1], 'sprint': [], 'fastest_lap': 0, 'fastest_lap_max_pos': None},
+    '2003': {'title': '2003–2009: 10-8-6-5-4-3-2-1',
+             'race': [10, 8, 6, 5, 4, 3, 2, 1], 'sprint': [], 'fastest_lap': 0, 'fastest_lap_max_pos': None},
+    '2010': {'title': '2010–2018: 25-18-15-12-10-8-6-4-2-1',
+             'race': [25, 18, 15, 12, 10, 8, 6, 4, 2, 1], 'sprint': [], 'fastest_lap': 0,
+             'fastest_lap_max_pos': None},
+    '2019': {'title': '2019–2020: 25-18-15... + 1 за быстрый круг (топ-10)',
+             'race': [25, 18, 15, 12, 10, 8, 6, 4, 2, 1], 'sprint': [], 'fastest_lap': 1,
+             'fastest_lap_max_pos': 10},
+    '2021': {'title': '2021: + спринт 3-2-1',
+             'race': [25, 18, 15, 12, 10, 8, 6, 4, 2, 1], 'sprint': [3, 2, 1], 'fastest_lap': 1,
+             'fastest_lap_max_pos': 10},
+    '2022': {'title': '2022–2024: + спринт 8-7-6-5-4-3-2-1',
+             'race': [25, 18, 15, 12, 10, 8, 6, 4, 2, 1], 'sprint': [8, 7, 6, 5, 4, 3, 2, 1], 'fastest_lap': 1,
+             'fastest_lap_max_pos': 10},
+    'current': {'title': 'Текущие правила (2025): 25-18-15... + спринт 8-7-6-5-4-3-2-1',
+                'race': [25, 18, 15, 12, 10, 8, 6, 4, 2, 1], 'sprint': [8, 7, 6, 5, 4, 3, 2, 1], 'fastest_lap': 0,
+                'fastest_lap_max_pos': None},
+}
+
+# Какая система действовала в сезоне (первый год -> ключ реестра)
+HISTORICAL_ERAS = [(1950, '1950'), (1960, '1960'), (1961, '1961'), (1991, '1991'), (2003, '2003'),
+                   (2010, '2010'), (2019, '2019'), (2021, '2021'), (2022, '2022'), (2025, 'current')]
+
+
+def _points_table(values):
+    # Индекс = место; 0 - сход/нет места (0 очков)
+    table = np.zeros(MAX_SCORING_POSITION + 1)
+    table[1:len(values) + 1] = values
+    return table
+
+
+def _era_system_keys(years):
+    starts = np.array([start for start, _ in HISTORICAL_ERAS])
+    keys = np.array([key for _, key in HISTORICAL_ERAS])
+    return keys[np.searchsorted(starts, years, side='right') - 1]
+
+
+def _build_history():
+    """Вся история в виде компактных массивов: одна строка = один результат (гонка или спринт)."""
+    fields = ('year', 'driver', 'constructor', 'position', 'points')
+    main_rows = list(Result.objects.values_list(*fields))
+    sprint_rows = list(SprintResult.objects.values_list(*fields))
+    rows = main_rows + sprint_rows
+    if not rows:
+        return None
+
+    years = np.array([r[0] for r in rows], dtype=np.int64)
+    positions = np.array([r[3] or 0 for r in rows], dtype=np.int64)
+    stored_points = np.array([r[4] or 0 for r in rows], dtype=np.float64)
+    is_sprint = np.zeros(len(rows), dtype=bool)
+    is_sprint[len(main_rows):] = True
+
+    driver_refs, driver_idx = np.unique(np.array([r[1] for r in rows], dtype=object), return_inverse=True)
+    team_refs, team_idx = np.unique(np.array([r[2] for r in rows], dtype=object), return_inverse=True)
+
+    # Быстрого круга в базе нет, но в сезонах с бонусом он виден по очкам:
+    # результат принес больше, чем положено за место по правилам того года
+    expected = np.zeros(len(rows))
+    has_bonus = np.zeros(len(rows), dtype=bool)
+    era_keys = _era_system_keys(years)
+    scoring_positions = np.where(positions <= MAX_SCORING_POSITION, positions, 0)
+    for key in np.unique(era_keys):
+        system = SCORING_SYSTEMS[key]
+        mask = (era_keys == key) & ~is_sprint
+        expected[mask] = _points_table(system['race'])[scoring_positions[mask]]
+        has_bonus[mask] = system['fastest_lap'] > 0
+    fastest_lap = has_bonus & (stored_points - expected >= 1 - 1e-9)
+
+    # Группы "сезон + пилот" и "сезон + команда" для суммирования через bincount
+    driver_groups, driver_group_idx = np.unique(years * len(driver_refs) + driver_idx, return_inverse=True)
+    team_groups, team_group_idx = np.unique(years * len(team_refs) + team_idx, return_inverse=True)
+
+    return {
+        'positions': scoring_positions,
+        'raw_positions': positions,
+        'is_sprint': is_sprint,
+        'is_win': (positions == 1) & ~is_sprint,
+        'fastest_lap': fastest_lap,
+        'drivers': {
+            'refs': driver_refs, 'group_idx': driver_group_idx,
+            'years': driver_groups // len(driver_refs), 'entity': driver_groups % len(driver_refs),
+        },
+        'constructors': {
+            'refs': team_refs, 'group_idx': team_group_idx,
+            'years': team_groups // len(team_refs), 'entity': team_groups % len(team_refs),
+        },
+    }
+
+
+def history_cache_key(version):
+    return f"racing:scoring:history:{version}"
+
+
+def get_history(version=None):
+    version = get_data_version() if version is None else version
+    key = history_cache_key(version)
+    history = cache.get(key)
+    if history is None:
+        history = _build_history()
+        cache.set(key, history, HISTORY_CACHE_TIMEOUT)
+    return history
+
+
+def _rank_groups(years, points, wins):
+    # Сортировка внутри сезона: очки, потом победы. Место = номер в отсортированном блоке сезона
+    order = np.lexsort((-wins, -points, years))
+    sorted_years = years[order]
+    block_start = np.searchsorted(sorted_years, sorted_years, side='left')
+    positions = np.empty(len(order), dtype=np.int64)
+    positions[order] = np.arange(len(order)) - block_start + 1
+    return positions
+
+
+def rescore(system_key, history=None):
+    """Пересчитывает ВСЮ историю по выбранной системе (векторно, миллисекунды).
+    Возвращает {'drivers': {...}, 'constructors': {...}} с массивами years / refs / points / positions."""
+    system = SCORING_SYSTEMS[system_key]
+    history = history or get_history()
+    if history is None:
+        return None
+
+    positions = history['positions']
+    points = np.where(history['is_sprint'],
+                      _points_table(system['sprint'])[positions],
+                      _points_table(system['race'])[positions])
+    if system['fastest_lap']:
+        eligible = history['fastest_lap']
+        if system['fastest_lap_max_pos']:
+            raw = history['raw_positions']
+            eligible = eligible & (raw >= 1) & (raw <= system['fastest_lap_max_pos'])
+        points = points + eligible * system['fastest_lap']
+
+    result = {}
+    for kind in ('drivers', 'constructors'):
+        groups = history[kind]
+        n_groups = len(groups['years'])
+        group_points = np.bincount(groups['group_idx'], weights=points, minlength=n_groups)
+        group_wins = np.bincount(groups['group_idx'], weights=history['is_win'], minlength=n_groups)
+        result[kind] = {
+            'years': groups['years'],
+            'refs': groups['refs'][groups['entity']],
+            'points': group_points,
+            'positions': _rank_groups(groups['years'], group_points, group_wins),
+        }
+    return result
+
+
+def season_scores(system_key, year):
+    """{'drivers': {ref: (points, position)}, 'constructors': {ref: (points, position)}} для одного сезона"""
+    scored = rescore(system_key)
+    if scored is None:
+        return None
+
+    season = {}
+    for kind, data in scored.items():
+        mask = data['years'] == year
+        season[kind] = {
+            ref: (float(pts), int(pos))
+            for ref, pts, pos in zip(data['refs'][mask], data['points'][mask], data['positions'][mask])
+        }
+    return season
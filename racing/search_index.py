@@ -0,0 +1,262 @@
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+from django.db.models import Max
+from django.urls import reverse
+from thefuzz import fuzz, process
+from .models import Driver, Constructor, Circuit, Race, SeasonEntry
+from .versioning import get_data_version
+from .translit import phonetic_words
+
+# Запросы короче n-граммы сравниваем со всеми строками (их немного и это быстро)
+NGRAM_SIZE = 3
+
+
+def normalize(text):
+    return ' '.join(text.lower().split())
+
+
+def fold(text):
+    # Для подсказок: без диакритики, чтобы "perez" находил "Pérez"
+    text = unicodedata.normalize('NFKD', normalize(text))
+    return ''.join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def ngrams(text, n=NGRAM_SIZE):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class FuzzyIndex:
+    """Триграммный индекс по набору строк: postings n-грамма -> ключи.
+    Fuzzy-оценка (partial_ratio) считается только для кандидатов, у которых есть общие n-граммы с запросом."""
+
+    def __init__(self, items):
+        # items: {key: [строка, строка, ...]} - у одного объекта может быть несколько вариантов имени
+        self.objects = {}
+        self.choices = {}
+        self.postings = {}
+        for key, (obj, texts) in items.items():
+            self.objects[key] = obj
+            for i, text in enumerate(texts):
+                text = normalize(text)
+                self.choices[(key, i)] = text
+                for gram in ngrams(text):
+                    self.postings.setdefault(gram, set()).add((key, i))
+
+    def candidates(self, query):
+        grams = ngrams(query)
+        if not grams:
+            return self.choices
+
+        hits = Counter()
+        for gram in grams:
+            hits.update(self.postings.get(gram, ()))
+        return {choice_key: self.choices[choice_key] for choice_key in hits}
+
+    def search(self, query, threshold, allowed=None):
+        """Объекты, у которых хотя бы один вариант имени набрал partial_ratio > threshold (лучшие первыми)"""
+        query = normalize(query)
+        choices = self.candidates(query)
+        if allowed is not None:
+            choices = {k: v for k, v in choices.items() if k[0] in allowed}
+
+        # Пакетная оценка всех кандидатов за один вызов
+        matches = process.extractBests(query, choices, processor=None, scorer=fuzz.partial_ratio,
+                                       score_cutoff=threshold, limit=None)
+
+        found = []
+        seen = set()
+        for _, score, (key, _) in matches:
+            if score > threshold and key not in seen:
+                seen.add(key)
+                found.append(self.objects[key])
+        return found
+
+
+class PrefixIndex:
+    """Автодополнение: отсортированный массив ключей + bisect.
+    Все ключи, начинающиеся с запроса, лежат подряд начиная с bisect_left(запрос)."""
+
+    # Сколько совпадений максимум просматриваем на один запрос (для 1-2 букв их тысячи)
+    MAX_SCAN = 2000
+
+    def __init__(self, entries):
+        # entries: [(payload, rank, [ключ, ключ, ...])]; меньший rank - выше в подсказках
+        self.payloads = []
+        keys = []
+        for payload, rank, texts in entries:
+            idx = len(self.payloads)
+            self.payloads.append(payload)
+            for text in set(filter(None, texts)):
+                keys.append((fold(text), rank, idx))
+        keys.sort()
+        self.keys = [k[0] for k in keys]
+        self.items = [(k[1], k[2]) for k in keys]
+
+    def lookup(self, prefix, limit):
+        prefix = fold(prefix)
+        if not prefix:
+            return []
+
+        start = bisect_left(self.keys, prefix)
+        end = start
+        while end < len(self.keys) and end - start < self.MAX_SCAN and self.keys[end].startswith(prefix):
+            end += 1
+
+        best = {}
+        for rank, idx in self.items[start:end]:
+            best[idx] = min(rank, best.get(idx, rank))
+        ordered = sorted(best, key=lambda idx: (best[idx], idx))
+        return [self.payloads[idx] for idx in ordered[:limit]]
+
+
+def _suggest_entries(drivers, teams, circuits):
+    """Подсказки по видам объектов. Ранг: кто/что было недавно - выше (по последнему сезону)."""
+    last_driver_year = dict(SeasonEntry.objects.values_list('driver').annotate(last=Max('year')).order_by())
+    last_team_year = dict(SeasonEntry.objects.values_list('constructor').annotate(last=Max('year')).order_by())
+    last_circuit_year = dict(Race.objects.values_list('circuit').annotate(last=Max('year')).order_by())
+
+    def item(kind, label, url, extra=''):
+        return {'type': kind, 'label': label, 'url': url, 'extra': extra}
+
+    return {
+        'drivers': [
+            (item('driver', d.full_name(), reverse('driver_detail', args=[d.pk]), d.code or ''),
+             -last_driver_year.get(d.pk, 0),
+             [d.surname, f"{d.forename} {d.surname}", d.code])
+            for d in drivers
+        ],
+        'teams': [
+            (item('team', t.name, reverse('constructor_detail', args=[t.pk]), t.nationality or ''),
+             -last_team_year.get(t.pk, 0),
+             [t.name])
+            for t in teams
+        ],
+        'circuits': [
+            (item('circuit', c.name, reverse('circuit_detail', args=[c.pk]), f"{c.location}, {c.country}"),
+             -last_circuit_year.get(c.pk, 0),
+             [c.name, c.location, c.country])
+            for c in circuits
+        ],
+        # Гонки: по названию ("british grand prix") и с годом впереди ("2024 british")
+        'races': [
+            (item('race', f"{r['name']} {r['year']}", reverse('race_detail', args=[r['year'], r['round']])),
+             -r['year'],
+             [r['name'], f"{r['year']} {r['name']}"])
+            for r in Race.objects.values('year', 'round', 'name')
+        ],
+    }
+
+
+class PhoneticIndex:
+    """Фонетические ключи слов имени -> объекты. Запрос на кириллице или с ошибкой в написании
+    ("Хэмилтон", "Шумахер", "Ферстапен") сводится к тем же ключам и ищется через bisect, без fuzzy-перебора."""
+
+    # Короткие ключи (Ferrari -> "fr") ищем только точно, длинные - еще и по началу (Леклер -> Leclerc)
+    MIN_PREFIX_KEY = 4
+    # Ключи грубые ("fr" = Ferrari, Fry, Frère), поэтому найденное слово сверяем с транслитом запроса
+    VERIFY_RATIO = 60
+    # У коротких ключей совпадений больше всего ("mns" = Monza, Le Mans) - порог строже
+    SHORT_VERIFY_RATIO = 70
+
+    def __init__(self, items):
+        # items: {key: (obj, [строка, строка, ...])}
+        self.objects = {}
+        # Все имя латиницей ("cooper ferrari") - чтобы "Феррари" ставило Ferrari выше Cooper-Ferrari
+        self.names = {}
+        entries = set()
+        for key, (obj, texts) in items.items():
+            self.objects[key] = obj
+            words = [pair for text in texts for pair in phonetic_words(text)]
+            self.names[key] = ' '.join(word for _, word in words)
+            entries.update((word_key, key, word) for word_key, word in words)
+        entries = sorted(entries)
+        self.keys = [e[0] for e in entries]
+        self.entries = [(e[1], e[2]) for e in entries]
+
+    def _lookup(self, word_key, query_word):
+        """{объект: лучшая похожесть его слова на слово запроса}"""
+        threshold = self.VERIFY_RATIO if len(word_key) >= self.MIN_PREFIX_KEY else self.SHORT_VERIFY_RATIO
+        start = bisect_left(self.keys, word_key)
+        found = {}
+        for i in range(start, len(self.keys)):
+            key = self.keys[i]
+            if key != word_key and not (len(word_key) >= self.MIN_PREFIX_KEY and key.startswith(word_key)):
+                break
+            ref, word = self.entries[i]
+            score = fuzz.ratio(query_word, word)
+            if score >= threshold:
+                found[ref] = max(score, found.get(ref, 0))
+        return found
+
+    def search(self, query, allowed=None):
+        """Объекты, совпавшие по наибольшему числу слов запроса; при равенстве - самые похожие первыми
+        (по совпавшим словам, затем по имени целиком)"""
+        query_words = phonetic_words(query)
+        hits = Counter()
+        scores = Counter()
+        for word_key, query_word in set(query_words):
+            found = self._lookup(word_key, query_word)
+            hits.update(found.keys())
+            # Совпадение длинного ключа ("hmltn") говорит больше, чем короткого ("ls")
+            scores.update({ref: score * len(word_key) for ref, score in found.items()})
+        if allowed is not None:
+            hits = Counter({k: v for k, v in hits.items() if k in allowed})
+        if not hits:
+            return []
+
+        best = max(hits.values())
+        query_name = ' '.join(word for _, word in query_words)
+        ranked = sorted((key for key, count in hits.items() if count == best),
+                        key=lambda key: (-scores[key], -fuzz.ratio(query_name, self.names[key]), key))
+        return [self.objects[key] for key in ranked]
+
+
+class SearchIndex:
+    def __init__(self, version):
+        self.version = version
+        drivers = list(Driver.objects.all())
+        teams = list(Constructor.objects.all())
+        circuits = list(Circuit.objects.all())
+
+        self.drivers = FuzzyIndex({
+            d.pk: (d, [d.surname, f"{d.forename} {d.surname}"]) for d in drivers
+        })
+        self.teams = FuzzyIndex({
+            t.pk: (t, [t.name]) for t in teams
+        })
+        # Трассы ищем по названию, городу или стране
+        self.circuits = FuzzyIndex({
+            c.pk: (c, [f"{c.name} {c.location} {c.country}"]) for c in circuits
+        })
+
+        # Транслитерация / фонетика: "Хэмилтон", "Монца", "Феррари"
+        self.phonetic = {
+            'drivers': PhoneticIndex({d.pk: (d, [d.forename, d.surname]) for d in drivers}),
+            'teams': PhoneticIndex({t.pk: (t, [t.name]) for t in teams}),
+            'circuits': PhoneticIndex({c.pk: (c, [c.name, c.location, c.country]) for c in circuits}),
+        }
+
+        # Автодополнение (search/suggest/) - отдельный префиксный индекс на каждый вид объектов
+        self.suggest = {
+            kind: PrefixIndex(entries) for kind, entries in _suggest_entries(drivers, teams, circuits).items()
+        }
+
+    def suggestions(self, query, limit):
+        return {kind: index.lookup(query, limit) for kind, index in self.suggest.items()}
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_search_index():
+    """Индекс на процесс. Пересобирается, только когда импорт поднял версию данных."""
+    global _index
+    version = get_data_version()
+    if _index is None or _index.version != version:
+        with _lock:
+            if _index is None or _index.version != version:
+                _index = SearchIndex(version)
+    return _index
@@ -0,0 +1,16 @@
+from django.conf import settings
+
+
+def sqlite_pragmas(profile=None):
+    """PRAGMA выбранного профиля (settings.SQLITE_PROFILES) в порядке применения"""
+    return settings.SQLITE_PROFILES.get(profile or settings.SQLITE_PROFILE, {})
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Обработчик connection_created: настраивает каждое новое соединение SQLite.
+    С CONN_MAX_AGE срабатывает один раз на поток, а не на каждый запрос."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in sqlite_pragmas().items():
+            cursor.execute(f"PRAGMA {name} = {value}")
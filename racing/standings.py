@@ -0,0 +1,134 @@
+from django.db import transaction
+from django.db.models import Sum, Count, Q
+from .models import (Driver, Constructor, Race, Result, SprintResult,
+                     DriverSeasonStanding, ConstructorSeasonStanding)
+from .roster import season_teams
+
+# Сход = текстовая позиция не число (R, W, N...), кроме дисквалификации 'D'
+DNF_FILTER = ~Q(position_text__regex=r'^\d+$') & ~Q(position_text='D')
+STAT_FIELDS = ('points', 'wins', 'podiums', 'poles', 'dnfs')
+
+
+# --- ОБЩИЕ ХЕЛПЕРЫ ---
+def _grouped_totals(year, key):
+    """Очки/победы/подиумы/поулы/сходы за сезон, сгруппированные по key ('driver' или 'constructor').
+    Гонки и спринты считаются двумя GROUP BY запросами и складываются по ключу."""
+    totals = {}
+
+    # Гран-при: очки + условные счетчики в одном проходе
+    main_rows = Result.objects.filter(year=year).values(key).annotate(
+        points=Sum('points'),
+        wins=Count('id', filter=Q(position=1)),
+        podiums=Count('id', filter=Q(position__lte=3)),
+        poles=Count('id', filter=Q(grid=1)),
+        dnfs=Count('id', filter=DNF_FILTER),
+    ).order_by()
+    for row in main_rows:
+        totals[row[key]] = {
+            'points': row['points'] or 0,
+            'wins': row['wins'],
+            'podiums': row['podiums'],
+            'poles': row['poles'],
+            'dnfs': row['dnfs'],
+        }
+
+    # Спринты: только очки (победы в спринтах не идут в статистику "Wins")
+    sprint_rows = SprintResult.objects.filter(year=year).values(key).annotate(
+        points=Sum('points'),
+    ).order_by()
+    for row in sprint_rows:
+        item = totals.setdefault(row[key], dict.fromkeys(STAT_FIELDS, 0))
+        item['points'] += row['points'] or 0
+
+    return totals
+
+
+def _rank(rows):
+    # Правила Ф1: сначала очки, при равенстве - количество побед
+    rows.sort(key=lambda x: (x['points'], x['wins']), reverse=True)
+    for pos, row in enumerate(rows, start=1):
+        row['position'] = pos
+    return rows
+
+
+# --- ЛИЧНЫЙ ЗАЧЕТ ---
+def driver_standings(year):
+    """Полная классификация пилотов за сезон за постоянное число запросов.
+    Формат строки: {'position', 'driver', 'team', 'points', 'wins', 'podiums', 'poles', 'dnfs'}"""
+    totals = _grouped_totals(year, 'driver')
+    if not totals:
+        return []
+
+    # Команда пилота = команда в его последней гонке сезона (из составов SeasonEntry)
+    entries = season_teams(year)
+    drivers = Driver.objects.in_bulk([d for d in totals if d not in entries])
+    drivers.update({driver_id: entry.driver for driver_id, entry in entries.items()})
+
+    rows = []
+    for driver_id, item in totals.items():
+        entry = entries.get(driver_id)
+        rows.append({'driver': drivers[driver_id], 'team': entry.constructor if entry else None, **item})
+    return _rank(rows)
+
+
+# --- КУБОК КОНСТРУКТОРОВ ---
+def constructor_standings(year):
+    """Классификация команд за сезон. Формат строки: {'position', 'team', 'points', 'wins', 'podiums', 'poles', 'dnfs'}"""
+    totals = _grouped_totals(year, 'constructor')
+    if not totals:
+        return []
+
+    constructors = Constructor.objects.in_bulk(list(totals))
+
+    rows = []
+    for team_id, item in totals.items():
+        rows.append({'team': constructors[team_id], **item})
+    return _rank(rows)
+
+
+# --- СОХРАНЕННЫЕ ТАБЛИЦЫ (DriverSeasonStanding / ConstructorSeasonStanding) ---
+def _driver_objects(year):
+    return [
+        DriverSeasonStanding(year=year, driver=row['driver'], team=row['team'], position=row['position'],
+                             **{f: row[f] for f in STAT_FIELDS})
+        for row in driver_standings(year)
+    ]
+
+
+def _constructor_objects(year):
+    return [
+        ConstructorSeasonStanding(year=year, team=row['team'], position=row['position'],
+                                  **{f: row[f] for f in STAT_FIELDS})
+        for row in constructor_standings(year)
+    ]
+
+
+def rebuild_season_standings(year):
+    """Пересчитывает сохраненные таблицы одного сезона. Вызывается импортами для затронутых лет."""
+    drivers = _driver_objects(year)
+    teams = _constructor_objects(year)
+
+    with transaction.atomic():
+        DriverSeasonStanding.objects.filter(year=year).delete()
+        ConstructorSeasonStanding.objects.filter(year=year).delete()
+        DriverSeasonStanding.objects.bulk_create(drivers)
+        ConstructorSeasonStanding.objects.bulk_create(teams)
+
+    return len(drivers), len(teams)
+
+
+def rebuild_all_standings():
+    years = Race.objects.values_list('year', flat=True).distinct().order_by('year')
+    return {year: rebuild_season_standings(year) for year in years}
+
+
+def get_driver_table(year):
+    """Готовый (уже отсортированный) зачет пилотов одним индексным запросом.
+    Если сезон еще не пересчитан - считаем на лету (несохраненные объекты той же модели)."""
+    rows = list(DriverSeasonStanding.objects.filter(year=year).select_related('driver', 'team').order_by('position'))
+    return rows or _driver_objects(year)
+
+
+def get_constructor_table(year):
+    rows = list(ConstructorSeasonStanding.objects.filter(year=year).select_related('team').order_by('position'))
+    return rows or _constructor_objects(year)
@@ -0,0 +1,84 @@
+import datetime
+import hashlib
+import json
+from django.db import transaction
+from django.utils import timezone
+from .ingest import SeasonBatch
+from .models import RoundSync, SprintResult
+
+# После гонки протокол еще могут поправить (штрафы, апелляции) - столько дней этап перепроверяется
+REVISION_WINDOW = datetime.timedelta(days=7)
+# Этап, загруженный недавно, не перекачиваем (повторный запуск после сбоя продолжает с места остановки)
+REFRESH_INTERVAL = datetime.timedelta(hours=1)
+
+
+def content_hash(results, sprint_results):
+    """Хеш протоколов этапа из API (порядок ключей не важен)"""
+    payload = json.dumps([results, sprint_results], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def rounds_to_sync(year, races, today=None, now=None):
+    """Какие этапы календаря (race_info из API) нужно скачать:
+    новые, без результатов или еще в окне правок - и при этом не загруженные только что.
+    Будущие этапы пропускаются: результатов у них еще нет."""
+    today = today or timezone.localdate()
+    now = now or timezone.now()
+    states = {state.round: state for state in RoundSync.objects.filter(year=year)}
+
+    selected = []
+    for race_info in races:
+        race_date = datetime.date.fromisoformat(race_info['date'])
+        if race_date > today:
+            continue
+        state = states.get(int(race_info['round']))
+        if state is None or not state.results:
+            selected.append(race_info)
+        elif today <= race_date + REVISION_WINDOW and now - state.fetched_at >= REFRESH_INTERVAL:
+            selected.append(race_info)
+    return selected
+
+
+def save_round(year, refs, race_info, results, sprint_results):
+    """Запись одного этапа + отметка о синхронизации в одной транзакции (контрольная точка).
+    Если протоколы не изменились с прошлого раза (тот же хеш) - в таблицы результатов не пишем.
+    sprint_results=None - спринт не скачался: пишем только гонку и без отметки (этап повторится).
+    Возвращает отчет SeasonBatch.save() или None, если этап не изменился."""
+    round_num = int(race_info['round'])
+    if sprint_results is None:
+        batch = SeasonBatch(year, refs)
+        batch.add_race(race_info)
+        batch.add_results(round_num, results)
+        return batch.save()
+
+    digest = content_hash(results, sprint_results)
+    state = RoundSync.objects.filter(year=year, round=round_num).first()
+
+    with transaction.atomic():
+        report = None
+        if state is None or state.content_hash != digest:
+            batch = SeasonBatch(year, refs)
+            batch.add_race(race_info)
+            batch.add_results(round_num, results)
+            batch.add_results(round_num, sprint_results, SprintResult)
+            report = batch.save()
+
+        RoundSync.objects.update_or_create(year=year, round=round_num, defaults={
+            'fetched_at': timezone.now(),
+            'results': len(results),
+            'sprint_results': len(sprint_results),
+            'content_hash': digest,
+        })
+    return report
+
+
+def mark_rounds_synced(year, rounds):
+    """Отметки для этапов, записанных полным импортом сезона: {round: (results, sprint_results)}"""
+    now = timezone.now()
+    for round_num, (results, sprint_results) in rounds.items():
+        RoundSync.objects.update_or_create(year=year, round=round_num, defaults={
+            'fetched_at': now,
+            'results': len(results),
+            'sprint_results': len(sprint_results),
+            'content_hash': content_hash(results, sprint_results),
+        })
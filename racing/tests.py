@@ -1,3 +1,1192 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, Sum
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from .ingest import SeasonBatch, upsert_rows
+from .jolpica import CURRENT_SEASON_TTL, JolpicaClient, ResponseCache, TokenBucket, cache_ttl
+from . import search_index
+from .fts import rebuild_search_fts, search_fts
+from .answers import smart_answer
+from .management.commands.warm_cache import render_url
+from .podiums import race_podiums, race_winners
+from .progression import get_progression
+from .roster import rebuild_season_entries, season_entries
+from .standings import (constructor_standings, driver_standings, get_constructor_table, get_driver_table,
+                        rebuild_season_standings)
+from .search_index import get_search_index
+from .sqlite import sqlite_pragmas
+from .scoring import season_scores
+from .models import (Circuit, Constructor, DataVersion, Driver, DriverTitle, Race, Result, RoundSync,
+                     SeasonEntry, SprintResult)
+from .sync import REFRESH_INTERVAL
+from .versioning import bump_data_version, mark_seasons_modified
 
-# Create your tests here.
+
+# --- ТЕСТОВЫЕ ДАННЫЕ ---
+def clear_caches():
+    """Кеши живут дольше тестовой базы, а версия данных в каждом тесте снова 0 - сбрасываем все"""
+    cache.clear()
+    caches['pages'].clear()
+    search_index._index = None
+
+
+def make_season(year, rounds, sprints=None, circuit='monza'):
+    """Сезон для тестов: rounds = [[(пилот, команда, место, очки), ...], ...] по этапам,
+    sprints = {этап: [...]}. Пилоты, команды и трасса создаются, если их еще нет. -> [Race]"""
+    circuit, _ = Circuit.objects.get_or_create(circuit_ref=circuit, defaults={
+        'name': circuit.title(), 'location': circuit.title(), 'country': 'Italy', 'lat': 0, 'lng': 0})
+
+    def add(model, race, rows):
+        for driver_ref, team_ref, position, points in rows:
+            Driver.objects.get_or_create(driver_ref=driver_ref, defaults={
+                'forename': driver_ref.title(), 'surname': driver_ref.title(), 'nationality': ''})
+            Constructor.objects.get_or_create(constructor_ref=team_ref, defaults={
+                'name': team_ref.title(), 'nationality': ''})
+            model.objects.create(race=race, driver_id=driver_ref, constructor_id=team_ref, grid=position or 0,
+                                 position=position, position_text=str(position or 'R'), points=points,
+                                 status='Finished' if position else 'Accident')
+
+    races = []
+    for round_num, rows in enumerate(rounds, 1):
+        race = Race.objects.create(year=year, round=round_num, circuit=circuit, name=f'Grand Prix {round_num}',
+                                   date=datetime.date(year, 3, 1) + datetime.timedelta(weeks=round_num))
+        add(Result, race, rows)
+        add(SprintResult, race, (sprints or {}).get(round_num, []))
+        races.append(race)
+    return races
+
+
+class QueryPlanTests(TestCase):
+    """Основные запросы страниц идут по индексам, а не полным проходом по таблицам результатов"""
+
+    def setUp(self):
+        clear_caches()
+        make_season(2021, [[('hamilton', 'mercedes', 1, 25), ('leclerc', 'ferrari', 2, 18)]] * 3,
+                    sprints={2: [('hamilton', 'mercedes', 1, 8)]})
+        rebuild_season_entries(2021)
+        rebuild_season_standings(2021)
+
+    def assertPlan(self, queryset, *expected):
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN - только SQLite')
+        plan = queryset.explain()
+        for fragment in expected:
+            self.assertIn(fragment, plan)
+        for table in ('racing_result', 'racing_sprintresult', 'racing_race'):
+            self.assertNotIn(f'SCAN {table}', plan)
+
+    def page_plans(self, url):
+        """Планы запросов, которые страница реально выполняет при рендере (кеш страниц пуст)"""
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN - только SQLite')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                if query['sql'].startswith('SELECT') and 'racing_' in query['sql']:
+                    cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                    plans.append(' | '.join(row[-1] for row in cursor.fetchall()))
+        return plans
+
+    def assertPagePlan(self, url, *expected):
+        """Ни одного полного прохода по таблице (проход по покрывающему индексу допустим),
+        каждый ожидаемый индекс встречается в планах страницы"""
+        plans = self.page_plans(url)
+        for plan in plans:
+            for step in plan.split(' | '):
+                if step.startswith('SCAN racing_'):
+                    self.assertIn('COVERING INDEX', step, f"{url}: {plan}")
+        for fragment in expected:
+            self.assertTrue(any(fragment in plan for plan in plans), f"{url}: нет {fragment} в {plans}")
+
+    # --- 1. СЕЗОН: календарь и таблица чемпионата (year - копия race.year в результатах) ---
+    def test_season_races(self):
+        self.assertPlan(Race.objects.filter(year=2021).order_by('round'), 'racing_race USING', '(year=?)')
+
+    def test_season_standings(self):
+        qs = Result.objects.filter(year=2021).values('driver').annotate(points=Sum('points'))
+        self.assertPlan(qs, 'result_year_round_idx (year=?)')
+        self.assertNotIn('racing_race', qs.explain())
+
+    def test_season_sprint_standings(self):
+        qs = SprintResult.objects.filter(year=2021).values('driver').annotate(points=Sum('points'))
+        self.assertPlan(qs, 'sprint_year_round_idx (year=?)')
+
+    # --- 2. ГОНКА: результаты (race, position) ---
+    def test_race_results(self):
+        qs = Result.objects.filter(race_id=1).select_related('driver', 'constructor').order_by('position')
+        self.assertPlan(qs, 'racing_result USING INDEX', '(race_id=?)')
+
+    # --- 3. ПИЛОТ И КОМАНДА ЗА СЕЗОН (driver / constructor, year) ---
+    def test_driver_season(self):
+        self.assertPlan(Result.objects.filter(driver='hamilton', year=2021), 'result_driver_year_idx')
+        self.assertPlan(SprintResult.objects.filter(driver='hamilton', year=2021), 'sprint_driver_year_idx')
+
+    def test_driver_years(self):
+        qs = Result.objects.filter(driver='hamilton').values_list('year', flat=True).distinct()
+        self.assertPlan(qs, 'COVERING INDEX result_driver_year_idx')
+
+    def test_constructor_season(self):
+        self.assertPlan(Result.objects.filter(constructor='ferrari', year=2021), 'result_team_year_idx')
+        self.assertPlan(SprintResult.objects.filter(constructor='ferrari', year=2021), 'sprint_team_year_idx')
+
+    # --- 4. ПОБЕДИТЕЛИ (position, race) ---
+    def test_winners(self):
+        qs = Result.objects.filter(position=1).values_list('race', 'driver')
+        self.assertPlan(qs, 'COVERING INDEX result_winner_idx')
+
+    def test_circuit_winners(self):
+        qs = Result.objects.filter(race__circuit='monza', position=1).values('driver').annotate(wins=Count('id'))
+        self.assertPlan(qs, 'COVERING INDEX result_winner_idx')
+
+    # --- 5. СТРАНИЦЫ ЦЕЛИКОМ: запросы из CaptureQueriesContext ---
+    def test_season_page(self):
+        self.assertPagePlan(reverse('season_detail', args=[2021]),
+                            'driver_standing_year_pos_idx (year=?)', 'team_standing_year_pos_idx (year=?)')
+
+    def test_race_page(self):
+        self.assertPagePlan(reverse('race_detail', args=[2021, 2]), '(year=? AND round=?)',
+                            'racing_result USING INDEX racing_result_race_id', 'racing_sprintresult USING INDEX')
+
+    def test_driver_page(self):
+        self.assertPagePlan(reverse('driver_detail', args=['hamilton']),
+                            'result_driver_year_idx (driver_id=? AND year=?)',
+                            'sprint_driver_year_idx (driver_id=? AND year=?)')
+
+    def test_constructor_page(self):
+        self.assertPagePlan(reverse('constructor_detail', args=['ferrari']), 'result_team_year_idx (constructor_id=?)',
+                            'sprint_team_year_idx (constructor_id=?)', 'result_year_round_idx (year=?)')
+
+    def test_circuit_page(self):
+        self.assertPagePlan(reverse('circuit_detail', args=['monza']), 'COVERING INDEX result_winner_idx')
+
+    def test_progression_page(self):
+        self.assertPagePlan(reverse('season_progression', args=[2021]), 'racing_race USING INDEX',
+                            'racing_result USING INDEX')
+
+
+# --- ЗАГЛУШКА JOLPICA API ---
+class StubJolpica:
+    """Локальный HTTP-сервер вместо api.jolpi.ca: routes = {'/f1/2024.json': ответ}.
+    Ответ - JSON-словарь или список [(статус, тело, заголовки), ...], отдаваемых по очереди
+    (последний повторяется). Считает запросы и максимум одновременных соединений."""
+
+    def __init__(self, routes, delay=0):
+        self.routes = routes
+        self.delay = delay
+        self.hits = {}
+        self.headers = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = urlsplit(self.path).path
+                with stub.lock:
+                    count = stub.hits.get(path, 0)
+                    stub.hits[path] = count + 1
+                    stub.headers[path] = dict(self.headers)
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                time.sleep(stub.delay)
+
+                route = stub.routes.get(path, [(404, {}, {})])
+                if not isinstance(route, list):
+                    route = [(200, route, {})]
+                status, body, headers = route[min(count, len(route) - 1)]
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+                with stub.lock:
+                    stub.in_flight -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}/f1"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _client(stub, **kwargs):
+    # Без лимитов API и с мгновенными повторами - тесты проверяют логику, а не паузы
+    kwargs.setdefault('limits', ())
+    kwargs.setdefault('backoff', 0)
+    return JolpicaClient(base_url=stub.base_url, **kwargs)
+
+
+class JolpicaClientTests(TestCase):
+
+    def test_get_json(self):
+        with StubJolpica({'/f1/2024.json': {'MRData': {'total': '1'}}}) as stub, _client(stub) as client:
+            self.assertEqual(client.get_json('2024', {'limit': 100}), {'MRData': {'total': '1'}})
+            self.assertEqual(client.get_json('2024.json'), {'MRData': {'total': '1'}})
+
+    def test_retry_on_429_and_5xx(self):
+        routes = {'/f1/2024.json': [(429, {}, {'Retry-After': '0'}), (503, {}, {}), (200, {'ok': True}, {})]}
+        with StubJolpica(routes) as stub, _client(stub) as client:
+            self.assertEqual(client.get_json('2024'), {'ok': True})
+            self.assertEqual(stub.hits['/f1/2024.json'], 3)
+
+    def test_gives_up_after_retries(self):
+        errors = []
+        with StubJolpica({'/f1/2024.json': [(500, {}, {})]}) as stub, \
+                _client(stub, retries=2, log=errors.append) as client:
+            self.assertIsNone(client.get_json('2024'))
+            self.assertEqual(stub.hits['/f1/2024.json'], 3)
+            self.assertEqual(len(errors), 1)
+
+    def test_no_retry_on_404(self):
+        with StubJolpica({}) as stub, _client(stub) as client:
+            self.assertIsNone(client.get_json('missing'))
+            self.assertEqual(stub.hits['/f1/missing.json'], 1)
+
+    def test_get_many_bounded_concurrency(self):
+        routes = {f'/f1/{year}.json': {'year': year} for year in range(2000, 2012)}
+        with StubJolpica(routes, delay=0.05) as stub, _client(stub, max_workers=3) as client:
+            results = client.get_many([(str(year), None) for year in range(2000, 2012)])
+        self.assertEqual([r['year'] for r in results], list(range(2000, 2012)))
+        self.assertLessEqual(stub.max_in_flight, 3)
+        self.assertGreater(stub.max_in_flight, 1)
+
+    def test_token_bucket(self):
+        now = [0.0]
+        waits = []
+
+        def sleep(seconds):
+            waits.append(seconds)
+            now[0] += seconds
+
+        bucket = TokenBucket(rate=4, capacity=4, clock=lambda: now[0], sleep=sleep)
+        for _ in range(8):
+            bucket.acquire()
+        # 4 запроса сразу, следующие 4 - по одному каждые 0.25 с
+        self.assertAlmostEqual(now[0], 1.0)
+        self.assertEqual(len(waits), 4)
+
+
+class ImportRacesStubTests(TestCase):
+    """import_races против заглушки: календарь, протоколы гонок и спринтов -> база"""
+
+    def setUp(self):
+        Circuit.objects.create(circuit_ref='monza', name='Monza', location='Monza', country='Italy', lat=0, lng=0)
+        Constructor.objects.create(constructor_ref='ferrari', name='Ferrari', nationality='Italian')
+        Driver.objects.create(driver_ref='leclerc', forename='Charles', surname='Leclerc', nationality='Monegasque')
+
+    def test_import_season(self):
+        result = {'Driver': {'driverId': 'leclerc'}, 'Constructor': {'constructorId': 'ferrari'},
+                  'position': '1', 'positionText': '1', 'grid': '4', 'points': '25', 'status': 'Finished'}
+        race = {'season': '2024', 'round': '16', 'raceName': 'Italian Grand Prix', 'date': '2024-09-01',
+                'Circuit': {'circuitId': 'monza'}, 'url': ''}
+        routes = {
+            '/f1/2024.json': {'MRData': {'RaceTable': {'Races': [race]}}},
+            '/f1/2024/16/results.json': {'MRData': {'RaceTable': {'Races': [{'Results': [result]}]}}},
+            '/f1/2024/16/sprint.json': {'MRData': {'RaceTable': {'Races': []}}},
+        }
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(JOLPICA_CACHE_DIR=cache_dir):
+            with StubJolpica(routes) as stub, override_settings(JOLPICA_BASE_URL=stub.base_url):
+                call_command('import_races', year=2024, stdout=io.StringIO())
+                base_url = stub.base_url
+
+            saved = Result.objects.get()
+            self.assertEqual((saved.year, saved.round, saved.driver_id, saved.points), (2024, 16, 'leclerc', 25))
+            self.assertEqual(Race.objects.get().name, 'Italian Grand Prix')
+            self.assertFalse(SprintResult.objects.exists())
+
+            # Повтор без сети: тот же сезон целиком из кеша ответов
+            Race.objects.all().delete()
+            with override_settings(JOLPICA_BASE_URL=base_url):
+                call_command('import_races', year=2024, offline=True, stdout=io.StringIO())
+            self.assertEqual(Result.objects.get().driver_id, 'leclerc')
+
+
+class UpsertTests(TestCase):
+    """upsert_rows / SeasonBatch: пишутся только новые и изменившиеся строки"""
+
+    def setUp(self):
+        Circuit.objects.create(circuit_ref='monza', name='Monza', location='Monza', country='Italy', lat=0, lng=0)
+        Constructor.objects.create(constructor_ref='ferrari', name='Ferrari', nationality='Italian')
+        Driver.objects.create(driver_ref='leclerc', forename='Charles', surname='Leclerc', nationality='Monegasque')
+        self.refs = {'circuit': {'monza'}, 'constructor': {'ferrari'}, 'driver': {'leclerc'}}
+
+    def race_row(self, round_num, name):
+        return {'year': 2024, 'round': round_num, 'name': name, 'date': datetime.date(2024, 3, round_num),
+                'circuit_id': 'monza', 'url': ''}
+
+    def test_counts(self):
+        upsert = lambda rows: upsert_rows(Race, rows, ['year', 'round'], ['name', 'date', 'circuit_id', 'url'],
+                                          Race.objects.filter(year=2024))
+        counts = upsert([self.race_row(1, 'GP 1'), self.race_row(2, 'GP 2')])
+        self.assertEqual(dict(counts), {'inserted': 2, 'updated': 0, 'unchanged': 0})
+
+        counts = upsert([self.race_row(1, 'GP 1'), self.race_row(2, 'Renamed'), self.race_row(3, 'GP 3')])
+        self.assertEqual(dict(counts), {'inserted': 1, 'updated': 1, 'unchanged': 1})
+        self.assertEqual(Race.objects.get(round=2).name, 'Renamed')
+        self.assertEqual(Race.objects.count(), 3)
+
+    def test_season_batch_reads_only_written_rounds(self):
+        result = {'Driver': {'driverId': 'leclerc'}, 'Constructor': {'constructorId': 'ferrari'},
+                  'position': '1', 'positionText': '1', 'grid': '1', 'points': '25', 'status': 'Finished'}
+        race_info = lambda round_num: {'season': '2024', 'round': str(round_num), 'raceName': f'GP {round_num}',
+                                       'date': f'2024-03-{round_num:02d}', 'Circuit': {'circuitId': 'monza'}}
+        for round_num in (1, 2, 3):
+            batch = SeasonBatch(2024, self.refs)
+            batch.add_race(race_info(round_num))
+            batch.add_results(round_num, [result])
+            with CaptureQueriesContext(connection) as queries:
+                report = batch.save()
+            self.assertEqual(report['Result']['inserted'], 1)
+            # Прошлые этапы не читаются: каждый SELECT ограничен записываемым этапом
+            for query in queries.captured_queries:
+                if query['sql'].startswith('SELECT'):
+                    self.assertIn('"round" IN', query['sql'])
+        self.assertEqual(Result.objects.filter(year=2024).count(), 3)
+
+
+class BackfillTests(TestCase):
+    """import_jolpica --backfill: результаты сезона страницами /{year}/results вместо запроса на каждый этап"""
+
+    def setUp(self):
+        Circuit.objects.create(circuit_ref='monza', name='Monza', location='Monza', country='Italy', lat=0, lng=0)
+        Constructor.objects.create(constructor_ref='ferrari', name='Ferrari', nationality='Italian')
+        for ref in ('leclerc', 'sainz'):
+            Driver.objects.create(driver_ref=ref, forename=ref, surname=ref, nationality='')
+
+    def test_season_pages(self):
+        def race(round_num, *drivers):
+            results = [{'Driver': {'driverId': ref}, 'Constructor': {'constructorId': 'ferrari'},
+                        'position': str(pos), 'positionText': str(pos), 'grid': '1', 'points': '10',
+                        'status': 'Finished'} for pos, ref in enumerate(drivers, 1)]
+            return {'season': '2024', 'round': str(round_num), 'raceName': f'GP {round_num}', 'date': '2024-09-01',
+                    'Circuit': {'circuitId': 'monza'}, 'Results': results}
+
+        # Протокол 2-го этапа разбит между страницами
+        page = lambda *races: (200, {'MRData': {'total': '150', 'RaceTable': {'Races': list(races)}}}, {})
+        routes = {
+            '/f1/2024/results.json': [page(race(1, 'leclerc', 'sainz'), race(2, 'leclerc')), page(race(2, 'sainz'))],
+            '/f1/2024/sprint.json': {'MRData': {'total': '0', 'RaceTable': {'Races': []}}},
+        }
+        with StubJolpica(routes) as stub, override_settings(JOLPICA_BASE_URL=stub.base_url):
+            call_command('import_jolpica', backfill=True, from_year=2024, to_year=2024, no_cache=True,
+                         stdout=io.StringIO())
+
+        self.assertEqual(stub.hits['/f1/2024/results.json'], 2)
+        self.assertEqual(stub.hits['/f1/2024/sprint.json'], 1)
+        self.assertEqual(Race.objects.filter(year=2024).count(), 2)
+        self.assertEqual(sorted(Result.objects.filter(round=2).values_list('driver_id', flat=True)),
+                         ['leclerc', 'sainz'])
+
+
+class IncrementalSyncTests(TestCase):
+    """import_races --incremental: только новые этапы и этапы в окне правок, повтор ничего не пишет"""
+
+    def setUp(self):
+        Circuit.objects.create(circuit_ref='monza', name='Monza', location='Monza', country='Italy', lat=0, lng=0)
+        Constructor.objects.create(constructor_ref='ferrari', name='Ferrari', nationality='Italian')
+        Driver.objects.create(driver_ref='leclerc', forename='Charles', surname='Leclerc', nationality='Monegasque')
+
+        today = timezone.localdate()
+        self.year = today.year
+        result = {'Driver': {'driverId': 'leclerc'}, 'Constructor': {'constructorId': 'ferrari'},
+                  'position': '1', 'positionText': '1', 'grid': '1', 'points': '25', 'status': 'Finished'}
+        # Этап 1 - давно, этап 2 - вчера (в окне правок), этап 3 - еще не прошел
+        races = [{'season': str(self.year), 'round': str(round_num), 'raceName': f'GP {round_num}',
+                  'date': (today + datetime.timedelta(days=days)).isoformat(), 'Circuit': {'circuitId': 'monza'}}
+                 for round_num, days in ((1, -30), (2, -1), (3, 14))]
+        self.routes = {f'/f1/{self.year}.json': {'MRData': {'RaceTable': {'Races': races}}}}
+        for round_num in (1, 2, 3):
+            self.routes[f'/f1/{self.year}/{round_num}/results.json'] = \
+                {'MRData': {'RaceTable': {'Races': [{'Results': [result]}]}}}
+            self.routes[f'/f1/{self.year}/{round_num}/sprint.json'] = {'MRData': {'RaceTable': {'Races': []}}}
+
+    def sync(self, stub):
+        out = io.StringIO()
+        with override_settings(JOLPICA_BASE_URL=stub.base_url):
+            call_command('import_races', incremental=True, no_cache=True, stdout=out)
+        return out.getvalue()
+
+    def test_resumes_and_skips_unchanged(self):
+        with StubJolpica(self.routes) as stub:
+            self.sync(stub)
+            self.assertEqual(Result.objects.filter(year=self.year).count(), 2)
+            self.assertEqual(set(RoundSync.objects.values_list('round', flat=True)), {1, 2})
+            self.assertNotIn(f'/f1/{self.year}/3/results.json', stub.hits)
+
+            # Сразу повторно: оба этапа загружены только что - протоколы не запрашиваются
+            output = self.sync(stub)
+            self.assertIn('Данные не изменились', output)
+            self.assertEqual(stub.hits[f'/f1/{self.year}/1/results.json'], 1)
+            self.assertEqual(stub.hits[f'/f1/{self.year}/2/results.json'], 1)
+
+            # Через час этап в окне правок перекачивается, старый этап - нет; протокол тот же - записи нет
+            RoundSync.objects.update(fetched_at=timezone.now() - REFRESH_INTERVAL)
+            output = self.sync(stub)
+            self.assertIn('без изменений', output)
+            self.assertIn('Данные не изменились', output)
+            self.assertEqual(stub.hits[f'/f1/{self.year}/1/results.json'], 1)
+            self.assertEqual(stub.hits[f'/f1/{self.year}/2/results.json'], 2)
+
+    def test_failed_round_has_no_checkpoint(self):
+        del self.routes[f'/f1/{self.year}/2/results.json']
+        with StubJolpica(self.routes) as stub:
+            self.sync(stub)
+        self.assertEqual(list(RoundSync.objects.values_list('round', flat=True)), [1])
+
+    def test_failed_sprint_keeps_race_results(self):
+        # Спринт не скачался: результаты гонки пишем, но без отметки - этап повторится целиком
+        del self.routes[f'/f1/{self.year}/2/sprint.json']
+        with StubJolpica(self.routes) as stub:
+            output = self.sync(stub)
+        self.assertIn('спринт не загружен', output)
+        self.assertEqual(Result.objects.filter(year=self.year).count(), 2)
+        self.assertEqual(list(RoundSync.objects.values_list('round', flat=True)), [1])
+
+
+class ResponseCacheTests(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_ttl(self):
+        fetched = datetime.datetime(2025, 6, 1).timestamp()
+        self.assertIsNone(cache_ttl('1988/5/results', fetched))
+        # Сезон, скачанный еще во время чемпионата, не становится вечным после Нового года
+        self.assertEqual(cache_ttl('2025/5/results', fetched), CURRENT_SEASON_TTL)
+        self.assertIsNotNone(cache_ttl('drivers', fetched))
+
+    def test_past_season_served_from_cache(self):
+        with StubJolpica({'/f1/1988.json': {'season': 1988}}) as stub, _client(stub, cache=self.cache) as client:
+            self.assertEqual(client.get_json('1988'), {'season': 1988})
+            self.assertEqual(client.get_json('1988'), {'season': 1988})
+            self.assertEqual(stub.hits['/f1/1988.json'], 1)
+
+    def test_revalidation(self):
+        year = datetime.date.today().year
+        path = f'/f1/{year}.json'
+        routes = {path: [(200, {'v': 1}, {'ETag': '"v1"'}), (304, {}, {})]}
+        with StubJolpica(routes) as stub, _client(stub, cache=self.cache) as client:
+            client.get_json(str(year))
+            # Запись текущего сезона устарела - условный запрос, 304, тело из кеша
+            entry = self.cache.get(client.url(str(year)), None)
+            self.cache.put(entry['url'], None, entry['body'], {'ETag': entry['etag']},
+                           fetched_at=time.time() - CURRENT_SEASON_TTL - 1)
+            self.assertEqual(client.get_json(str(year)), {'v': 1})
+            self.assertEqual(stub.hits[path], 2)
+            self.assertEqual(stub.headers[path].get('If-None-Match'), '"v1"')
+
+    def test_offline(self):
+        with StubJolpica({'/f1/2000.json': {'season': 2000}}) as stub:
+            with _client(stub, cache=self.cache) as client:
+                client.get_json('2000', {'limit': 100})
+            with _client(stub, cache=self.cache, offline=True) as client:
+                self.assertEqual(client.get_json('2000', {'limit': 100}), {'season': 2000})
+                self.assertIsNone(client.get_json('2001'))
+            self.assertEqual(stub.hits, {'/f1/2000.json': 1})
+
+
+class ProgressionTests(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        make_season(2024, [
+            [('alpha', 'red', 1, 25), ('bravo', 'blue', 2, 18)],
+            [('bravo', 'blue', 1, 25), ('alpha', 'red', 3, 15)],
+        ], sprints={2: [('bravo', 'blue', 1, 8)]})
+
+    def test_cumulative_points_and_positions(self):
+        data = get_progression(2024)
+        self.assertEqual([r['round'] for r in data['rounds']], [1, 2])
+        drivers = {d['ref']: d for d in data['drivers']}
+        # Спринт идет в очки этапа
+        self.assertEqual(drivers['alpha']['points'], [25, 40])
+        self.assertEqual(drivers['bravo']['points'], [18, 51])
+        self.assertEqual(drivers['alpha']['positions'], [1, 2])
+        self.assertEqual(drivers['bravo']['positions'], [2, 1])
+        self.assertEqual([d['ref'] for d in data['drivers']], ['bravo', 'alpha'])
+        self.assertEqual([t['ref'] for t in data['constructors']], ['blue', 'red'])
+
+    def test_tie_broken_by_wins(self):
+        make_season(2023, [
+            [('bravo', 'blue', 1, 25), ('alpha', 'red', 2, 18)],
+            [('alpha', 'red', 2, 17), ('bravo', 'blue', 5, 10), ('charlie', 'red', 1, 25)],
+        ])
+        drivers = {d['ref']: d for d in get_progression(2023)['drivers']}
+        # У alpha и bravo по 35 очков, выше тот, у кого больше побед
+        self.assertEqual(drivers['alpha']['points'][-1], drivers['bravo']['points'][-1])
+        self.assertEqual((drivers['bravo']['positions'][-1], drivers['alpha']['positions'][-1]), (1, 2))
+
+    def test_fractional_points_tie(self):
+        # 1/7 + 1/2 + 1/7 и 1/2 + 2/7 в float различаются в последнем знаке, но это равенство очков:
+        # выше тот, у кого победа
+        make_season(1954, [
+            [('alpha', 'red', 1, 1 / 7), ('bravo', 'blue', 2, 1 / 2)],
+            [('alpha', 'red', 3, 1 / 2), ('bravo', 'blue', 2, 2 / 7)],
+            [('alpha', 'red', 4, 1 / 7)],
+        ])
+        drivers = {d['ref']: d for d in get_progression(1954)['drivers']}
+        self.assertEqual((drivers['alpha']['positions'][-1], drivers['bravo']['positions'][-1]), (1, 2))
+
+    def test_cache_follows_data_version(self):
+        self.assertEqual(len(get_progression(2024)['drivers']), 2)
+        Driver.objects.create(driver_ref='charlie', forename='C', surname='C', nationality='')
+        Result.objects.create(race=Race.objects.get(year=2024, round=2), driver_id='charlie', constructor_id='red',
+                              grid=4, position=4, position_text='4', points=12, status='Finished')
+        # Импорт (в любом процессе) поднимает версию данных - старый ответ из кеша не берется
+        self.assertEqual(len(get_progression(2024)['drivers']), 2)
+        bump_data_version()
+        self.assertEqual(len(get_progression(2024)['drivers']), 3)
+
+
+class StandingsTests(TestCase):
+    """Зачеты сезона: очки гонок и спринтов, равенство очков решают победы, сохраненные таблицы = расчет на лету"""
+
+    def setUp(self):
+        # alpha и bravo по 40 очков, победа только у bravo; bravo посреди сезона переходит из red в blue;
+        # charlie сошел в 1-м этапе, победа в спринте идет только в очки
+        make_season(2024, [
+            [('bravo', 'red', 1, 25), ('alpha', 'red', 2, 18), ('charlie', 'blue', None, 0)],
+            [('charlie', 'blue', 1, 25), ('alpha', 'red', 2, 22), ('bravo', 'blue', 3, 15)],
+        ], sprints={2: [('charlie', 'blue', 1, 3)]})
+        rebuild_season_entries(2024)
+
+    def test_driver_standings(self):
+        rows = [(r['position'], r['driver'].pk, r['team'].pk, r['points'], r['wins'], r['podiums'], r['poles'],
+                 r['dnfs']) for r in driver_standings(2024)]
+        self.assertEqual(rows, [
+            (1, 'bravo', 'blue', 40, 1, 2, 1, 0),
+            (2, 'alpha', 'red', 40, 0, 2, 0, 0),
+            (3, 'charlie', 'blue', 28, 1, 1, 1, 1),
+        ])
+
+    def test_constructor_standings(self):
+        rows = [(r['position'], r['team'].pk, r['points'], r['wins']) for r in constructor_standings(2024)]
+        self.assertEqual(rows, [(1, 'red', 65, 1), (2, 'blue', 43, 1)])
+
+    def test_saved_tables_match(self):
+        live = [(r.position, r.driver_id, r.team_id, r.points, r.wins) for r in get_driver_table(2024)]
+        self.assertEqual(rebuild_season_standings(2024), (3, 2))
+        with self.assertNumQueries(1):
+            saved = [(r.position, r.driver_id, r.team_id, r.points, r.wins) for r in get_driver_table(2024)]
+        self.assertEqual(saved, live)
+        self.assertEqual([(r.position, r.team_id) for r in get_constructor_table(2024)], [(1, 'red'), (2, 'blue')])
+
+
+def make_careers():
+    """alpha: 2023 в red (победа с поула и сход), 2024 в blue вместе с bravo (+ победа в спринте)"""
+    make_season(2023, [[('alpha', 'red', 1, 25)], [('alpha', 'red', None, 0)]])
+    make_season(2024, [
+        [('bravo', 'blue', 1, 25), ('alpha', 'blue', 2, 18)],
+        [('alpha', 'blue', 1, 25), ('bravo', 'blue', 3, 15)],
+        [('alpha', 'blue', 4, 12), ('bravo', 'blue', 5, 10)],
+    ], sprints={2: [('alpha', 'blue', 1, 8)]})
+    rebuild_season_entries(2023)
+    rebuild_season_entries(2024)
+
+
+class DriverDetailTests(TestCase):
+    """Страница пилота: карьера и сезон одним aggregate, таблица сезона, история команд"""
+
+    def setUp(self):
+        clear_caches()
+        make_careers()
+
+    def get(self, **params):
+        clear_caches()
+        return self.client.get(reverse('driver_detail', args=['alpha']), params).context
+
+    def test_stats(self):
+        context = self.get()
+        self.assertEqual(context['selected_year'], 2024)
+        self.assertEqual(context['career_stats'], {'races': 5, 'wins': 2, 'podiums': 3, 'poles': 2, 'dnfs': 1,
+                                                   'top10s': 4, 'points': 88})
+        self.assertEqual(context['season_gp_stats'], {'races': 3, 'wins': 1, 'podiums': 2, 'poles': 1, 'dnfs': 0,
+                                                      'top10s': 3, 'points': 55})
+        self.assertEqual(context['season_sprint_stats']['points'], 8)
+        self.assertEqual(context['season_total_stats']['points'], 63)
+
+    def test_season_table_and_teams(self):
+        context = self.get()
+        self.assertEqual([(row['race'].round, row['main'].position, row['sprint'] is not None)
+                          for row in context['table_data']], [(1, 2, False), (2, 1, True), (3, 4, False)])
+        self.assertEqual([(item['team'].pk, item['period']) for item in context['teams_history']],
+                         [('blue', '2024'), ('red', '2023')])
+
+        context = self.get(year=2023, sort='desc')
+        self.assertEqual([row['race'].round for row in context['table_data']], [2, 1])
+        self.assertEqual(context['season_gp_stats']['dnfs'], 1)
+
+    def test_queries_do_not_grow_with_races(self):
+        clear_caches()
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(reverse('driver_detail', args=['alpha']))
+        make_season(2022, [[('alpha', 'red', 3, 15)]] * 5)
+        rebuild_season_entries(2022)
+        clear_caches()
+        with self.assertNumQueries(len(before)):
+            self.client.get(reverse('driver_detail', args=['alpha']), {'year': 2022})
+
+
+class ConstructorDetailTests(TestCase):
+    """Страница команды: статистика, пилоты сезона и сравнение, история пилотов, таблица гонок"""
+
+    def setUp(self):
+        clear_caches()
+        make_careers()
+
+    def get(self, ref, **params):
+        clear_caches()
+        return self.client.get(reverse('constructor_detail', args=[ref]), params).context
+
+    def test_season(self):
+        context = self.get('blue')
+        self.assertEqual(context['selected_year'], 2024)
+        self.assertEqual(context['total_stats'], {'races': 3, 'wins': 2, 'podiums': 4, 'poles': 2, 'points': 113})
+        self.assertEqual(context['season_sprint_stats']['points'], 8)
+        # Спринт идет в очки пилота, сравниваются двое основных
+        self.assertEqual([(d['obj'].pk, d['races'], d['points'], d['wins'], d['best_pos'])
+                          for d in context['drivers_detailed']], [('alpha', 3, 63, 1, 1), ('bravo', 3, 50, 1, 1)])
+        self.assertEqual([d['obj'].pk for d in context['comparison_drivers']], ['alpha', 'bravo'])
+        self.assertEqual([(row['race'].round, len(row['results']), len(row['sprints']))
+                          for row in context['season_race_data']], [(1, 2, 0), (2, 2, 1), (3, 2, 0)])
+
+    def test_history(self):
+        context = self.get('red')
+        self.assertEqual((context['selected_year'], context['first_entry']), (2023, 2023))
+        self.assertEqual(context['season_gp_stats']['dnfs'], 1)
+        self.assertEqual([(item['driver'].pk, item['period']) for item in context['all_drivers']],
+                         [('alpha', '2023')])
+
+
+class PodiumTests(TestCase):
+    """Подиумы и победители для набора гонок одним запросом"""
+
+    def setUp(self):
+        # 1: 3-го места нет (дисквалификация), сход - в конце; 2: только сходы; 3: результатов нет
+        self.races = make_season(1958, [
+            [('charlie', 'red', None, 0), ('bravo', 'blue', 2, 6), ('alpha', 'red', 1, 8), ('delta', 'blue', 4, 3)],
+            [('alpha', 'red', None, 0), ('bravo', 'blue', None, 0)],
+            [],
+        ])
+
+    def test_podiums(self):
+        with self.assertNumQueries(1):
+            podiums = race_podiums(self.races)
+        first, second, third = self.races
+        self.assertEqual([res.driver_id for res in podiums[first.id]], ['alpha', 'bravo', 'delta'])
+        self.assertEqual(len(podiums[second.id]), 2)
+        self.assertNotIn(third.id, podiums)
+
+    def test_winners(self):
+        winners = race_winners(self.races)
+        self.assertEqual({race_id: res.driver_id for race_id, res in winners.items()}, {self.races[0].id: 'alpha'})
+
+
+class RosterTests(TestCase):
+    """Составы сезона (SeasonEntry) и список пилотов по последнему этапу"""
+
+    def setUp(self):
+        clear_caches()
+        # alpha посреди сезона переходит из red в blue, bravo пропускает последний этап
+        make_season(2024, [
+            [('alpha', 'red', 1, 25), ('bravo', 'blue', 2, 18)],
+            [('alpha', 'blue', 2, 18), ('bravo', 'blue', 1, 25)],
+            [('alpha', 'blue', 1, 25), ('charlie', 'red', 2, 18)],
+        ], sprints={3: [('charlie', 'red', 1, 8)]})
+
+    def entries(self):
+        return {(e.driver_id, e.constructor_id): (e.first_round, e.last_round, e.races)
+                for e in season_entries(2024)}
+
+    def test_rebuild(self):
+        expected = {('alpha', 'red'): (1, 1, 1), ('alpha', 'blue'): (2, 3, 2),
+                    ('bravo', 'blue'): (1, 2, 2), ('charlie', 'red'): (3, 3, 1)}
+        # До пересчета - на лету по результатам, после - из таблицы, совпадают
+        self.assertFalse(SeasonEntry.objects.exists())
+        self.assertEqual(self.entries(), expected)
+        self.assertEqual(rebuild_season_entries(2024), 4)
+        self.assertEqual(self.entries(), expected)
+
+    def test_teams_without_rebuild(self):
+        # Сезон не пересчитан: команды в зачете и в истории пилота - по результатам
+        self.assertEqual({row['driver'].pk: row['team'].pk for row in driver_standings(2024)},
+                         {'alpha': 'blue', 'bravo': 'blue', 'charlie': 'red'})
+        context = self.client.get(reverse('driver_detail', args=['alpha'])).context
+        self.assertEqual({(item['team'].pk, item['period']) for item in context['teams_history']},
+                         {('red', '2024'), ('blue', '2024')})
+
+    def test_driver_list_last_round(self):
+        for rebuilt in (False, True):
+            if rebuilt:
+                rebuild_season_entries(2024)
+                clear_caches()
+            response = self.client.get(reverse('driver_list'), {'year': 2024})
+            rows = {row['driver'].pk: row['team'].pk for row in response.context['drivers_data']}
+            # Состав последнего этапа, команда - последняя в сезоне
+            self.assertEqual(rows, {'alpha': 'blue', 'charlie': 'red'})
+
+
+class ScoringTests(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        # 1955: 8-6-4-3-2 + 1 за быстрый круг (у bravo 7 очков за второе место - быстрый круг)
+        make_season(1955, [
+            [('alpha', 'red', 1, 8), ('bravo', 'blue', 2, 7), ('charlie', 'blue', None, 0)],
+            [('charlie', 'blue', 1, 8), ('alpha', 'red', 2, 6)],
+        ])
+
+    def test_historical_season_keeps_order(self):
+        scores = season_scores('1950', 1955)
+        self.assertEqual(scores['drivers'], {'alpha': (14, 1), 'charlie': (8, 2), 'bravo': (7, 3)})
+        self.assertEqual(scores['constructors'], {'blue': (15, 1), 'red': (14, 2)})
+
+    def test_rescore_with_modern_system(self):
+        drivers = season_scores('2019', 1955)['drivers']
+        # 25 + 18; 18 + 1 за быстрый круг; победитель второго этапа - 25
+        self.assertEqual(drivers['alpha'], (43, 1))
+        self.assertEqual(drivers['charlie'], (25, 2))
+        self.assertEqual(drivers['bravo'], (19, 3))
+
+    def test_cache_follows_data_version(self):
+        season_scores('2010', 1955)
+        Result.objects.filter(driver='charlie', position=1).update(position=3)
+        self.assertEqual(season_scores('2010', 1955)['drivers']['charlie'][0], 25)
+        bump_data_version()
+        self.assertEqual(season_scores('2010', 1955)['drivers']['charlie'][0], 15)
+
+
+class SearchIndexTests(TestCase):
+    """Fuzzy-индекс в памяти: триграммные кандидаты, опечатки, пересборка по версии данных"""
+
+    def setUp(self):
+        clear_caches()
+        make_season(2024, [[('hamilton', 'mercedes', 1, 25), ('russell', 'mercedes', 2, 18)]])
+        Driver.objects.filter(pk='hamilton').update(forename='Lewis', surname='Hamilton')
+        Driver.objects.filter(pk='russell').update(forename='George', surname='Russell')
+
+    def test_typo(self):
+        index = get_search_index()
+        self.assertEqual([d.pk for d in index.drivers.search('hamiltn', 70)], ['hamilton'])
+        self.assertEqual([d.pk for d in index.drivers.search('George Russel', 70)], ['russell'])
+        self.assertEqual(index.drivers.search('hamiltn', 70, allowed={'russell'}), [])
+
+    def test_candidates_share_ngrams(self):
+        index = get_search_index()
+        self.assertEqual({key for key, _ in index.drivers.candidates('hamiltn')}, {'hamilton'})
+        # Короче n-граммы - сравниваем со всеми строками
+        self.assertEqual(len(index.drivers.candidates('ha')), 4)
+
+    def test_rebuilt_on_new_version(self):
+        index = get_search_index()
+        self.assertIs(get_search_index(), index)
+        Driver.objects.create(driver_ref='hulkenberg', forename='Nico', surname='Hulkenberg', nationality='')
+        self.assertEqual(index.drivers.search('hulkenberg', 70), [])
+        bump_data_version()
+        self.assertEqual([d.pk for d in get_search_index().drivers.search('hulkenberg', 70)], ['hulkenberg'])
+
+
+class FtsTests(TestCase):
+    """FTS5: слова по началу и без диакритики, подстроки через trigram, фильтр по году"""
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('FTS5 - только SQLite')
+        make_season(2023, [[('vettel', 'ferrari', 1, 25)]], circuit='nurburgring')
+        make_season(2024, [[('vettel', 'ferrari', 1, 25)]], circuit='nurburgring')
+        Circuit.objects.filter(pk='nurburgring').update(name='Nürburgring', location='Nürburg', country='Germany')
+        Race.objects.update(name='Eifel Grand Prix')
+        Driver.objects.filter(pk='vettel').update(forename='Sebastian', surname='Vettel')
+        self.assertEqual(rebuild_search_fts(), 2 + 1 + 1 + 1)
+
+    def test_prefix_and_diacritics(self):
+        found = search_fts('nurburg')
+        self.assertEqual(found['circuit'], ['nurburgring'])
+        # Обе гонки, свежий сезон первым
+        self.assertEqual([Race.objects.get(pk=pk).year for pk in found['race']], [2024, 2023])
+        self.assertEqual(search_fts('seb vett')['driver'], ['vettel'])
+
+    def test_substring(self):
+        self.assertEqual(search_fts('rburgr')['circuit'], ['nurburgring'])
+        self.assertEqual(search_fts('ettel')['driver'], ['vettel'])
+
+    def test_year(self):
+        races = search_fts('eifel', year=2023)['race']
+        self.assertEqual([Race.objects.get(pk=pk).year for pk in races], [2023])
+        self.assertEqual(search_fts('eifel', year=2023)['driver'], [])
+
+    def test_syntax_is_escaped(self):
+        self.assertEqual(search_fts('"eifel" OR *'), search_fts('eifel'))
+        self.assertEqual(search_fts('***'), {kind: [] for kind in ('race', 'driver', 'circuit', 'constructor')})
+
+
+class SuggestTests(TestCase):
+    """Автодополнение: префикс без диакритики, недавние выше, JSON без запросов к таблицам"""
+
+    def setUp(self):
+        clear_caches()
+        make_season(2010, [[('perez_old', 'ferrari', 1, 25)]])
+        make_season(2024, [[('perez', 'red_bull', 1, 25)]])
+        Driver.objects.filter(pk='perez').update(forename='Sergio', surname='Pérez', code='PER')
+        Driver.objects.filter(pk='perez_old').update(forename='Luis', surname='Pérez-Sala')
+        rebuild_season_entries(2010)
+        rebuild_season_entries(2024)
+
+    def suggest(self, query, **params):
+        return self.client.get(reverse('search_suggest'), {'q': query, **params}).json()['results']
+
+    def test_prefix(self):
+        labels = [item['label'] for item in self.suggest('pere')['drivers']]
+        self.assertEqual(labels, ['Sergio Pérez', 'Luis Pérez-Sala'])
+        self.assertEqual([item['label'] for item in self.suggest('sergio p')['drivers']], ['Sergio Pérez'])
+        self.assertEqual(self.suggest('per', limit=1)['drivers'][0]['url'], reverse('driver_detail', args=['perez']))
+        self.assertEqual([item['label'] for item in self.suggest('2010 gr')['races']], ['Grand Prix 1 2010'])
+
+    def test_index_only(self):
+        get_search_index()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('search_suggest'), {'q': 'per'})
+        # Только версия данных (индекс актуален?), префиксы в кеш страниц не попадают
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.assertIn('racing_dataversion', queries.captured_queries[0]['sql'])
+        self.assertFalse(response.has_header('X-Page-Cache'))
+
+
+class PhoneticSearchTests(TestCase):
+    """Запросы на кириллице: фонетический индекс + гонки найденной трассы"""
+
+    def setUp(self):
+        clear_caches()
+        make_season(2024, [[('hamilton', 'mercedes', 1, 25), ('max_verstappen', 'red_bull', 2, 18)]])
+        Circuit.objects.filter(pk='monza').update(name='Autodromo Nazionale di Monza', location='Monza')
+        Circuit.objects.create(circuit_ref='lemans', name='Le Mans', location='Le Mans', country='France')
+        Driver.objects.filter(pk='hamilton').update(forename='Lewis', surname='Hamilton')
+        Driver.objects.filter(pk='max_verstappen').update(forename='Max', surname='Verstappen')
+        Driver.objects.create(driver_ref='duncan_hamilton', forename='Duncan', surname='Hamilton', nationality='')
+        Driver.objects.create(driver_ref='verstappen', forename='Jos', surname='Verstappen', nationality='')
+        Driver.objects.create(driver_ref='sala', forename='Luis', surname='Sala', nationality='')
+
+    def search(self, query):
+        return self.client.get(reverse('search'), {'q': query}).context
+
+    def test_monza(self):
+        context = self.search('Монца')
+        # "mns" = Monza и Le Mans, но Le Mans на транслит "montsa" не похож
+        self.assertEqual([c.pk for c in context['circuits']], ['monza'])
+        self.assertEqual([(r.year, r.round) for r in context['races']], [(2024, 1)])
+
+    def test_hamilton(self):
+        self.assertEqual([d.pk for d in self.search('Хэмилтон')['drivers']], ['hamilton', 'duncan_hamilton'])
+
+    def test_verstappen(self):
+        self.assertEqual({d.pk for d in self.search('Ферстапен')['drivers']}, {'max_verstappen', 'verstappen'})
+
+    def test_longer_key_ranks_first(self):
+        # "Луис" похож на "Льюис" больше, чем "Lewis", но фамилия весит больше имени
+        index = get_search_index().phonetic['drivers']
+        self.assertEqual(index.search('хэмилтон льюис')[0].pk, 'hamilton')
+
+
+class SqliteProfileTests(TestCase):
+
+    def connect(self, path, profile):
+        conn = sqlite3.connect(path, isolation_level=None, timeout=0)
+        for name, value in sqlite_pragmas(profile).items():
+            if name != 'busy_timeout':
+                conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def test_tuned_profile_leaves_db_file_alone(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'db.sqlite3')
+            self.connect(path, 'default').execute("CREATE TABLE t (x)")
+            self.connect(path, 'tuned').execute("SELECT * FROM t").fetchall()
+            # Байты 18-19 заголовка: 1 - журнал отката, 2 - WAL
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(20)[18:20], b'\x01\x01')
+
+    def test_wal_readers_not_blocked_by_writer(self):
+        for profile, blocked in (('default', True), ('wal', False)):
+            with self.subTest(profile=profile), tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'db.sqlite3')
+                writer = self.connect(path, profile)
+                writer.execute("CREATE TABLE t (x)")
+                writer.execute("INSERT INTO t VALUES (1)")
+                reader = self.connect(path, profile)
+                writer.execute("BEGIN EXCLUSIVE")
+                writer.execute("UPDATE t SET x = 2")
+
+                if blocked:
+                    with self.assertRaises(sqlite3.OperationalError):
+                        reader.execute("SELECT x FROM t").fetchall()
+                else:
+                    self.assertEqual(reader.execute("SELECT x FROM t").fetchall(), [(1,)])
+                writer.execute("COMMIT")
+                reader.close()
+                writer.close()
+
+
+class WarmCacheTests(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        make_season(2024, [[('alpha', 'red', 1, 25)]])
+        rebuild_season_entries(2024)
+
+    def test_process_local_cache_is_skipped(self):
+        out = io.StringIO()
+        with self.assertNumQueries(0):
+            call_command('warm_cache', year=[2024], stdout=out)
+        self.assertIn('прогрев пропущен', out.getvalue())
+
+    def test_render_error_is_logged(self):
+        def broken(request):
+            raise RuntimeError('boom')
+
+        with mock.patch('racing.management.commands.warm_cache.resolve',
+                        return_value=mock.Mock(func=broken, args=(), kwargs={}, url_name='broken')), \
+                self.assertLogs('racing.management.commands.warm_cache', 'ERROR') as logs:
+            self.assertEqual(render_url('/broken/')[1], 500)
+        self.assertIn('boom', logs.output[0])
+
+
+class WarmSharedCacheTests(TransactionTestCase):
+    """Рендер идет в потоках со своими соединениями - данные должны быть закоммичены"""
+
+    def setUp(self):
+        clear_caches()
+        make_season(2024, [[('alpha', 'red', 1, 25)]])
+        rebuild_season_entries(2024)
+
+    def test_warms_shared_cache(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(CACHES={
+            **settings.CACHES,
+            'pages': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': tmp},
+        }):
+            call_command('warm_cache', year=[2024], workers=1, stdout=io.StringIO())
+            response = self.client.get(reverse('season_detail', args=[2024]))
+            self.assertEqual(response['X-Page-Cache'], 'hit')
+            self.assertEqual(self.client.get(reverse('driver_detail', args=['alpha']))['X-Page-Cache'], 'hit')
+
+
+class PageCacheTests(TestCase):
+    """Кеш страниц по версии данных: попадание - только запросы версии, без ORM и шаблонов"""
+
+    def setUp(self):
+        clear_caches()
+        make_season(2024, [[('alpha', 'red', 1, 25), ('bravo', 'blue', 2, 18)]])
+        rebuild_season_entries(2024)
+        rebuild_season_standings(2024)
+
+    def test_hit_queries_only_version(self):
+        url = reverse('season_detail', args=[2024])
+        first = self.client.get(url)
+        self.assertEqual(first['X-Page-Cache'], 'miss')
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(url)
+        self.assertEqual(second['X-Page-Cache'], 'hit')
+        self.assertEqual(second.content, first.content)
+        self.assertTrue(queries.captured_queries)
+        for query in queries.captured_queries:
+            self.assertIn('racing_dataversion', query['sql'])
+
+    def test_new_version_misses(self):
+        url = reverse('race_detail', args=[2024, 1])
+        self.client.get(url)
+        bump_data_version()
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'hit')
+
+    def test_query_order_does_not_matter(self):
+        url = reverse('driver_list')
+        self.assertEqual(self.client.get(f'{url}?year=2024&sort=team')['X-Page-Cache'], 'miss')
+        self.assertEqual(self.client.get(f'{url}?sort=team&year=2024')['X-Page-Cache'], 'hit')
+        self.assertEqual(self.client.get(f'{url}?sort=number&year=2024')['X-Page-Cache'], 'miss')
+
+    def test_errors_not_cached(self):
+        url = reverse('driver_detail', args=['nobody'])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('X-Page-Cache'))
+
+
+class InlineExecutor:
+    """Вместо пула процессов в тестах: тестовая база в памяти живет только в этом процессе"""
+
+    def __init__(self, max_workers=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def map(self, fn, iterable, chunksize=1):
+        return map(fn, iterable)
+
+
+@mock.patch('racing.management.commands.export_static.ProcessPoolExecutor', InlineExecutor)
+class ExportStaticTests(TestCase):
+    """export_static: страницы в файлы, --incremental перерисовывает только страницы с новыми данными"""
+
+    def setUp(self):
+        clear_caches()
+        make_season(2023, [[('alpha', 'red', 1, 25)]])
+        make_season(2024, [[('bravo', 'blue', 1, 25)]])
+        for year in (2023, 2024):
+            rebuild_season_entries(year)
+            rebuild_season_standings(year)
+        mark_seasons_modified([2023, 2024])
+        DataVersion.objects.update(updated_at=timezone.now() - datetime.timedelta(hours=1))
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.output = os.path.join(self.tmp.name, 'site')
+
+    def export(self, **options):
+        out = io.StringIO()
+        with override_settings(MEDIA_ROOT=self.tmp.name):
+            call_command('export_static', output=self.output, workers=1, stdout=out, **options)
+        return out.getvalue()
+
+    def test_export(self):
+        output = self.export()
+        self.assertNotIn('с ошибкой', output)
+        for path in ('index.html', 'season/2024/index.html', 'drivers/alpha/index.html',
+                     'season/2024/progression.json'):
+            self.assertTrue(os.path.exists(os.path.join(self.output, path)), path)
+        with open(os.path.join(self.output, 'season/2024/index.html'), encoding='utf-8') as f:
+            self.assertIn('Bravo', f.read())
+
+    def test_incremental(self):
+        self.export()
+        self.assertIn('ЭКСПОРТ: 0 из', self.export(incremental=True))
+
+        # Импорт сезона 2024: страницы 2023 и его пилота не перерисовываются
+        Result.objects.filter(year=2024).update(points=26)
+        mark_seasons_modified([2024])
+        season_2023 = os.path.join(self.output, 'season/2023/index.html')
+        os.utime(season_2023, (0, 0))
+        self.export(incremental=True)
+        self.assertEqual(os.stat(season_2023).st_mtime, 0)
+        with open(os.path.join(self.output, 'season/2024/progression.json'), encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['drivers'][0]['points'], [26])
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        make_season(2024, [[('alpha', 'red', 1, 25)]])
+        rebuild_season_entries(2024)
+        mark_seasons_modified([2024])
+        # Отметки - целые секунды: отодвигаем их, чтобы следующий импорт точно был "позже"
+        DataVersion.objects.update(updated_at=timezone.now() - datetime.timedelta(hours=1))
+
+    def get(self, url, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(url, **headers)
+
+    def test_matching_etag_gets_304(self):
+        url = reverse('season_detail', args=[2024])
+        response = self.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get(url, response['ETag']).status_code, 304)
+
+    def test_new_season_changes_season_pages(self):
+        pages = {name: reverse(name, args=args) for name, args in (
+            ('season_detail', [2024]), ('calendar', [2024]), ('race_detail', [2024, 1]))}
+        etags = {name: self.get(url)['ETag'] for name, url in pages.items()}
+
+        make_season(2025, [[('alpha', 'red', 1, 25)]])
+        mark_seasons_modified([2025])
+
+        # В переключателе годов появился 2025 - страницы сезона и календаря 2024 изменились
+        self.assertEqual(self.get(pages['season_detail'], etags['season_detail']).status_code, 200)
+        self.assertEqual(self.get(pages['calendar'], etags['calendar']).status_code, 200)
+        # Страница гонки 2024 от списка сезонов не зависит
+        self.assertEqual(self.get(pages['race_detail'], etags['race_detail']).status_code, 304)
+
+
+class SmartAnswerTests(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        # По сумме очков впереди Прост (25 против 24), но чемпион 1988 - Сенна
+        make_season(1988, [
+            [('senna', 'mclaren', 1, 9), ('prost', 'mclaren', 2, 6)],
+            [('prost', 'mclaren', 1, 9), ('senna', 'mclaren', 2, 6)],
+            [('prost', 'mclaren', 1, 9), ('senna', 'mclaren', 2, 6)],
+            [('senna', 'mclaren', 4, 3), ('prost', 'mclaren', 6, 1)],
+        ])
+        rebuild_season_standings(1988)
+        DriverTitle.objects.create(year=1988, driver_id='senna', points=90)
+
+    def answer(self, query, year=None):
+        return smart_answer(query, year, get_search_index())
+
+    def test_official_champion(self):
+        answer = self.answer('чемпион 1988', 1988)
+        self.assertEqual((answer['obj'].pk, answer['description']), ('senna', 'Набрал 90 очков.'))
+
+    def test_points_leader_without_official_title(self):
+        DriverTitle.objects.all().delete()
+        bump_data_version()
+        self.assertEqual(self.answer('чемпион 1988', 1988)['obj'].pk, 'prost')
+
+    def test_race_winner(self):
+        answer = self.answer('кто выиграл монца 1988', 1988)
+        self.assertEqual((answer['title'], answer['obj'].pk), ('Grand Prix 1 1988', 'senna'))
+
+    def test_team_titles(self):
+        answer = self.answer('титулы mclaren')
+        self.assertEqual(answer['obj'].pk, 'mclaren')
+        self.assertEqual(answer['description'], 'Кубков конструкторов: 1 (1988).')
+        Constructor.objects.filter(pk='mclaren').update(championships=8)
+        bump_data_version()
+        self.assertEqual(self.answer('титулы mclaren')['description'], 'Кубков конструкторов: 8.')
+
+    def test_constructors_without_saved_standings(self):
+        # Сезон еще не пересчитан: кубок и титулы команды считаются по результатам
+        make_season(2020, [[('hamilton', 'mercedes', 1, 25), ('verstappen', 'red_bull', 2, 18)]])
+        bump_data_version()
+        answer = self.answer('кубок конструкторов 2020', 2020)
+        self.assertEqual((answer['obj'].pk, answer['description']), ('mercedes', 'Набрали 25 очков.'))
+        self.assertEqual(self.answer('титулы mercedes')['description'], 'Кубков конструкторов: 1 (2020).')
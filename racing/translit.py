@@ -0,0 +1,83 @@
+import re
+import unicodedata
+
+# --- 1. КИРИЛЛИЦА -> ЛАТИНИЦА ---
+# Упрощенная практическая транслитерация (как пишут имена пилотов в русских СМИ)
+CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo', 'ж': 'zh', 'з': 'z',
+    'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r',
+    'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'kh', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'sh',
+    'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+}
+
+# Слова запроса, которые ничего не говорят об объекте (и не должны находить "Pilette" по "пилот")
+STOP_WORDS = {
+    'пилот', 'пилоты', 'гонщик', 'команда', 'команды', 'трасса', 'трассы', 'гонка', 'гонки',
+    'гран', 'при', 'чемпион', 'победил', 'выиграл', 'победитель', 'сезон', 'год', 'этап',
+    'кто', 'сколько', 'больше', 'всего', 'побед', 'титулы', 'титулов', 'кубков', 'у', 'в', 'на',
+    'grand', 'prix', 'circuit', 'circuito', 'autodromo', 'international', 'street',
+    'de', 'di', 'del', 'la', 'le', 'the', 'of', 'and',
+}
+
+
+def has_cyrillic(text):
+    return bool(re.search('[а-яё]', text.lower()))
+
+
+def to_latin(text):
+    """'Хэмилтон' -> 'khemilton'. Латиница и прочие символы не меняются."""
+    return ''.join(CYRILLIC_TO_LATIN.get(ch, ch) for ch in text.lower())
+
+
+def _fold(text):
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in text if not unicodedata.combining(ch))
+
+
+# --- 2. ФОНЕТИЧЕСКИЙ КЛЮЧ ---
+# Сводит разные записи одного звучания к одной строке согласных:
+# Hamilton / Хэмилтон -> hmltn, Monza / Монца -> mns, Schumacher / Шумахер -> smr
+PHONETIC_RULES = [
+    (r'^u(?=[aeio])', 'v'),    # Уильямс -> Williams
+    (r'tsch|sch|sh|zh|ts|tz|dz|z', 's'),
+    (r'kh|ch', 'h'),
+    (r'^w', 'f'),
+    (r'w', ''),                # Lewis -> Льюис: w в середине слова - это гласный звук
+    (r'ph|v', 'f'),
+    (r'c(?=[eiy])', 's'),
+    (r'ck|c|q', 'k'),
+    (r'x', 'ks'),
+    (r'j', 'i'),
+]
+
+
+def phonetic_key(word):
+    """Фонетический ключ одного слова (любой алфавит). Пустая строка - ключа нет."""
+    word = _fold(to_latin(word))
+    word = re.sub(r'[^a-z]', '', word)
+    if not word:
+        return ''
+
+    for pattern, repl in PHONETIC_RULES:
+        word = re.sub(pattern, repl, word)
+
+    # Первая буква остается (в т.ч. гласная или h), дальше - только согласные без h
+    head, tail = word[0], re.sub(r'[aeiouyh]', '', word[1:])
+    if head in 'aeiouy':
+        head = 'a'
+    key = head + tail
+    # Двойные согласные: Verstappen == Ферстапен
+    return re.sub(r'(.)\1+', r'\1', key)
+
+
+def phonetic_words(text):
+    """[(ключ, слово латиницей)] для всех значимых слов строки"""
+    words = re.findall(r'\w+', text.lower())
+    result = []
+    for word in words:
+        if word in STOP_WORDS:
+            continue
+        key = phonetic_key(word)
+        if key:
+            result.append((key, _fold(to_latin(word))))
+    return result
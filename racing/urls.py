@@ -21,10 +21,12 @@ urlpatterns = [
 
     # --- СЕЗОНЫ И ГОНКИ (сделаем позже) ---
     path('season/<int:year>/', views.season_detail, name='season_detail'),
+    path('season/<int:year>/progression.json', views.season_progression, name='season_progression'),
     path('season/<int:year>/race/<int:round>/', views.race_detail, name='race_detail'),
     path('calendar/<int:year>/', views.calendar_view, name='calendar'),
 
     path('search/', views.search, name='search'),
+    path('search/suggest/', views.search_suggest, name='search_suggest'),
 ]
 
 if settings.DEBUG:
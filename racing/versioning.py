@@ -0,0 +1,84 @@
+from django.db.models import F, Max
+from django.utils import timezone
+from .models import DataVersion, Race, SeasonEntry
+
+# Общая версия всех данных сайта (пилоты, команды, трассы, гонки, результаты)
+GLOBAL_KEY = 'global'
+# Изменения "всего сразу" (админка, фото, цвета, титулы): меняют страницы любых сущностей
+META_KEY = 'meta'
+# Список сезонов (переключатель годов на страницах сезона и календаря); version = число сезонов
+SEASONS_KEY = 'seasons'
+
+
+# --- ОТМЕТКИ ВРЕМЕНИ ПО СУЩНОСТЯМ (для ETag / Last-Modified) ---
+def season_key(year):
+    return f"season-{year}"
+
+
+def driver_key(driver_ref):
+    return f"driver-{driver_ref}"
+
+
+def constructor_key(constructor_ref):
+    return f"constructor-{constructor_ref}"
+
+
+def circuit_key(circuit_ref):
+    return f"circuit-{circuit_ref}"
+
+
+def touch_keys(keys):
+    """Ставит updated_at = сейчас для набора ключей одним upsert-запросом"""
+    now = timezone.now()
+    DataVersion.objects.bulk_create(
+        [DataVersion(key=key, updated_at=now) for key in set(keys)],
+        update_conflicts=True, unique_fields=['key'], update_fields=['updated_at'], batch_size=500,
+    )
+
+
+def last_modified(keys):
+    """Время последнего изменения страницы, зависящей от keys (плюс общие изменения META).
+    Пустой keys - страница зависит от всего сайта (списки, поиск). None - импорт еще ни разу не отмечался."""
+    keys = list(keys) + [META_KEY] if keys else [GLOBAL_KEY]
+    return DataVersion.objects.filter(pk__in=keys).aggregate(last=Max('updated_at'))['last']
+
+
+# --- ОБЩАЯ ВЕРСИЯ ДАННЫХ (кеш страниц, индексы поиска) ---
+def get_data_version(key=GLOBAL_KEY):
+    """Текущая версия данных (0, если импорт еще ни разу не отмечался). Один запрос по PK."""
+    return DataVersion.objects.filter(pk=key).values_list('version', flat=True).first() or 0
+
+
+def _increment(key):
+    obj, created = DataVersion.objects.get_or_create(pk=key, defaults={'version': 1})
+    if not created:
+        DataVersion.objects.filter(pk=key).update(version=F('version') + 1, updated_at=timezone.now())
+
+
+def bump_data_version(key=GLOBAL_KEY):
+    """Отмечает, что данные изменились: кеши и индексы в памяти других процессов пересоберутся.
+    Без уточнения, что именно поменялось, устаревшими считаются страницы всех сущностей."""
+    _increment(key)
+    if key == GLOBAL_KEY:
+        touch_keys([META_KEY])
+
+
+def mark_seasons_modified(years):
+    """Импорт результатов/расписания отдельных сезонов: меняются только страницы этих сезонов,
+    их пилотов, команд и трасс. Страницы остальных сезонов сохраняют свой Last-Modified."""
+    years = list(years)
+    keys = [season_key(year) for year in years]
+    for driver_id, constructor_id in SeasonEntry.objects.filter(year__in=years).values_list('driver', 'constructor'):
+        keys += [driver_key(driver_id), constructor_key(constructor_id)]
+    keys += [circuit_key(c) for c in Race.objects.filter(year__in=years).values_list('circuit', flat=True)]
+    touch_keys(keys)
+    _touch_season_list()
+    _increment(GLOBAL_KEY)
+
+
+def _touch_season_list():
+    """Появился (или пропал) сезон - меняются страницы всех сезонов, где есть переключатель годов"""
+    count = Race.objects.values('year').distinct().count()
+    obj, created = DataVersion.objects.get_or_create(pk=SEASONS_KEY, defaults={'version': count})
+    if not created and obj.version != count:
+        DataVersion.objects.filter(pk=SEASONS_KEY).update(version=count, updated_at=timezone.now())
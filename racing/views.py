@@ -1,11 +1,24 @@
 from django.shortcuts import render, get_object_or_404
+from django.http import JsonResponse, Http404
 from django.db.models import Min, Max, Sum, Count, Q, F
 from .models import Driver, Constructor, Circuit, Race, Result, SprintResult
+from .standings import DNF_FILTER, get_driver_table, get_constructor_table
+from .progression import get_progression
+from .scoring import SCORING_SYSTEMS, season_scores
+from .podiums import race_podiums, race_winners
+from .roster import driver_entries, season_entries
+from .search_index import get_search_index
+from .fts import search_fts
+from .translit import has_cyrillic
+from .answers import smart_answer as get_smart_answer
+from .page_cache import (version_cache_page, conditional_page, season_keys, season_list_keys, driver_keys,
+                         constructor_keys, circuit_keys)
 from datetime import date
 import re
-from thefuzz import fuzz
 
 # --- ГЛАВНАЯ ---
+@conditional_page(daily=True)
+@version_cache_page(daily=True)
 def index(request):
     today = date.today()
 
@@ -18,42 +31,14 @@ def index(request):
     last_winner = None
     if last_race:
         # Ищем победителя (позиция 1)
-        last_winner = Result.objects.filter(race=last_race, position=1).select_related('driver', 'constructor').first()
+        last_winner = race_winners([last_race]).get(last_race.id)
 
     # 3. ТОП-3 ПИЛОТОВ (ТЕКУЩИЙ СЕЗОН)
     # Определяем текущий год по следующей или прошлой гонке
     current_year = next_race.year if next_race else (last_race.year if last_race else 2025)
 
-    top_drivers = []
-    # Берем пилотов этого года
-    drivers_qs = Driver.objects.filter(
-        Q(results__race__year=current_year) | Q(sprint_results__race__year=current_year)
-    ).distinct()
-
-    for driver in drivers_qs:
-        p_race = Result.objects.filter(driver=driver, race__year=current_year).aggregate(Sum('points'))[
-                     'points__sum'] or 0
-        p_sprint = SprintResult.objects.filter(driver=driver, race__year=current_year).aggregate(Sum('points'))[
-                       'points__sum'] or 0
-        total_points = p_race + p_sprint
-
-        # Нам нужно только имя, команда, фото и очки
-        # Ищем команду
-        last_res = Result.objects.filter(driver=driver, race__year=current_year).order_by('-race__date').first()
-        if not last_res:
-            last_res = SprintResult.objects.filter(driver=driver, race__year=current_year).order_by(
-                '-race__date').first()
-        team = last_res.constructor if last_res else None
-
-        top_drivers.append({
-            'driver': driver,
-            'team': team,
-            'points': total_points
-        })
-
-    # Сортируем и берем топ-3
-    top_drivers.sort(key=lambda x: x['points'], reverse=True)
-    top_3 = top_drivers[:3]
+    # Берем сохраненную классификацию сезона и оставляем топ-3
+    top_3 = get_driver_table(current_year)[:3]
 
     # 4. БАЗОВАЯ СТАТИСТИКА (счетчики)
     counts = {
@@ -74,6 +59,8 @@ def index(request):
 
 
 # --- СПИСОК ПИЛОТОВ ---
+@conditional_page(daily=True)
+@version_cache_page(daily=True)
 def driver_list(request):
     years = Race.objects.values_list('year', flat=True).distinct().order_by('-year')
 
@@ -101,43 +88,23 @@ def driver_list(request):
         results__isnull=False  # И результаты загружены
     ).order_by('-date').first()  # Берем самую свежую из прошедших
 
-    drivers_data = []
+    # Составы сезона (SeasonEntry): пилот + команда одним запросом.
+    # Если скрипт составов еще не прогнали - они считаются по результатам сезона (season_entries)
+    entries = season_entries(selected_year)
 
-    # Если такая гонка найдена (сезон идет или прошел)
+    # Если такая гонка найдена (сезон идет или прошел) - берем тех, кто участвовал именно в этом Гран-при:
+    # это ровно те записи состава, у которых последний этап = этой гонке.
+    # ФОЛЛБЭК: Если сезон еще не начался (по дате) или мы смотрим будущий год -
+    # показываем всех, у кого есть хоть какие-то результаты в этом году.
     if last_race:
-        # Берем тех, кто участвовал именно в этом Гран-при
-        drivers_qs = Driver.objects.filter(
-            Q(results__race=last_race) | Q(sprint_results__race=last_race)
-        ).distinct()
-    else:
-        # ФОЛЛБЭК: Если сезон еще не начался (по дате), или мы смотрим будущий год,
-        # или скрипт еще не прогнали - показываем всех, у кого есть хоть какие-то результаты в этом году.
-        drivers_qs = Driver.objects.filter(
-            Q(results__race__year=selected_year) | Q(sprint_results__race__year=selected_year)
-        ).distinct()
-
-    # Собираем данные (Фото, Команда)
-    for driver in drivers_qs:
-        # Ищем команду в ТОЙ ЖЕ гонке, которую мы определили как "последнюю"
-        # Если last_race есть, ищем именно в ней. Если нет - ищем в последней доступной.
-        target_race = last_race
-
-        last_result = None
-        if target_race:
-            last_result = Result.objects.filter(driver=driver, race=target_race).first()
-            if not last_result:
-                last_result = SprintResult.objects.filter(driver=driver, race=target_race).first()
-
-        # Если вдруг в конкретной гонке не нашли (редкий баг), ищем просто последнюю в сезоне
-        if not last_result:
-            last_result = Result.objects.filter(driver=driver, race__year=selected_year).order_by('-race__date').first()
-
-        team = last_result.constructor if last_result else None
-
-        drivers_data.append({
-            'driver': driver,
-            'team': team
-        })
+        entries = [entry for entry in entries if entry.last_round == last_race.round]
+
+    # Одна запись на пилота - с последней командой в сезоне
+    teams_by_driver = {}
+    for entry in sorted(entries, key=lambda entry: entry.last_round):
+        teams_by_driver[entry.driver_id] = entry
+
+    drivers_data = [{'driver': entry.driver, 'team': entry.constructor} for entry in teams_by_driver.values()]
 
     # 3. СОРТИРОВКА
     if sort_param == 'team':
@@ -157,62 +124,76 @@ def driver_list(request):
 
 
 # --- ДЕТАЛЬНАЯ ПИЛОТА ---
+@conditional_page(driver_keys)
+@version_cache_page
 def driver_detail(request, driver_ref):
     driver = get_object_or_404(Driver, pk=driver_ref)
-    available_years = Race.objects.filter(results__driver=driver).values_list('year', flat=True).distinct().order_by(
-        '-year')
+    available_years = driver.results.values_list('year', flat=True).distinct().order_by('-year')
     selected_year = int(request.GET.get('year', available_years[0] if available_years else 0))
     sort_order = request.GET.get('sort', 'asc')
 
-    def get_stats(main_qs, sprint_qs=None):
-        stats = {
-            'races': main_qs.count(),
-            'wins': main_qs.filter(position=1).count(),
-            'podiums': main_qs.filter(position__lte=3).count(),
-            'poles': main_qs.filter(grid=1).count(),
-            'dnfs': main_qs.exclude(position_text__regex=r'^\d+$').exclude(position_text='D').count(),
-            'points': (main_qs.aggregate(Sum('points'))['points__sum'] or 0),
-            'top10s': main_qs.filter(position__lte=10).count()
-        }
-        if sprint_qs:
-            stats['points'] += (sprint_qs.aggregate(Sum('points'))['points__sum'] or 0)
-        return stats
-
-    career_stats = get_stats(driver.results.all(), driver.sprint_results.all())
-
-    season_main = Result.objects.filter(driver=driver, race__year=selected_year)
-    season_sprint = SprintResult.objects.filter(driver=driver, race__year=selected_year)
+    # Все счетчики блока статистики - одним aggregate() на queryset (карьера и сезон сразу)
+    stat_filters = {
+        'races': Q(),
+        'wins': Q(position=1),
+        'podiums': Q(position__lte=3),
+        'poles': Q(grid=1),
+        'dnfs': DNF_FILTER,
+        'top10s': Q(position__lte=10),
+    }
+
+    def get_stats(main_qs):
+        expressions = {}
+        for scope, scope_filter in (('career', Q()), ('season', Q(year=selected_year))):
+            for key, key_filter in stat_filters.items():
+                expressions[f'{scope}_{key}'] = Count('id', filter=scope_filter & key_filter)
+            expressions[f'{scope}_points'] = Sum('points', filter=scope_filter)
+
+        agg = main_qs.aggregate(**expressions)
+        keys = list(stat_filters) + ['points']
+        return ({key: agg[f'career_{key}'] or 0 for key in keys},
+                {key: agg[f'season_{key}'] or 0 for key in keys})
 
+    career_stats, season_gp_stats = get_stats(driver.results.all())
+    career_sprint_stats, season_sprint_stats = get_stats(driver.sprint_results.all())
+
+    career_stats['points'] += career_sprint_stats['points']
+    season_total_stats = dict(season_gp_stats, points=season_gp_stats['points'] + season_sprint_stats['points'])
+
+    # Таблица сезона: два списка результатов, склеенные по id гонки
     table_data = []
     if selected_year:
-        order_by = 'round' if sort_order == 'asc' else '-round'
-        races = Race.objects.filter(year=selected_year).order_by(order_by)
-        for race in races:
-            main_res = season_main.filter(race=race).first()
-            sprint_res = season_sprint.filter(race=race).first()
-            if main_res or sprint_res:
-                table_data.append({'race': race, 'main': main_res, 'sprint': sprint_res})
-
-    season_gp_stats = get_stats(season_main)
-    season_sprint_stats = get_stats(season_sprint)
-    season_total_stats = get_stats(season_main, season_sprint)
+        season_main = Result.objects.filter(driver=driver, year=selected_year) \
+            .select_related('race__circuit', 'constructor')
+        season_sprint = SprintResult.objects.filter(driver=driver, year=selected_year) \
+            .select_related('race__circuit', 'constructor')
+
+        rows_by_race = {}
+        for res in season_main:
+            rows_by_race.setdefault(res.race_id, {'race': res.race, 'main': None, 'sprint': None})['main'] = res
+        for res in season_sprint:
+            rows_by_race.setdefault(res.race_id, {'race': res.race, 'main': None, 'sprint': None})['sprint'] = res
+
+        table_data = sorted(rows_by_race.values(), key=lambda x: x['race'].round, reverse=(sort_order != 'asc'))
+
+    # История команд: из составов сезонов, один запрос (непересчитанные сезоны - по результатам)
+    periods = {}
+    for entry in driver_entries(driver, available_years):
+        item = periods.setdefault(entry.constructor_id, {'team': entry.constructor, 'start': entry.year,
+                                                         'end': entry.year})
+        item['start'] = min(item['start'], entry.year)
+        item['end'] = max(item['end'], entry.year)
 
     teams_data = []
-    constructors = Constructor.objects.filter(result__driver=driver).distinct()
-
-    for team in constructors:
-        years = Race.objects.filter(results__driver=driver, results__constructor=team) \
-            .aggregate(start=Min('year'), end=Max('year'))
-        start = years['start']
-        end = years['end']
-
-        if start and end:
-            period = f"{start}" if start == end else f"{start}–{end}"
-            teams_data.append({
-                'team': team,  # <--- ТЕПЕРЬ ПЕРЕДАЕМ ВЕСЬ ОБЪЕКТ, А НЕ ТОЛЬКО ИМЯ
-                'period': period,
-                'end_year': end
-            })
+    for item in periods.values():
+        start = item['start']
+        end = item['end']
+        period = f"{start}" if start == end else f"{start}–{end}"
+        teams_data.append({
+            'team': item['team'],  # <--- ТЕПЕРЬ ПЕРЕДАЕМ ВЕСЬ ОБЪЕКТ, А НЕ ТОЛЬКО ИМЯ
+            'period': period,
+            'end_year': end
+        })
     teams_data.sort(key=lambda x: x['end_year'], reverse=True)
 
     context = {
@@ -226,25 +207,24 @@ def driver_detail(request, driver_ref):
 
 
 # --- СПИСОК КОМАНД ---
+@conditional_page()
+@version_cache_page
 def constructor_list(request):
     last_year = Race.objects.aggregate(Max('year'))['year__max'] or 2025
-    active_teams = Constructor.objects.filter(result__race__year=last_year).distinct().order_by('name')
+    active_teams = Constructor.objects.filter(result__year=last_year).distinct().order_by('name')
     historic_teams = Constructor.objects.exclude(pk__in=active_teams.values('pk')).order_by('name')
     return render(request, 'racing/constructor_list.html',
                   {'active_teams': active_teams, 'historic_teams': historic_teams, 'current_season': last_year})
 
 
 # --- ДЕТАЛЬНАЯ КОМАНДЫ (ИСПРАВЛЕННАЯ) ---
+@conditional_page(constructor_keys)
+@version_cache_page
 def constructor_detail(request, constructor_ref):
     team = get_object_or_404(Constructor, pk=constructor_ref)
 
-    last_year_agg = Result.objects.filter(constructor=team).aggregate(Max('race__year'))
-    last_year = last_year_agg['race__year__max'] or 2025
-    first_entry = Result.objects.filter(constructor=team).aggregate(Min('race__year'))['race__year__min']
-
     # Год: берем из GET или последний активный
-    available_years = Race.objects.filter(results__constructor=team).values_list('year', flat=True).distinct().order_by(
-        '-year')
+    available_years = Result.objects.filter(constructor=team).values_list('year', flat=True).distinct().order_by('-year')
     last_active_year = available_years[0] if available_years else 2025
 
     selected_year = request.GET.get('year')
@@ -256,66 +236,69 @@ def constructor_detail(request, constructor_ref):
     else:
         selected_year = last_active_year
 
-    # 1. ОБЩАЯ ИСТОРИЯ
-    main_qs_all = Result.objects.filter(constructor=team)
-    sprint_qs_all = SprintResult.objects.filter(constructor=team)
-    total_stats = {
-        'races': main_qs_all.values('race').distinct().count(),
-        'wins': main_qs_all.filter(position=1).count(),
-        'podiums': main_qs_all.filter(position__lte=3).count(),
-        'poles': main_qs_all.filter(grid=1).count(),
-        'points': (main_qs_all.aggregate(Sum('points'))['points__sum'] or 0) + (
-                    sprint_qs_all.aggregate(Sum('points'))['points__sum'] or 0)
+    # 1. ОБЩАЯ ИСТОРИЯ + 2. ПОДРОБНАЯ СТАТИСТИКА СЕЗОНА (GP / Sprint / Total)
+    # Все счетчики считаются одним aggregate() на таблицу результатов
+    stat_filters = {
+        'wins': Q(position=1),
+        'podiums': Q(position__lte=3),
+        'poles': Q(grid=1),
+        'top10s': Q(position__lte=10),
+        'dnfs': DNF_FILTER,
     }
 
-    # 2. ПОДРОБНАЯ СТАТИСТИКА СЕЗОНА (GP / Sprint / Total)
-    season_main = Result.objects.filter(constructor=team, race__year=selected_year)
-    season_sprint = SprintResult.objects.filter(constructor=team, race__year=selected_year)
-
-    def get_team_stats_block(m_qs, s_qs=None):
-        stats = {
-            'races': m_qs.values('race').distinct().count(),
-            'wins': m_qs.filter(position=1).count(),
-            'podiums': m_qs.filter(position__lte=3).count(),
-            'poles': m_qs.filter(grid=1).count(),
-            'top10s': m_qs.filter(position__lte=10).count(),
-            'dnfs': m_qs.exclude(position_text__regex=r'^\d+$').exclude(position_text='D').count(),
-            'points': (m_qs.aggregate(Sum('points'))['points__sum'] or 0)
-        }
-        if s_qs:
-            stats['points'] += (s_qs.aggregate(Sum('points'))['points__sum'] or 0)
-        return stats
-
-    season_gp_stats = get_team_stats_block(season_main)
-    season_sprint_stats = get_team_stats_block(season_sprint)  # wins тут = победы в спринтах
-    season_total_stats = get_team_stats_block(season_main, season_sprint)
+    def get_team_stats(qs, **extra):
+        expressions = dict(extra)
+        for scope, scope_filter in (('total', Q()), ('season', Q(year=selected_year))):
+            expressions[f'{scope}_races'] = Count('race', distinct=True, filter=scope_filter)
+            for key, key_filter in stat_filters.items():
+                expressions[f'{scope}_{key}'] = Count('id', filter=scope_filter & key_filter)
+            expressions[f'{scope}_points'] = Sum('points', filter=scope_filter)
+
+        agg = qs.aggregate(**expressions)
+        keys = ['races'] + list(stat_filters) + ['points']
+        return (agg,
+                {key: agg[f'total_{key}'] or 0 for key in keys},
+                {key: agg[f'season_{key}'] or 0 for key in keys})
+
+    main_agg, total_stats, season_gp_stats = get_team_stats(Result.objects.filter(constructor=team),
+                                                            first_entry=Min('year'))
+    _, sprint_total_stats, season_sprint_stats = get_team_stats(SprintResult.objects.filter(constructor=team))
+    first_entry = main_agg['first_entry']
+
+    total_stats = {key: total_stats[key] for key in ('races', 'wins', 'podiums', 'poles', 'points')}
+    total_stats['points'] += sprint_total_stats['points']
+    season_total_stats = dict(season_gp_stats, points=season_gp_stats['points'] + season_sprint_stats['points'])
+
+    # Все результаты команды за сезон - два запроса, дальше группируем в Python
+    season_main = list(Result.objects.filter(constructor=team, year=selected_year)
+                       .select_related('driver', 'race').order_by('round', 'position'))
+    season_sprint = list(SprintResult.objects.filter(constructor=team, year=selected_year)
+                         .select_related('driver', 'race').order_by('round', 'position'))
 
     # 3. АКТИВНЫЕ ПИЛОТЫ И СРАВНЕНИЕ (HEAD-TO-HEAD)
-    drivers_this_year = Driver.objects.filter(results__constructor=team, results__race__year=selected_year).distinct()
-
-    drivers_detailed = []
-    for driver in drivers_this_year:
-        d_main = season_main.filter(driver=driver)
-        d_sprint = season_sprint.filter(driver=driver)
-
-        # Считаем детальную стату для сравнения
-        races_count = d_main.count()
-        points = (d_main.aggregate(Sum('points'))['points__sum'] or 0) + (
-                    d_sprint.aggregate(Sum('points'))['points__sum'] or 0)
-
-        # Лучший финиш
-        best_pos = d_main.aggregate(Min('position'))['position__min']
-
-        drivers_detailed.append({
-            'obj': driver,
-            'races': races_count,
-            'points': points,
-            'wins': d_main.filter(position=1).count(),
-            'podiums': d_main.filter(position__lte=3).count(),
-            'poles': d_main.filter(grid=1).count(),
-            'dnfs': d_main.exclude(position_text__regex=r'^\d+$').exclude(position_text='D').count(),
-            'best_pos': best_pos if best_pos else '-',
+    drivers_by_ref = {}
+    for res in season_main:
+        item = drivers_by_ref.setdefault(res.driver_id, {
+            'obj': res.driver, 'races': 0, 'points': 0, 'wins': 0, 'podiums': 0, 'poles': 0, 'dnfs': 0,
+            'best_pos': None,
         })
+        item['races'] += 1
+        item['points'] += res.points
+        item['wins'] += res.position == 1
+        item['podiums'] += res.position is not None and res.position <= 3
+        item['poles'] += res.grid == 1
+        item['dnfs'] += not res.position_text.isdigit() and res.position_text != 'D'
+        if res.position and (item['best_pos'] is None or res.position < item['best_pos']):
+            item['best_pos'] = res.position
+
+    # Очки спринтов добавляем только пилотам, у которых есть гонки за команду
+    for res in season_sprint:
+        if res.driver_id in drivers_by_ref:
+            drivers_by_ref[res.driver_id]['points'] += res.points
+
+    drivers_detailed = list(drivers_by_ref.values())
+    for d in drivers_detailed:
+        d['best_pos'] = d['best_pos'] or '-'
 
     # Сортируем по очкам
     drivers_detailed.sort(key=lambda x: x['points'], reverse=True)
@@ -330,32 +313,22 @@ def constructor_detail(request, constructor_ref):
     # Для сравнения берем ТОЛЬКО топ-2 основных пилота
     comparison_drivers = [d for d in drivers_detailed if not d.get('is_reserve')][:2]
 
-    # 4. ИСТОРИЯ ВСЕХ ПИЛОТОВ
+    # 4. ИСТОРИЯ ВСЕХ ПИЛОТОВ (один сгруппированный запрос)
     all_drivers_data = []
-    d_stats = Result.objects.filter(constructor=team).values('driver').annotate(start=Min('race__year'),
-                                                                                end=Max('race__year')).order_by('-end',
-                                                                                                                'driver__surname')
-    for item in d_stats:
-        driver = Driver.objects.get(pk=item['driver'])
-        period = f"{item['start']}" if item['start'] == item['end'] else f"{item['start']}-{item['end']}"
+    d_stats = Driver.objects.filter(results__constructor=team).annotate(
+        start=Min('results__year'), end=Max('results__year')
+    ).order_by('-end', 'surname')
+    for driver in d_stats:
+        period = f"{driver.start}" if driver.start == driver.end else f"{driver.start}-{driver.end}"
         all_drivers_data.append({'driver': driver, 'period': period})
 
-    # 5. ТАБЛИЦА ГОНОК (ГРУППИРОВКА)
-    season_race_data = []
-    races = Race.objects.filter(year=selected_year).order_by('round')
-
-    for race in races:
-        # Для этой гонки берем результаты
-        race_results = Result.objects.filter(race=race, constructor=team).select_related('driver').order_by('position')
-        sprint_results = SprintResult.objects.filter(race=race, constructor=team).select_related('driver').order_by(
-            'position')
-
-        if race_results.exists() or sprint_results.exists():
-            season_race_data.append({
-                'race': race,
-                'results': race_results,
-                'sprints': sprint_results
-            })
+    # 5. ТАБЛИЦА ГОНОК (ГРУППИРОВКА по id гонки)
+    races_by_id = {}
+    for res in season_main:
+        races_by_id.setdefault(res.race_id, {'race': res.race, 'results': [], 'sprints': []})['results'].append(res)
+    for res in season_sprint:
+        races_by_id.setdefault(res.race_id, {'race': res.race, 'results': [], 'sprints': []})['sprints'].append(res)
+    season_race_data = sorted(races_by_id.values(), key=lambda x: x['race'].round)
 
     context = {
         'team': team, 'total_stats': total_stats,
@@ -372,6 +345,8 @@ def constructor_detail(request, constructor_ref):
 
 
 # ЗАГЛУШКИ
+@conditional_page()
+@version_cache_page
 def circuit_list(request):
     # 1. Находим текущий сезон
     last_year = Race.objects.aggregate(Max('year'))['year__max'] or 2025
@@ -390,6 +365,8 @@ def circuit_list(request):
     return render(request, 'racing/circuit_list.html', context)
 
 
+@conditional_page(circuit_keys)
+@version_cache_page
 def circuit_detail(request, circuit_ref):
     circuit = get_object_or_404(Circuit, pk=circuit_ref)
 
@@ -397,14 +374,16 @@ def circuit_detail(request, circuit_ref):
     # Нам нужно найти победителя каждой гонки
     # Используем сложный запрос, чтобы сразу вытащить победителя (position=1)
     races_qs = Race.objects.filter(circuit=circuit).order_by('-year')
+    races_list = list(races_qs)
+
+    # Победители всех гонок трассы - одним запросом
+    winners = race_winners(races_list)
 
     races_data = []
-    for race in races_qs:
-        # Ищем победителя (Position 1)
-        winner_res = Result.objects.filter(race=race, position=1).select_related('driver', 'constructor').first()
+    for race in races_list:
         races_data.append({
             'race': race,
-            'winner': winner_res
+            'winner': winners.get(race.id)
         })
 
     # 2. СТАТИСТИКА (КОРОЛЬ ТРАССЫ)
@@ -421,9 +400,9 @@ def circuit_detail(request, circuit_ref):
         .order_by('-wins').first()
 
     stats = {
-        'count': races_qs.count(),  # Всего гонок
-        'first_year': races_qs.last().year if races_qs else '-',
-        'last_year': races_qs.first().year if races_qs else '-',
+        'count': len(races_list),  # Всего гонок
+        'first_year': races_list[-1].year if races_list else '-',
+        'last_year': races_list[0].year if races_list else '-',
     }
 
     context = {
@@ -435,6 +414,8 @@ def circuit_detail(request, circuit_ref):
     }
     return render(request, 'racing/circuit_detail.html', context)
 
+@conditional_page(season_list_keys)
+@version_cache_page
 def season_detail(request, year):
     # 1. Список доступных лет для меню
     available_years = Race.objects.values_list('year', flat=True).distinct().order_by('-year')
@@ -444,76 +425,50 @@ def season_detail(request, year):
         year = available_years[0]  # Если ввели 1900 год, кидаем на последний доступный
 
     # --- 1. ЛИЧНЫЙ ЗАЧЕТ (DRIVERS) ---
-    driver_standings = []
-
-    # Берем всех пилотов, у которых были результаты в этом году
-    drivers = Driver.objects.filter(
-        Q(results__race__year=year) | Q(sprint_results__race__year=year)
-    ).distinct()
-
-    for driver in drivers:
-        # Считаем очки (Гонки + Спринты)
-        p_race = Result.objects.filter(driver=driver, race__year=year).aggregate(Sum('points'))['points__sum'] or 0
-        p_sprint = SprintResult.objects.filter(driver=driver, race__year=year).aggregate(Sum('points'))[
-                       'points__sum'] or 0
-        total_points = p_race + p_sprint
-
-        # Считаем победы и подиумы (для статистики и тай-брейков)
-        # Победы в спринтах обычно не считаются в официальную статистику "Wins", только Гран-при
-        wins = Result.objects.filter(driver=driver, race__year=year, position=1).count()
-        podiums = Result.objects.filter(driver=driver, race__year=year, position__lte=3).count()
-
-        # Находим команду (последнюю в сезоне)
-        last_res = Result.objects.filter(driver=driver, race__year=year).order_by('-race__date').first()
-        team = last_res.constructor if last_res else None
-
-        driver_standings.append({
-            'driver': driver,
-            'team': team,
-            'points': total_points,
-            'wins': wins,
-            'podiums': podiums
-        })
-
-    # Сортируем: сначала по Очкам, потом по Победам (правила Ф1)
-    driver_standings.sort(key=lambda x: (x['points'], x['wins']), reverse=True)
+    # Уже отсортированные по правилам Ф1 строки из DriverSeasonStanding (пересчитываются импортом)
+    driver_standings_data = get_driver_table(year)
 
     # --- 2. КУБОК КОНСТРУКТОРОВ (CONSTRUCTORS) ---
-    team_standings = []
-
-    teams = Constructor.objects.filter(
-        Q(result__race__year=year) | Q(sprintresult__race__year=year)
-    ).distinct()
-
-    for team in teams:
-        # Очки пилотов суммируются для команды
-        p_race = Result.objects.filter(constructor=team, race__year=year).aggregate(Sum('points'))['points__sum'] or 0
-        p_sprint = SprintResult.objects.filter(constructor=team, race__year=year).aggregate(Sum('points'))[
-                       'points__sum'] or 0
-        total_points = p_race + p_sprint
-
-        wins = Result.objects.filter(constructor=team, race__year=year, position=1).count()
-        podiums = Result.objects.filter(constructor=team, race__year=year, position__lte=3).count()
-
-        team_standings.append({
-            'team': team,
-            'points': total_points,
-            'wins': wins,
-            'podiums': podiums
-        })
-
-    # Сортировка
-    team_standings.sort(key=lambda x: (x['points'], x['wins']), reverse=True)
+    team_standings = get_constructor_table(year)
+
+    # --- 3. АЛЬТЕРНАТИВНАЯ СИСТЕМА ОЧКОВ (?scoring=2010 и т.п.) ---
+    # Победы/подиумы не меняются, пересчитываются только очки и места
+    scoring = request.GET.get('scoring', '')
+    if scoring not in SCORING_SYSTEMS:
+        scoring = ''
+    if scoring:
+        scores = season_scores(scoring, year)
+        if scores:
+            for row in driver_standings_data:
+                row.points, row.position = scores['drivers'].get(row.driver_id, (0, len(driver_standings_data)))
+            for row in team_standings:
+                row.points, row.position = scores['constructors'].get(row.team_id, (0, len(team_standings)))
+            driver_standings_data.sort(key=lambda x: x.position)
+            team_standings.sort(key=lambda x: x.position)
 
     context = {
         'year': year,
         'available_years': available_years,
-        'driver_standings': driver_standings,
+        'driver_standings': driver_standings_data,
         'team_standings': team_standings,
+        'scoring': scoring,
+        'scoring_systems': SCORING_SYSTEMS,
     }
     return render(request, 'racing/season_detail.html', context)
 
 
+@conditional_page(season_keys)
+@version_cache_page
+def season_progression(request, year):
+    # Накопленные очки и места после каждого этапа (для графиков), считается numpy и кешируется
+    data = get_progression(year)
+    if data is None:
+        raise Http404("Нет данных за этот сезон")
+    return JsonResponse(data)
+
+
+@conditional_page(season_keys)
+@version_cache_page
 def race_detail(request, year, round):
     # Получаем саму гонку
     race = get_object_or_404(Race, year=year, round=round)
@@ -544,6 +499,8 @@ def race_detail(request, year, round):
     return render(request, 'racing/race_detail.html', context)
 
 
+@conditional_page(season_list_keys)
+@version_cache_page
 def calendar_view(request, year):
     # Доступные годы
     available_years = Race.objects.values_list('year', flat=True).distinct().order_by('-year')
@@ -554,18 +511,16 @@ def calendar_view(request, year):
     races_qs = Race.objects.filter(year=year).order_by('round').select_related('circuit')
 
     calendar_data = []
+    races_list = list(races_qs)
 
-    for race in races_qs:
-        # Проверяем, есть ли результаты (значит гонка прошла)
-        results = Result.objects.filter(race=race).select_related('driver', 'constructor').order_by('position')
-
-        is_finished = results.exists()
-        podium = []
+    # Подиумы всех гонок сезона одним запросом.
+    # Порядок: [1 место, 2 место, 3 место], а в шаблоне мы их переставим визуально (2-1-3)
+    podiums = race_podiums(races_list)
 
-        if is_finished:
-            # Собираем подиум: [1 место, 2 место, 3 место]
-            # Нам нужно именно в таком порядке для данных, а в шаблоне мы их переставим визуально (2-1-3)
-            podium = list(results[:3])
+    for race in races_list:
+        # Есть подиум - значит гонка прошла
+        podium = podiums.get(race.id, [])
+        is_finished = bool(podium)
 
         calendar_data.append({
             'race': race,
@@ -581,6 +536,8 @@ def calendar_view(request, year):
     return render(request, 'racing/calendar.html', context)
 
 
+@conditional_page()
+@version_cache_page
 def search(request):
     query = request.GET.get('q', '').strip()
 
@@ -598,90 +555,102 @@ def search(request):
         year_match = re.search(r'\b(19|20)\d{2}\b', query)
         search_year = int(year_match.group(0)) if year_match else None
 
-        # --- 1. ЛОГИКА "УМНОГО ОТВЕТА" (ЧЕМПИОН) ---
-        if search_year:
-            keywords_champion = ['чемпион', 'победил', 'выиграл', 'champion', 'winner', 'won']
-            if any(k in query_lower for k in keywords_champion):
-                # ... (ТУТ ТОТ ЖЕ КОД ПОДСЧЕТА ЧЕМПИОНА, ЧТО БЫЛ РАНЬШЕ) ...
-                # (Я его сокращу здесь, но оставь его как был)
-                drivers = Driver.objects.filter(results__race__year=search_year).distinct()
-                best_driver = None
-                max_points = -1
-                for d in drivers:
-                    p1 = Result.objects.filter(driver=d, race__year=search_year).aggregate(Sum('points'))[
-                             'points__sum'] or 0
-                    p2 = SprintResult.objects.filter(driver=d, race__year=search_year).aggregate(Sum('points'))[
-                             'points__sum'] or 0
-                    if (p1 + p2) > max_points:
-                        max_points = (p1 + p2)
-                        best_driver = d
-                if best_driver:
-                    smart_answer = {'title': f"Чемпион {search_year}", 'obj': best_driver,
-                                    'description': f"Набрал {int(max_points)} очков."}
-
         # === ПОИСК ПО БАЗЕ (БЕЗ ЛИМИТОВ) ===
 
-        # А. ПИЛОТЫ (Fuzzy)
-        all_drivers = Driver.objects.all()
+        # Индекс имен строится один раз на процесс (и пересобирается после импорта)
+        index = get_search_index()
+
+        # --- 1. "УМНЫЙ ОТВЕТ" ---
+        # Чемпион года, победитель Гран-при, рекордсмен трассы, титулы команды - из готовых таблиц
+        smart_answer = get_smart_answer(query_lower, search_year, index)
+
+        # А. ПИЛОТЫ (Fuzzy) - сравниваем с фамилией и полным именем
+        allowed_drivers = None
         # Если введен год - ищем пилотов, выступавших в этом году
         if search_year and 'пилот' in query_lower:
-            all_drivers = all_drivers.filter(results__race__year=search_year).distinct()
-
-        for d in all_drivers:
-            # Сравниваем с фамилией и полным именем
-            if fuzz.partial_ratio(query_lower, d.surname.lower()) > 80 or \
-                    fuzz.partial_ratio(query_lower, f"{d.forename} {d.surname}".lower()) > 80:
-                drivers_results.append(d)
+            allowed_drivers = {entry.driver_id for entry in season_entries(search_year)}
+        drivers_results = index.drivers.search(query_lower, 80, allowed=allowed_drivers)
 
         # Б. КОМАНДЫ (Fuzzy)
-        for t in Constructor.objects.all():
-            if fuzz.partial_ratio(query_lower, t.name.lower()) > 80:
-                teams_results.append(t)
-
-        # В. ТРАССЫ (Fuzzy)
-        for c in Circuit.objects.all():
-            # Ищем по названию, городу или стране
-            full_str = f"{c.name} {c.location} {c.country}"
-            if fuzz.partial_ratio(query_lower, full_str.lower()) > 75:
-                circuits_results.append(c)
-
-        # Г. ГОНКИ (Улучшенный поиск)
-        # 1. Если есть год в запросе -> берем ВСЕ гонки этого года
-        if search_year:
-            # Если запрос просто "2019" или "Гран при 2019"
-            year_races = Race.objects.filter(year=search_year).order_by('date')
-            # Если есть еще слова кроме года (например "Bahrain 2019"), фильтруем
-            clean_query = query.replace(str(search_year), '').strip()
-
-            if len(clean_query) > 2:
-                for r in year_races:
-                    if fuzz.partial_ratio(clean_query.lower(), r.name.lower()) > 70:
-                        races_results.append(r)
-            else:
-                # Если просто год - отдаем все гонки года
-                races_results = list(year_races)
-
-        # 2. Если года нет -> ищем по названию (fuzzy)
+        teams_results = index.teams.search(query_lower, 80)
+
+        # В. ТРАССЫ (Fuzzy) - по названию, городу или стране
+        circuits_results = index.circuits.search(query_lower, 75)
+
+        # Запросы на русском и с ошибками в написании ("Хэмилтон", "Монца", "Ферстапен"):
+        # фонетические ключи посчитаны заранее, здесь только поиск по ключам запроса.
+        # Для латиницы - только если fuzzy ничего не нашел (иначе ключи добавляют лишний шум)
+        cyrillic = has_cyrillic(query)
+        for results, kind, allowed in ((drivers_results, 'drivers', allowed_drivers),
+                                       (teams_results, 'teams', None),
+                                       (circuits_results, 'circuits', None)):
+            if results and not cyrillic:
+                continue
+            known = {obj.pk for obj in results}
+            results.extend(obj for obj in index.phonetic[kind].search(query_lower, allowed=allowed)
+                           if obj.pk not in known)
+
+        # Г. ГОНКИ - полнотекстовый индекс FTS5 по всей истории (одним ранжированным запросом)
+        # Если есть год в запросе -> ищем только в этом сезоне; слова кроме года - фильтр по названию
+        clean_query = query.replace(str(search_year), '').strip() if search_year else query
+        if search_year and len(clean_query) <= 2:
+            # Если просто год - отдаем все гонки года
+            races_results = list(Race.objects.filter(year=search_year).select_related('circuit').order_by('date'))
         else:
-            all_races = Race.objects.all().order_by('-date')
-            # Оптимизация: сначала пробуем строгий поиск
-            strict_matches = all_races.filter(name__icontains=query)
-            races_results.extend(list(strict_matches))
-
-            # Если мало нашли, подключаем Fuzzy (но осторожно, это долго на 1000 гонках)
-            if len(races_results) < 5:
-                # Берем последние 5 сезонов для скорости или ищем везде
-                for r in all_races[:100]:  # Ищем только в последних 100 гонках, чтобы не вис сайт
-                    if r not in races_results and fuzz.partial_ratio(query_lower, r.name.lower()) > 80:
-                        races_results.append(r)
+            found = search_fts(clean_query, year=search_year)
+            if found is None:
+                # Не SQLite - простой поиск по подстроке
+                races_qs = Race.objects.filter(name__icontains=clean_query)
+                if search_year:
+                    races_qs = races_qs.filter(year=search_year)
+                races_results = list(races_qs.order_by('-date'))
+            else:
+                races_by_id = Race.objects.select_related('circuit').in_bulk(found['race'])
+                races_results = [races_by_id[pk] for pk in found['race'] if pk in races_by_id]
+
+                # Пилоты/команды/трассы, найденные по словам (например, код "VER" или город),
+                # дополняют fuzzy-результаты индекса
+                if not search_year and len(clean_query) > 2:
+                    for results, model, refs in ((drivers_results, Driver, found['driver']),
+                                                 (teams_results, Constructor, found['constructor']),
+                                                 (circuits_results, Circuit, found['circuit'])):
+                        known = {obj.pk for obj in results}
+                        extra = [ref for ref in refs if ref not in known]
+                        objs = model.objects.in_bulk(extra) if extra else {}
+                        results.extend(objs[ref] for ref in extra if ref in objs)
+
+        # По названиям гонок ничего ("Монца" - это трасса, а не Гран-при): гонки найденных трасс
+        if not races_results and circuits_results and len(clean_query) > 2:
+            races_qs = Race.objects.filter(circuit__in=circuits_results).select_related('circuit')
+            if search_year:
+                races_qs = races_qs.filter(year=search_year)
+            races_results = list(races_qs.order_by('-date'))
 
     context = {
         'query': query,
         'smart_answer': smart_answer,
-        'drivers': list(set(drivers_results)),  # Убираем дубликаты
-        'teams': list(set(teams_results)),
-        'circuits': list(set(circuits_results)),
-        'races': list(set(races_results)),
+        'drivers': drivers_results,  # Индекс уже убирает дубликаты и сортирует по похожести
+        'teams': teams_results,
+        'circuits': circuits_results,
+        'races': races_results,
         'total_results': len(drivers_results) + len(teams_results) + len(circuits_results) + len(races_results)
     }
-    return render(request, 'racing/search_results.html', context)
\ No newline at end of file
+    return render(request, 'racing/search_results.html', context)
+
+
+# Сколько подсказок каждого вида отдаем по умолчанию / максимум
+SUGGEST_LIMIT = 5
+SUGGEST_MAX_LIMIT = 20
+
+
+def search_suggest(request):
+    # Автодополнение для строки поиска: только индекс в памяти, без запросов к базе на каждый символ.
+    # Кеш страниц не нужен: ответ из индекса дешевле, а каждый набранный префикс остался бы в кеше навсегда
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = min(int(request.GET.get('limit', SUGGEST_LIMIT)), SUGGEST_MAX_LIMIT)
+    except ValueError:
+        limit = SUGGEST_LIMIT
+
+    results = get_search_index().suggestions(query, max(limit, 1)) if query else {}
+    return JsonResponse({'query': query, 'results': results})